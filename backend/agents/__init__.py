@@ -1,9 +1,38 @@
 """Initialize the backend agents package and expose agent classes."""
 
+from .bandit import Allocation, ThompsonAllocator
 from .creative_agent import CreativeAgent
-from .optimizer_agent import OptimizationAgent
+from .cubes import ResultCubes
+from .decision_engine import BayesianDecisionEngine, ExperimentDecision, VariantDecision
+from .metrics import compute_kpis, merge_variant_rows, with_kpis, with_kpis_batch
+from .optimizer_agent import OptimizationAgent, iter_results_ndjson, parse_result_line
+from .planner import ExperimentPlanner
+from .sequential import SequentialDecision, SequentialTest, SequentialTestRegistry
+from .simulator import PolicyReport, SimulationConfig, simulate
+from .templates import TemplateEngine, compile_template
 
 __all__ = [
+    "Allocation",
+    "BayesianDecisionEngine",
     "CreativeAgent",
+    "ExperimentDecision",
+    "ExperimentPlanner",
     "OptimizationAgent",
+    "PolicyReport",
+    "ResultCubes",
+    "SequentialDecision",
+    "SequentialTest",
+    "SequentialTestRegistry",
+    "SimulationConfig",
+    "TemplateEngine",
+    "ThompsonAllocator",
+    "VariantDecision",
+    "compile_template",
+    "compute_kpis",
+    "iter_results_ndjson",
+    "merge_variant_rows",
+    "parse_result_line",
+    "simulate",
+    "with_kpis",
+    "with_kpis_batch",
 ]
@@ -0,0 +1,138 @@
+"""Thompson-sampling budget allocation across live variants.
+
+While a test runs, budget should follow the evidence: variants likely to be
+best get more spend, but none is starved before it has had a fair chance.
+Shares come from the posteriors of `BayesianDecisionEngine`:
+
+- Thompson sampling gives each variant a share equal to its probability of
+  being best.
+- Top-two Thompson sampling (`top_two=True`) gives the leader `beta` of
+  that and spreads the rest over the challengers, using Russo's closed form
+  `psi_i = p_i * (beta + (1 - beta) * sum_{j != i} p_j / (1 - p_j))`.
+  This keeps measuring the runner-up instead of piling everything on an
+  early leader.
+
+After that, an exploration floor (`min_share`) is applied.  With a budget,
+variants still below `SampleSizeRules.min_spend_per_variant` are topped up
+first.  Every step works on (experiments, variants) arrays, so one call
+re-allocates thousands of ad sets.  The engine's seed makes the output
+replayable.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..schemas.models import ExperimentResult, SampleSizeRules
+from .decision_engine import BayesianDecisionEngine, pad_results
+from .metrics import merge_variant_rows
+
+
+@dataclass
+class Allocation:
+    experiment_id: str
+    shares: Dict[str, float]
+    # Only set when a budget was given
+    spend: Optional[Dict[str, float]] = None
+
+
+class ThompsonAllocator:
+    """Vectorized (top-two) Thompson-sampling spend shares."""
+
+    def __init__(
+        self,
+        engine: Optional[BayesianDecisionEngine] = None,
+        top_two: bool = False,
+        beta: float = 0.5,
+        min_share: float = 0.0,
+    ) -> None:
+        self.engine = engine or BayesianDecisionEngine()
+        self.top_two = top_two
+        self.beta = beta
+        self.min_share = min_share
+
+    def shares(
+        self,
+        clicks: np.ndarray,
+        conversions: np.ndarray,
+        revenue: np.ndarray,
+        spend: np.ndarray,
+        mask: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Spend shares per (experiment, variant); each row sums to 1.
+
+        Padded cells (where `mask` is False) get a share of 0.
+        """
+        mask = np.ones(np.shape(clicks), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        prob_best, _, _ = self.engine.evaluate_arrays(clicks, conversions, revenue, spend, mask)
+        p = np.where(mask, prob_best, 0.0)
+        if self.top_two:
+            odds = np.divide(p, 1.0 - p, out=np.zeros_like(p), where=p < 1.0)
+            others = odds.sum(axis=1, keepdims=True) - odds
+            p = p * (self.beta + (1.0 - self.beta) * others)
+            total = p.sum(axis=1, keepdims=True)
+            # A variant with p == 1 has no challengers left; it keeps everything
+            p = np.divide(p, total, out=np.where(mask, prob_best, 0.0), where=total > 0)
+        live = mask.sum(axis=1, keepdims=True)
+        floor = np.minimum(self.min_share, 1.0 / np.maximum(live, 1))
+        return np.where(mask, floor + (1.0 - live * floor) * p, 0.0)
+
+    def spend_plan(
+        self,
+        shares: np.ndarray,
+        spent: np.ndarray,
+        budgets: np.ndarray,
+        min_spend: np.ndarray,
+        mask: np.ndarray,
+    ) -> np.ndarray:
+        """Split each experiment's `budget` by `shares` after minimum top-ups.
+
+        Variants that have spent less than `min_spend` are topped up first.
+        If the budget cannot cover every top-up, it is split in proportion
+        to what each variant is missing.
+        """
+        budgets = np.asarray(budgets, dtype=np.float64).reshape(-1, 1)
+        required = np.where(mask, np.maximum(np.reshape(min_spend, (-1, 1)) - spent, 0.0), 0.0)
+        total_required = required.sum(axis=1, keepdims=True)
+        covered = budgets >= total_required
+        scarce = np.divide(required * budgets, total_required,
+                           out=np.zeros_like(required), where=total_required > 0)
+        plenty = required + (budgets - total_required) * shares
+        return np.where(covered, plenty, scarce)
+
+    def allocate_batch(
+        self,
+        results: Sequence[ExperimentResult],
+        budgets: Optional[Sequence[float]] = None,
+        rules: Optional[Sequence[Optional[SampleSizeRules]]] = None,
+    ) -> List[Allocation]:
+        """Allocate every experiment in one pass; budgets and rules are per experiment.
+
+        Rows repeating a variant id (one per channel) are merged first, so
+        each variant is one arm with one share.
+        """
+        results = [merge_variant_rows(result) for result in results]
+        clicks, conversions, revenue, spend, mask = pad_results(results)
+        shares = self.shares(clicks, conversions, revenue, spend, mask)
+        planned = None
+        if budgets is not None:
+            min_spend = np.array([r.min_spend_per_variant if r else 0.0 for r in (rules or [None] * len(results))])
+            planned = self.spend_plan(shares, spend, np.asarray(budgets), min_spend, mask)
+        allocations = []
+        for i, result in enumerate(results):
+            ids = [v.variant_id for v in result.results]
+            allocations.append(Allocation(
+                experiment_id=result.experiment_id,
+                shares={vid: round(float(shares[i, j]), 6) for j, vid in enumerate(ids)},
+                spend=None if planned is None else {vid: round(float(planned[i, j]), 2) for j, vid in enumerate(ids)},
+            ))
+        return allocations
+
+    def allocate(
+        self,
+        result: ExperimentResult,
+        budget: Optional[float] = None,
+        rules: Optional[SampleSizeRules] = None,
+    ) -> Allocation:
+        return self.allocate_batch([result], None if budget is None else [budget], [rules])[0]
@@ -1,35 +1,51 @@
-from ..schemas.models import ExperimentPlan, CreativeVariant
+from typing import Dict, Iterator, Optional
+
+from ..schemas.models import ExperimentPlan, CreativeVariant, VariantPlan
+from .templates import TemplateEngine
 
 
 class CreativeAgent:
     """Agent responsible for generating ad creative variants using AI and storytelling principles.
 
-    This placeholder implementation creates simple text-based creatives using variant descriptions.
-    Future versions will integrate generative models and brand guidelines.
+    Copy is rendered from the precompiled templates of `TemplateEngine`,
+    picked by the plan's brand voice and target channel, with the plan's
+    guardrails applied.  Future versions will integrate generative models.
     """
 
-    def __init__(self) -> None:
-        # Load or initialize models/resources here (placeholder).
-        pass
+    def __init__(self, engine: Optional[TemplateEngine] = None) -> None:
+        self.engine = engine or TemplateEngine()
 
-    def generate_variants(self, plan: ExperimentPlan) -> list[CreativeVariant]:
+    def generate_variants(self, plan: ExperimentPlan, product: Optional[str] = None) -> list[CreativeVariant]:
         """Generate creative variants for each variant in the provided experiment plan.
 
         Args:
             plan: An ExperimentPlan containing variant definitions.
+            product: Product name; templates that mention the product are only used when it is given.
 
         Returns:
-            A list of CreativeVariant objects with autogenerated hooks and ad copy.
+            A list of CreativeVariant objects with templated hooks and ad copy.
+        """
+        return self.engine.render_batch([self._context(v, product) for v in plan.variants], plan.guardrails)
+
+    def generate_permutations(
+        self, plan: ExperimentPlan, limit: Optional[int] = None, product: Optional[str] = None
+    ) -> Iterator[CreativeVariant]:
+        """Yield every hook x headline x body permutation for each variant of the plan.
+
+        Args:
+            plan: An ExperimentPlan containing variant definitions.
+            limit: Maximum permutations per variant (all when None).
+            product: Product name; templates that mention the product are only used when it is given.
+
+        Returns:
+            An iterator of CreativeVariant objects with ids `<variant_id>-p<n>`.
         """
-        creatives: list[CreativeVariant] = []
         for variant in plan.variants:
-            creatives.append(
-                CreativeVariant(
-                    variant_id=variant.variant_id,
-                    hook=f"Exciting hook for {variant.description}",
-                    primary_text="Autogenerated ad copy based on brand guidelines.",
-                    headline="Discover amazing benefits",
-                    call_to_action="Learn More",
-                )
-            )
-        return creatives
+            yield from self.engine.iter_permutations(self._context(variant, product), plan.guardrails, limit=limit)
+
+    @staticmethod
+    def _context(variant: VariantPlan, product: Optional[str]) -> Dict[str, str]:
+        context = {"variant_id": variant.variant_id, "description": variant.description}
+        if product:
+            context["product"] = product
+        return context
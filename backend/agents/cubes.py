@@ -0,0 +1,185 @@
+"""Pre-aggregated result cubes for dashboard slicing.
+
+Dashboards slice experiment results by variant, channel, audience segment
+and time.  Instead of re-scanning raw results for every query, each
+incoming row is added to every cuboid of the lattice as it arrives: every
+subset of (variant, channel, segment) crossed with hourly, daily or no
+time buckets, per experiment.  That is 24 small dict updates per row.
+
+A query then reads one cuboid:
+
+- roll-up: group by fewer dimensions or a coarser grain;
+- drill-down: group by more dimensions or a finer grain, with `where`
+  pinning the parent cell (for example `where={"channel": "Meta",
+  "day": "2024-03-01"}` with `grain="hour"`).
+
+Time-bucketed cuboids are partitioned by day, so a day filter reads one
+partition.  The cost depends only on the cells read, not on how many rows
+have been ingested.
+
+Only deltas are added, so the cubes are fed by incremental `/results`
+calls alone; the other results paths carry cumulative totals and would be
+double counted.  Memory is bounded two ways: day partitions older than
+`retention_days` before an experiment's newest day are dropped, and at
+most `max_experiments` experiments are kept, least recently used first
+out.
+"""
+
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+import threading
+
+from ..schemas.models import ExperimentResult
+from .metrics import total_kpis
+
+
+CUBE_DIMENSIONS = ("variant", "channel", "segment")
+GRAINS = ("hour", "day")
+UNKNOWN = "unknown"
+# Field names used in query output, matching VariantResult
+_OUTPUT_NAMES = {"variant": "variant_id", "channel": "channel", "segment": "audience_segment"}
+
+_CUBOIDS = [
+    (dims, grain)
+    for size in range(len(CUBE_DIMENSIONS) + 1)
+    for dims in combinations(CUBE_DIMENSIONS, size)
+    for grain in GRAINS + (None,)
+]
+
+
+def _buckets(observed_at: datetime) -> Dict[str, str]:
+    if observed_at.tzinfo is None:
+        observed_at = observed_at.replace(tzinfo=timezone.utc)
+    utc = observed_at.astimezone(timezone.utc)
+    return {"hour": utc.strftime("%Y-%m-%dT%H:00:00Z"), "day": utc.strftime("%Y-%m-%d")}
+
+
+class ResultCubes:
+    """Every cuboid of every experiment, maintained on insert."""
+
+    def __init__(self, max_experiments: int = 1000, retention_days: int = 90) -> None:
+        self.max_experiments = max_experiments
+        self.retention_days = retention_days
+        # experiment -> (dims, grain) -> day partition -> key -> totals, where
+        # totals are [impressions, clicks, conversions, spend, revenue].  Cuboids
+        # without a grain have a single partition under None.
+        self._cubes: "OrderedDict[str, Dict[Tuple[Tuple[str, ...], Optional[str]], Dict[Optional[str], Dict[tuple, List[float]]]]]" = OrderedDict()
+        # Newest day partition per experiment, the reference for retention
+        self._newest_day: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.evicted = 0
+
+    def __contains__(self, experiment_id: str) -> bool:
+        with self._lock:
+            return experiment_id in self._cubes
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cubes)
+
+    def add(self, result: ExperimentResult, observed_at: Optional[datetime] = None) -> None:
+        """Add a batch of result rows (counts since the previous batch).
+
+        A variant may appear once per channel and segment.  Rows are
+        bucketed by `observed_at`, then `result.observed_at`, then the
+        current time.
+        """
+        when = observed_at or result.observed_at or datetime.now(timezone.utc)
+        buckets = _buckets(when)
+        with self._lock:
+            experiment_id = result.experiment_id
+            cubes = self._cubes.get(experiment_id)
+            if cubes is None:
+                cubes = self._cubes[experiment_id] = {cuboid: {} for cuboid in _CUBOIDS}
+                while len(self._cubes) > self.max_experiments:
+                    evicted, _ = self._cubes.popitem(last=False)
+                    self._newest_day.pop(evicted, None)
+                    self.evicted += 1
+            else:
+                self._cubes.move_to_end(experiment_id)
+            if buckets["day"] > self._newest_day.get(experiment_id, ""):
+                self._newest_day[experiment_id] = buckets["day"]
+                self._expire(cubes, buckets["day"])
+            # Late rows older than the window still count in the untimed totals
+            expired = buckets["day"] < self._cutoff(self._newest_day[experiment_id])
+            for row in result.results:
+                values = {
+                    "variant": row.variant_id,
+                    "channel": row.channel or UNKNOWN,
+                    "segment": row.audience_segment or UNKNOWN,
+                }
+                metrics = (row.impressions, row.clicks, row.conversions, row.spend, row.revenue)
+                for (dims, grain), partitions in cubes.items():
+                    key = tuple(values[d] for d in dims)
+                    if grain is not None:
+                        if expired:
+                            continue
+                        key += (buckets[grain],)
+                        cells = partitions.setdefault(buckets["day"], {})
+                    else:
+                        cells = partitions.setdefault(None, {})
+                    totals = cells.get(key)
+                    if totals is None:
+                        cells[key] = list(metrics)
+                    else:
+                        for i in range(5):
+                            totals[i] += metrics[i]
+                self.rows += 1
+
+    def _cutoff(self, newest_day: str) -> str:
+        """Oldest day partition kept when `newest_day` is the latest."""
+        return (date.fromisoformat(newest_day) - timedelta(days=self.retention_days - 1)).isoformat()
+
+    def _expire(self, cubes: Dict, newest_day: str) -> None:
+        """Drop day partitions that fell out of the retention window."""
+        cutoff = self._cutoff(newest_day)
+        for (_, grain), partitions in cubes.items():
+            if grain is None:
+                continue
+            for day in [d for d in partitions if d < cutoff]:
+                del partitions[day]
+
+    def query(
+        self,
+        experiment_id: str,
+        by: Sequence[str] = (),
+        grain: Optional[str] = None,
+        where: Optional[Dict[str, str]] = None,
+    ) -> List[Dict[str, object]]:
+        """Totals and KPIs per cell of the requested slice, sorted by key.
+
+        `where` pins dimensions (and optionally `day`) to single values.
+        """
+        where = dict(where or {})
+        unknown = [d for d in list(by) + list(where) if d not in CUBE_DIMENSIONS + ("day",)]
+        if unknown or "day" in by:
+            raise ValueError(f"Unknown cube dimensions: {unknown or ['day']}; use grain for time")
+        if grain is not None and grain not in GRAINS:
+            raise ValueError(f"Unknown grain {grain!r}; expected one of {GRAINS}")
+        day = where.pop("day", None)
+        # A day filter needs a time-bucketed cuboid even if the output is not
+        lookup_grain = grain or ("day" if day is not None else None)
+        dims = tuple(d for d in CUBE_DIMENSIONS if d in by or d in where)
+        positions = [dims.index(d) for d in CUBE_DIMENSIONS if d in by]
+        pinned = [(dims.index(d), value) for d, value in where.items()]
+
+        with self._lock:
+            partitions = self._cubes.get(experiment_id, {}).get((dims, lookup_grain), {})
+            if day is not None:
+                partitions = {day: partitions.get(day, {})}
+            cells = [item for part in partitions.values() for item in part.items()]
+            records = []
+            for key, totals in cells:
+                if any(key[i] != value for i, value in pinned):
+                    continue
+                record: Dict[str, object] = {_OUTPUT_NAMES[dims[i]]: key[i] for i in positions}
+                if grain is not None:
+                    record[grain] = key[-1]
+                record.update(total_kpis(totals))
+                records.append(record)
+        order = [_OUTPUT_NAMES[d] for d in CUBE_DIMENSIONS if d in by] + ([grain] if grain else [])
+        records.sort(key=lambda r: tuple(r[k] for k in order))
+        return records
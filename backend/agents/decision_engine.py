@@ -0,0 +1,318 @@
+"""Bayesian winner selection for experiment results.
+
+Picking the variant with the highest observed profit ignores how much data
+each variant has.  This engine puts posteriors on each variant's conversion
+rate and revenue per conversion, samples them, and reports for each variant:
+
+- `prob_best`: the share of draws in which it has the highest value;
+- `expected_loss`: the expected value given up by choosing it over the
+  best variant in each draw (same units as the value);
+- `expected_value`: its posterior mean value.
+
+Model, per variant:
+
+- CVR ~ Beta(prior_alpha + conversions, prior_beta + clicks - conversions)
+- revenue per conversion = 1 / rate, with
+  rate ~ Gamma(1 + conversions, prior_aov + revenue) (exponential order
+  values with a conjugate Gamma prior worth one pseudo-order of
+  `prior_aov`, the experiment's pooled average order value).
+
+The value is posterior ROAS (`CVR * AOV * clicks / spend`) by default, or
+revenue per click (`"rpc"`) or plain CVR (`"cvr"`).  ROAS is undefined
+when a variant has no spend (the frontend sends a blank spend as 0), so
+such experiments are compared on revenue per click instead.  Draws that
+tie for best (for example all zero) are credited to a random tied
+variant, and an experiment without a single conversion is never
+`confident`.
+
+Everything is vectorized.  A batch of experiments is padded into
+(experiments, variants) arrays and sampled as (experiments, variants,
+draws) blocks, sized so that no block exceeds `max_block_cells` values.
+Draws are float32.  When a posterior shape parameter is at least
+`EXACT_BELOW`, draws come from a normal approximation (moment-matched for
+Beta, Wilson-Hilferty for Gamma), which needs one normal draw per value.
+Smaller shapes, where the approximations are poor, use NumPy's exact
+samplers.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..schemas.models import ExperimentResult, VariantPosterior
+
+
+METRICS = ("roas", "rpc", "cvr")
+METRIC_LABELS = {"roas": "ROAS", "rpc": "revenue per click", "cvr": "conversion rate"}
+
+# Shape parameters from which the normal approximations are used
+EXACT_BELOW = 10.0
+
+
+def _combine(approx: np.ndarray, draws: int, approximate, exact) -> np.ndarray:
+    """Draw approximated and exact cells separately; skip the merge when possible."""
+    if approx.all():
+        return approximate(approx)
+    out = np.empty((approx.size, draws), dtype=np.float32)
+    if approx.any():
+        out[approx] = approximate(approx)
+    out[~approx] = exact(~approx)
+    return out
+
+
+def _beta_draws(rng: np.random.Generator, a: np.ndarray, b: np.ndarray, draws: int) -> np.ndarray:
+    """(cells, draws) Beta draws for 1-D parameter arrays."""
+
+    def approximate(cells: np.ndarray) -> np.ndarray:
+        aa, bb = a[cells], b[cells]
+        total = aa + bb
+        mean = (aa / total).astype(np.float32)[:, None]
+        std = np.sqrt(aa * bb / (total * total * (total + 1))).astype(np.float32)[:, None]
+        z = rng.standard_normal((aa.size, draws), dtype=np.float32)
+        z *= std
+        z += mean
+        return np.clip(z, 0.0, 1.0, out=z)
+
+    def exact(cells: np.ndarray) -> np.ndarray:
+        return rng.beta(a[cells][:, None], b[cells][:, None], size=(int(cells.sum()), draws))
+
+    return _combine((a >= EXACT_BELOW) & (b >= EXACT_BELOW), draws, approximate, exact)
+
+
+def _gamma_draws(rng: np.random.Generator, k: np.ndarray, draws: int) -> np.ndarray:
+    """(cells, draws) unit-scale Gamma draws for a 1-D shape array."""
+
+    def approximate(cells: np.ndarray) -> np.ndarray:
+        kk = k[cells].astype(np.float32)[:, None]
+        c = 1.0 / (9.0 * kk)
+        z = rng.standard_normal((kk.size, draws), dtype=np.float32)
+        z *= np.sqrt(c)
+        z += 1.0 - c
+        np.maximum(z, 0.0, out=z)
+        cube = z * z
+        cube *= z
+        cube *= kk
+        return cube
+
+    def exact(cells: np.ndarray) -> np.ndarray:
+        return rng.standard_gamma(k[cells][:, None], size=(int(cells.sum()), draws))
+
+    return _combine(k >= EXACT_BELOW, draws, approximate, exact)
+
+
+@dataclass
+class VariantDecision:
+    variant_id: str
+    prob_best: float
+    expected_loss: float
+    expected_value: float
+
+
+@dataclass
+class ExperimentDecision:
+    experiment_id: str
+    winner_variant_id: str
+    variants: List[VariantDecision]
+    # Whether the winner is clear enough to stop the test
+    confident: bool
+    # The value the winner was chosen on; "rpc" when ROAS fell back for zero spend
+    metric: str = "roas"
+
+    @property
+    def winner(self) -> VariantDecision:
+        return next(v for v in self.variants if v.variant_id == self.winner_variant_id)
+
+    @property
+    def runner_up(self) -> Optional[VariantDecision]:
+        others = [v for v in self.variants if v.variant_id != self.winner_variant_id]
+        return min(others, key=lambda v: v.expected_loss) if others else None
+
+    def posteriors(self) -> List[VariantPosterior]:
+        return [
+            VariantPosterior(
+                variant_id=v.variant_id,
+                prob_best=round(v.prob_best, 4),
+                expected_loss=round(v.expected_loss, 6),
+                expected_value=round(v.expected_value, 6),
+            )
+            for v in self.variants
+        ]
+
+
+def observed_metric(metric: str, clicks: float, conversions: float, revenue: float, spend: float) -> str:
+    """The observed value of `metric` for one variant, formatted for summaries."""
+    if metric == "roas":
+        return f"{revenue / spend if spend else 0.0:.2f}x ROAS"
+    if metric == "rpc":
+        return f"${revenue / clicks if clicks else 0.0:,.2f} revenue per click"
+    return f"{conversions / clicks if clicks else 0.0:.2%} conversion rate"
+
+
+def pad_results(results: Sequence[ExperimentResult]) -> Tuple[np.ndarray, ...]:
+    """Stack per-variant counts into (experiments, max_variants) arrays."""
+    n_variants = max((len(r.results) for r in results), default=0)
+    shape = (len(results), n_variants)
+    clicks, conversions = np.zeros(shape), np.zeros(shape)
+    revenue, spend = np.zeros(shape), np.zeros(shape)
+    mask = np.zeros(shape, dtype=bool)
+    for i, result in enumerate(results):
+        n = len(result.results)
+        clicks[i, :n] = [v.clicks for v in result.results]
+        conversions[i, :n] = [v.conversions for v in result.results]
+        revenue[i, :n] = [v.revenue for v in result.results]
+        spend[i, :n] = [v.spend for v in result.results]
+        mask[i, :n] = True
+    return clicks, conversions, revenue, spend, mask
+
+
+class BayesianDecisionEngine:
+    """Probability-to-be-best and expected loss via vectorized Monte Carlo."""
+
+    def __init__(
+        self,
+        draws: int = 1000,
+        metric: str = "roas",
+        prior_alpha: float = 1.0,
+        prior_beta: float = 1.0,
+        prob_threshold: float = 0.95,
+        loss_threshold: float = 0.01,
+        seed: Optional[int] = 0,
+        max_block_cells: int = 4_000_000,
+    ) -> None:
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; expected one of {METRICS}")
+        self.draws = draws
+        self.metric = metric
+        self.prior_alpha = prior_alpha
+        self.prior_beta = prior_beta
+        self.prob_threshold = prob_threshold
+        # Relative to the winner's expected value
+        self.loss_threshold = loss_threshold
+        self.seed = seed
+        self.max_block_cells = max_block_cells
+
+    def evaluate_arrays(
+        self,
+        clicks: np.ndarray,
+        conversions: np.ndarray,
+        revenue: np.ndarray,
+        spend: np.ndarray,
+        mask: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (prob_best, expected_loss, expected_value), each (E, V).
+
+        Inputs are (experiments, variants) arrays; `mask` marks real variants
+        in padded rows.  Padded cells come back as NaN.
+        """
+        clicks = np.asarray(clicks, dtype=np.float64)
+        conversions = np.minimum(np.asarray(conversions, dtype=np.float64), clicks)
+        revenue = np.asarray(revenue, dtype=np.float64)
+        spend = np.asarray(spend, dtype=np.float64)
+        mask = np.ones(clicks.shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        rng = rng if rng is not None else np.random.default_rng(self.seed)
+
+        n_exp, n_var = clicks.shape
+        prob_best = np.full((n_exp, n_var), np.nan)
+        expected_loss = np.full((n_exp, n_var), np.nan)
+        expected_value = np.full((n_exp, n_var), np.nan)
+        if n_exp == 0 or n_var == 0:
+            return prob_best, expected_loss, expected_value
+
+        # Empirical-Bayes prior for order value: the experiment's pooled AOV
+        pooled_conv = np.where(mask, conversions, 0).sum(axis=1, keepdims=True)
+        pooled_rev = np.where(mask, revenue, 0).sum(axis=1, keepdims=True)
+        prior_aov = np.where(pooled_conv > 0, pooled_rev / np.maximum(pooled_conv, 1), 1.0)
+
+        alpha = self.prior_alpha + conversions
+        beta = self.prior_beta + clicks - conversions
+        shape = 1.0 + conversions
+        rate = prior_aov + revenue
+        if self.metric == "roas":
+            # Experiments with a zero-spend variant are compared on revenue per click
+            scale = np.where(self.zero_spend(spend, mask)[:, None], 1.0,
+                             np.divide(clicks, spend, out=np.zeros_like(spend), where=spend > 0))
+        else:
+            scale = np.ones_like(clicks)
+
+        block = max(1, self.max_block_cells // (n_var * self.draws))
+        for start in range(0, n_exp, block):
+            rows = slice(start, min(start + block, n_exp))
+            n_rows = rows.stop - rows.start
+            size = (n_rows, n_var, self.draws)
+            value = _beta_draws(rng, alpha[rows].ravel(), beta[rows].ravel(), self.draws).reshape(size)
+            if self.metric != "cvr":
+                # 1 / Gamma(shape, scale=1/rate) == rate / Gamma(shape, 1)
+                value /= _gamma_draws(rng, shape[rows].ravel(), self.draws).reshape(size)
+                value *= (rate[rows] * scale[rows]).astype(np.float32)[:, :, None]
+            valid = mask[rows]
+            value[~valid] = -np.inf
+
+            best = value.max(axis=1, keepdims=True)
+            winners = value.argmax(axis=1)  # (experiments, draws)
+            # argmax credits ties to the first variant; pick a random tied one instead
+            tied = value == best
+            tie_exp, tie_draw = np.nonzero(tied.sum(axis=1) > 1)
+            if tie_exp.size:
+                candidates = tied[tie_exp, :, tie_draw]  # (ties, variants)
+                noise = rng.random(candidates.shape)
+                winners[tie_exp, tie_draw] = np.where(candidates, noise, -1.0).argmax(axis=1)
+            # Offset each experiment's winner indices so one bincount counts them all
+            flat = (winners + np.arange(n_rows)[:, None] * n_var).ravel()
+            counts = np.bincount(flat, minlength=n_rows * n_var).reshape(n_rows, n_var)
+            mean = np.where(valid, value.mean(axis=2, dtype=np.float64), np.nan)
+            loss = best.mean(axis=2, dtype=np.float64) - mean
+            expected_loss[rows] = loss
+            expected_value[rows] = mean
+            prob_best[rows] = np.where(valid, counts / self.draws, np.nan)
+        return prob_best, expected_loss, expected_value
+
+    def zero_spend(self, spend: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Per experiment, whether a ROAS comparison must fall back to revenue per click."""
+        spend = np.asarray(spend, dtype=np.float64)
+        mask = np.ones(spend.shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        return (mask & (spend <= 0)).any(axis=1)
+
+    def decide_batch(self, results: Sequence[ExperimentResult]) -> List[ExperimentDecision]:
+        """Evaluate many experiments in one vectorized pass."""
+        results = [r for r in results]
+        if any(not r.results for r in results):
+            raise ValueError("Every experiment needs at least one variant result")
+        clicks, conversions, revenue, spend, mask = pad_results(results)
+        prob_best, expected_loss, expected_value = self.evaluate_arrays(
+            clicks, conversions, revenue, spend, mask
+        )
+        fallback = self.zero_spend(spend, mask) if self.metric == "roas" else np.zeros(len(results), dtype=bool)
+        has_data = conversions.sum(axis=1) > 0
+        decisions = []
+        for i, result in enumerate(results):
+            n = len(result.results)
+            variants = [
+                VariantDecision(
+                    variant_id=v.variant_id,
+                    prob_best=float(prob_best[i, j]),
+                    expected_loss=float(expected_loss[i, j]),
+                    expected_value=float(expected_value[i, j]),
+                )
+                for j, v in enumerate(result.results)
+            ]
+            # Lowest expected loss is the Bayes-optimal choice; equal losses go to
+            # the higher probability to be best
+            w = int(np.lexsort((-prob_best[i, :n], expected_loss[i, :n]))[0])
+            winner = variants[w]
+            tolerance = self.loss_threshold * max(winner.expected_value, 1e-12)
+            decisions.append(ExperimentDecision(
+                experiment_id=result.experiment_id,
+                winner_variant_id=winner.variant_id,
+                variants=variants,
+                # Without a single conversion there is no evidence to be confident about
+                confident=bool(has_data[i]) and (
+                    winner.prob_best >= self.prob_threshold or winner.expected_loss <= tolerance
+                ),
+                metric="rpc" if fallback[i] else self.metric,
+            ))
+        return decisions
+
+    def decide(self, result: ExperimentResult) -> ExperimentDecision:
+        return self.decide_batch([result])[0]
@@ -0,0 +1,159 @@
+"""Server-side KPIs for experiment results.
+
+Clients used to send `profit`, `cac` and `roas` with every `VariantResult`,
+and different jobs computed them differently.  They are now derived here
+from the raw counts, so every endpoint and agent uses the same numbers:
+
+- profit = revenue * margin / 100 - spend, where `margin` is the product's
+  gross margin in percent (as in `Product.margin`).  Without a margin,
+  revenue counts in full;
+- CAC = spend / conversions, ROAS = revenue / spend;
+- CTR = clicks / impressions, CVR = conversions / clicks,
+  CPC = spend / clicks.
+
+A variant reported once per channel or segment is summed into one row
+first, since the decision engine treats every row as an arm.
+
+A ratio with a zero denominator is 0.  `compute_kpis` works on arrays of
+any length, and `with_kpis_batch` flattens the variants of many
+experiments into one set of arrays, so a batch costs one pass per KPI.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..schemas.models import ExperimentResult, VariantResult
+
+
+KPI_FIELDS = ("profit", "cac", "roas", "ctr", "cvr", "cpc")
+
+# Money KPIs are rounded to cents
+_MONEY = ("profit", "cac", "cpc")
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    out = np.zeros(np.shape(numerator), dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+def compute_kpis(
+    impressions: np.ndarray,
+    clicks: np.ndarray,
+    spend: np.ndarray,
+    conversions: np.ndarray,
+    revenue: np.ndarray,
+    margin: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """Every KPI in `KPI_FIELDS` as an array matching the inputs.
+
+    `margin` is a percentage, either a scalar or one value per row; NaN
+    means no margin is known for that row.
+    """
+    impressions = np.asarray(impressions, dtype=np.float64)
+    clicks = np.asarray(clicks, dtype=np.float64)
+    spend = np.asarray(spend, dtype=np.float64)
+    conversions = np.asarray(conversions, dtype=np.float64)
+    revenue = np.asarray(revenue, dtype=np.float64)
+    if margin is None:
+        gross = revenue
+    else:
+        margin = np.broadcast_to(np.asarray(margin, dtype=np.float64), revenue.shape)
+        gross = np.where(np.isnan(margin), revenue, revenue * margin / 100.0)
+    kpis = {
+        "profit": gross - spend,
+        "cac": _ratio(spend, conversions),
+        "roas": _ratio(revenue, spend),
+        "ctr": _ratio(clicks, impressions),
+        "cvr": _ratio(conversions, clicks),
+        "cpc": _ratio(spend, clicks),
+    }
+    for name in _MONEY:
+        kpis[name] = np.round(kpis[name], 2)
+    return kpis
+
+
+def merge_variant_rows(result: ExperimentResult) -> ExperimentResult:
+    """`result` with one row per variant, in first-seen order.
+
+    Rows sharing a `variant_id` have their counts summed.  The merged row
+    keeps `channel` and `audience_segment` only where all its rows agree.
+    """
+    ids = [v.variant_id for v in result.results]
+    if len(set(ids)) == len(ids):
+        return result
+    groups: Dict[str, List[VariantResult]] = {}
+    for row in result.results:
+        groups.setdefault(row.variant_id, []).append(row)
+    merged = []
+    for variant_id, rows in groups.items():
+        channels = {r.channel for r in rows}
+        segments = {r.audience_segment for r in rows}
+        merged.append(VariantResult(
+            variant_id=variant_id,
+            impressions=sum(r.impressions for r in rows),
+            clicks=sum(r.clicks for r in rows),
+            spend=sum(r.spend for r in rows),
+            conversions=sum(r.conversions for r in rows),
+            revenue=sum(r.revenue for r in rows),
+            channel=channels.pop() if len(channels) == 1 else None,
+            audience_segment=segments.pop() if len(segments) == 1 else None,
+        ))
+    return result.model_copy(update={"results": merged})
+
+
+def with_kpis_batch(results: Sequence[ExperimentResult]) -> List[ExperimentResult]:
+    """Copies of `results` whose variants carry server-computed KPIs.
+
+    Client-supplied KPI values are replaced.  Each experiment's
+    `product_margin` applies to all of its variants, and repeated variant
+    ids are merged first with `merge_variant_rows`.
+    """
+    results = [merge_variant_rows(result) for result in results]
+    variants = [v for result in results for v in result.results]
+    n = len(variants)
+    margins = np.repeat(
+        [np.nan if r.product_margin is None else r.product_margin for r in results],
+        [len(r.results) for r in results],
+    )
+    kpis = compute_kpis(
+        np.fromiter((v.impressions for v in variants), dtype=np.float64, count=n),
+        np.fromiter((v.clicks for v in variants), dtype=np.float64, count=n),
+        np.fromiter((v.spend for v in variants), dtype=np.float64, count=n),
+        np.fromiter((v.conversions for v in variants), dtype=np.float64, count=n),
+        np.fromiter((v.revenue for v in variants), dtype=np.float64, count=n),
+        margins,
+    )
+    columns = [kpis[name].tolist() for name in KPI_FIELDS]
+    rows = iter(zip(*columns))
+    return [
+        result.model_copy(update={"results": [
+            v.model_copy(update=dict(zip(KPI_FIELDS, next(rows)))) for v in result.results
+        ]})
+        for result in results
+    ]
+
+
+def with_kpis(result: ExperimentResult) -> ExperimentResult:
+    return with_kpis_batch([result])[0]
+
+
+def total_kpis(totals: Sequence[float]) -> Dict[str, float]:
+    """Totals plus CTR, CVR, CPC and ROAS (0 when the denominator is 0).
+
+    `totals` is [impressions, clicks, conversions, spend, revenue], as kept
+    by the running aggregates and result cubes.
+    """
+    impressions, clicks, conversions, spend, revenue = totals
+    return {
+        "impressions": int(impressions),
+        "clicks": int(clicks),
+        "conversions": int(conversions),
+        "spend": round(spend, 2),
+        "revenue": round(revenue, 2),
+        "ctr": clicks / impressions if impressions else 0.0,
+        "cvr": conversions / clicks if clicks else 0.0,
+        "cpc": spend / clicks if clicks else 0.0,
+        "roas": revenue / spend if spend else 0.0,
+    }
@@ -1,17 +1,62 @@
-from ..schemas.models import ExperimentResult, NextTestRecommendation, VariantPlan
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Union
+
+from pydantic import ValidationError
+
+from ..schemas.models import ExperimentResult, NextTestRecommendation, SampleSizeRules, VariantPlan
+from .bandit import Allocation, ThompsonAllocator
+from .decision_engine import METRIC_LABELS, BayesianDecisionEngine, ExperimentDecision, observed_metric
+from .metrics import with_kpis, with_kpis_batch
+
+
+# Experiments per vectorized pass in recommend_next_tests_batch
+BATCH_CHUNK_SIZE = 1000
+
+
+def parse_result_line(line: Union[str, bytes], number: int) -> ExperimentResult:
+    """Parse one NDJSON line; errors name the line `number`."""
+    try:
+        return ExperimentResult.model_validate_json(line)
+    except ValidationError as e:
+        raise ValueError(f"Invalid experiment result on line {number}: {e}") from e
+
+
+def iter_results_ndjson(lines: Iterable[Union[str, bytes]]) -> Iterator[ExperimentResult]:
+    """Parse one `ExperimentResult` per NDJSON line; blank lines are skipped."""
+    for number, line in enumerate(lines, start=1):
+        if line.strip():
+            yield parse_result_line(line, number)
 
 
 class OptimizationAgent:
     """
     Agent responsible for analyzing experiment results and recommending next tests.
 
-    This placeholder implementation selects the winner from the provided ExperimentResult
-    and proposes a new test variant derived from the winning variant.
+    The winner is chosen by the Bayesian decision engine rather than taken from
+    `winner_variant_id`.  When the engine is not yet confident, the agent recommends
+    keeping the leader and runner-up in the test instead of starting a new one.
     """
 
-    def __init__(self) -> None:
-        # Initialize any necessary resources or models here (placeholder)
-        pass
+    def __init__(
+        self,
+        engine: Optional[BayesianDecisionEngine] = None,
+        allocator: Optional[ThompsonAllocator] = None,
+    ) -> None:
+        self.engine = engine or BayesianDecisionEngine()
+        self.allocator = allocator or ThompsonAllocator(self.engine, top_two=True, min_share=0.05)
+
+    def allocate_budget(
+        self,
+        result: ExperimentResult,
+        budget: Optional[float] = None,
+        rules: Optional[SampleSizeRules] = None,
+    ) -> Allocation:
+        """Split the next period's budget across the experiment's live variants.
+
+        Uses top-two Thompson sampling with a 5% exploration floor; variants below
+        `rules.min_spend_per_variant` are topped up first.
+        """
+        return self.allocator.allocate(result, budget=budget, rules=rules)
 
     def recommend_next_tests(self, result: ExperimentResult) -> NextTestRecommendation:
         """
@@ -23,15 +68,34 @@ class OptimizationAgent:
         Returns:
             NextTestRecommendation: A recommendation with baseline control variant and a test variant.
         """
-        # Use the winner_variant_id from the experiment result as the baseline
-        winner_id = result.winner_variant_id
-
-        # Generate a summary explaining why this variant won
-        summary = (
-            f"Variant {winner_id} showed the best performance based on the provided metrics. "
-            "We recommend using it as the control for the next experiment and testing a variation "
-            "to further optimize performance."
-        )
+        result = with_kpis(result)
+        return self._recommend(result, self.engine.decide(result))
+
+    def recommend_next_tests_batch(
+        self,
+        results: Iterable[ExperimentResult],
+        chunk_size: int = BATCH_CHUNK_SIZE,
+    ) -> Iterator[NextTestRecommendation]:
+        """
+        Recommend next tests for many experiments, yielding them in input order.
+
+        Results are consumed lazily, `chunk_size` at a time, and each chunk is decided
+        in one vectorized pass, so an NDJSON stream (see `iter_results_ndjson`) can be
+        processed without loading it whole.  Each chunk uses the engine's seed.
+        """
+        results = iter(results)
+        while True:
+            chunk = with_kpis_batch(list(islice(results, chunk_size)))
+            if not chunk:
+                return
+            for result, decision in zip(chunk, self.engine.decide_batch(chunk)):
+                yield self._recommend(result, decision)
+
+    def _recommend(self, result: ExperimentResult, decision: ExperimentDecision) -> NextTestRecommendation:
+        winner_id = decision.winner_variant_id
+        winner = decision.winner
+        runner_up = decision.runner_up
+        winner_result = next(v for v in result.results if v.variant_id == winner_id)
 
         # Create a control variant plan referencing the winner
         control_variant = VariantPlan(
@@ -40,13 +104,35 @@ class OptimizationAgent:
             description=f"Control variant based on winning variant {winner_id}"
         )
 
-        # Create a new test variant by appending a suffix to the winner id
-        new_variant_id = f"{winner_id}-variant2"
-        test_variant = VariantPlan(
-            variant_id=new_variant_id,
-            control=False,
-            description=f"New variant exploring alternative messaging or creative based on {winner_id}"
-        )
+        if decision.confident or runner_up is None:
+            # Generate a summary explaining why this variant won
+            observed = observed_metric(decision.metric, winner_result.clicks, winner_result.conversions,
+                                       winner_result.revenue, winner_result.spend)
+            summary = (
+                f"Variant {winner_id} showed the best {METRIC_LABELS[decision.metric]} ({observed}; "
+                f"{winner.prob_best:.0%} probability to be best, ${winner_result.profit:,.2f} profit). "
+                "We recommend using it as the control for the next experiment and testing a variation "
+                "to further optimize performance."
+            )
+            # Create a new test variant by appending a suffix to the winner id
+            new_variant_id = f"{winner_id}-variant2"
+            test_variant = VariantPlan(
+                variant_id=new_variant_id,
+                control=False,
+                description=f"New variant exploring alternative messaging or creative based on {winner_id}"
+            )
+        else:
+            summary = (
+                f"No clear winner yet: variant {winner_id} leads on {METRIC_LABELS[decision.metric]} "
+                f"with a {winner.prob_best:.0%} "
+                f"probability to be best. We recommend continuing the test against {runner_up.variant_id} "
+                "until the result is conclusive."
+            )
+            test_variant = VariantPlan(
+                variant_id=runner_up.variant_id,
+                control=False,
+                description=f"Keep testing runner-up {runner_up.variant_id} against {winner_id}"
+            )
 
         recommended_variants = [control_variant, test_variant]
 
@@ -54,4 +140,8 @@ class OptimizationAgent:
             experiment_id=result.experiment_id,
             recommended_variants=recommended_variants,
             summary=summary,
+            winner_variant_id=winner_id,
+            confident=decision.confident,
+            posteriors=decision.posteriors(),
+            results=result.results,
         )
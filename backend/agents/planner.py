@@ -0,0 +1,207 @@
+"""Combinatorial experiment planning across a whole catalog.
+
+`/experiment-plan` builds one plan for the first product and audience.
+`ExperimentPlanner` instead scores every product x audience x angle
+combination and yields plans for the best ones, best first.
+
+Each combination is scored by its expected profit per click:
+
+    cvr(product) * lift(segment) * weight(angle) * price * margin - cpc
+
+Where the numbers come from:
+
+- CVR and CPC come from the snapshot's `historical_performance`: the target
+  channel's, or all channels pooled when it is missing.
+- If per-product totals are supplied (for example
+  `IncrementalAggregates.windowed("product")`), each product's CVR is
+  shrunk towards the channel CVR by `prior_clicks` pseudo-clicks.
+- Per-segment totals (for example a `ResultCubes` query by segment) give a
+  segment's CVR relative to the overall CVR, shrunk the same way.
+- A missing margin counts as 100%, so revenue is used in full.
+
+Scores are computed with NumPy, one block of products at a time.  A
+running top-K is kept with `np.argpartition`, so memory is bounded by the
+block size and K, not by the catalog size.  `max_per_product` stops one
+strong product from filling the whole list.  K is the smaller of `top_k`
+and the number of plans the budget can fund at `min_spend_per_variant`
+per variant.  Plans are only built as the caller iterates.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+import hashlib
+import json
+import re
+
+import numpy as np
+
+from ..schemas.models import Audience, BusinessSnapshot, ExperimentPlan, Product, SampleSizeRules, VariantPlan
+
+
+# Angle -> description template for the test variant
+ANGLES: Dict[str, str] = {
+    "benefit": "Benefit-focused: {product} {benefit}",
+    "social_proof": "Social Proof: {product} user reviews",
+    "problem_solution": "Problem/Solution: {product} for {segment} who struggle with {pain_point}",
+    "objection": "Objection handling: {product} answers \"{objection}\"",
+}
+PLAN_METRICS = ["ctr", "cpc", "cvr", "roas", "net_profit"]
+VARIANTS_PER_PLAN = 2  # Control plus one angle
+DEFAULT_BLOCK = 1024  # Products scored per NumPy block
+
+
+@dataclass
+class RankedCombination:
+    product: Product
+    audience: Audience
+    angle: str
+    score: float  # Expected profit per click
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-")[:40] or "all"
+
+
+def experiment_id(product_id: str, segment: str, angle: str) -> str:
+    """Readable but unique id for a plan.
+
+    The slugs lose case, punctuation and length, so "SKU 1" and "sku-1" slug
+    alike; a hash of the exact product id and segment keeps ids distinct,
+    since sequential state and result cubes are keyed by them.
+    """
+    digest = hashlib.sha256(json.dumps([product_id, segment]).encode("utf-8")).hexdigest()[:8]
+    return f"exp_{_slug(product_id)}_{_slug(segment)}_{angle}_{digest}"
+
+
+def _shrunk_cvr(stats: Optional[Mapping[str, float]], prior_cvr: float, prior_clicks: float) -> float:
+    if not stats:
+        return prior_cvr
+    clicks = float(stats.get("clicks", 0))
+    conversions = float(stats.get("conversions", 0))
+    return (conversions + prior_cvr * prior_clicks) / (clicks + prior_clicks)
+
+
+class ExperimentPlanner:
+    """Ranks product x audience x angle combinations and yields the top plans."""
+
+    def __init__(
+        self,
+        angles: Optional[Mapping[str, float]] = None,
+        prior_clicks: float = 500.0,
+        block_size: int = DEFAULT_BLOCK,
+    ) -> None:
+        # Angle -> multiplier on the expected conversion rate
+        self.angles = dict(angles) if angles else {name: 1.0 for name in ANGLES}
+        unknown = set(self.angles) - set(ANGLES)
+        if unknown:
+            raise ValueError(f"Unknown angles: {sorted(unknown)}; expected some of {list(ANGLES)}")
+        self.prior_clicks = prior_clicks
+        self.block_size = block_size
+
+    def _channel_rates(self, snapshot: BusinessSnapshot) -> Tuple[float, float]:
+        """(CVR, CPC) for the target channel, or pooled over all channels."""
+        target = snapshot.guardrails.target_channel if snapshot.guardrails else None
+        rows = [h for h in snapshot.historical_performance if h.channel.lower() == (target or "").lower()]
+        rows = rows or snapshot.historical_performance
+        clicks = sum(h.clicks for h in rows)
+        conversions = sum(h.conversions for h in rows)
+        spend = sum(h.spend for h in rows)
+        return (conversions / clicks if clicks else 0.0), (spend / clicks if clicks else 0.0)
+
+    def rank(
+        self,
+        snapshot: BusinessSnapshot,
+        k: int,
+        product_stats: Optional[Mapping[str, Mapping[str, float]]] = None,
+        segment_stats: Optional[Mapping[str, Mapping[str, float]]] = None,
+        max_per_product: Optional[int] = None,
+    ) -> List[RankedCombination]:
+        """The `k` best combinations, best first, at most `max_per_product` per product."""
+        products, audiences = snapshot.products, snapshot.audiences or [Audience(segment="General Audience")]
+        angle_names = list(self.angles)
+        if k <= 0 or not products or not angle_names:
+            return []
+        cvr, cpc = self._channel_rates(snapshot)
+        product_stats = product_stats or {}
+        segment_stats = segment_stats or {}
+
+        lift = np.array([
+            _shrunk_cvr(segment_stats.get(a.segment), cvr, self.prior_clicks) / cvr if cvr else 1.0
+            for a in audiences
+        ])
+        weights = np.array([self.angles[name] for name in angle_names])
+        n_seg, n_ang = len(audiences), len(angle_names)
+
+        best_scores = np.empty(0)
+        best_index = np.empty(0, dtype=np.int64)
+        for start in range(0, len(products), self.block_size):
+            block = products[start:start + self.block_size]
+            product_cvr = np.array([_shrunk_cvr(product_stats.get(p.id), cvr, self.prior_clicks) for p in block])
+            value = np.array([p.price * (p.margin if p.margin is not None else 100.0) / 100.0 for p in block])
+            # (products, segments * angles)
+            scores = ((product_cvr * value)[:, None] * np.outer(lift, weights).ravel()[None, :] - cpc)
+            index = np.arange(scores.size, dtype=np.int64).reshape(scores.shape) + start * n_seg * n_ang
+            if max_per_product is not None and max_per_product < scores.shape[1]:
+                top = np.argpartition(-scores, max_per_product - 1, axis=1)[:, :max_per_product]
+                scores = np.take_along_axis(scores, top, axis=1)
+                index = np.take_along_axis(index, top, axis=1)
+            flat, index = scores.ravel(), index.ravel()
+            scores_all = np.concatenate([best_scores, flat])
+            index_all = np.concatenate([best_index, index])
+            if scores_all.size > k:
+                keep = np.argpartition(-scores_all, k - 1)[:k]
+                scores_all, index_all = scores_all[keep], index_all[keep]
+            best_scores, best_index = scores_all, index_all
+
+        # Stable order: score, then catalog position
+        order = np.lexsort((best_index, -best_scores))
+        ranked = []
+        for i in order:
+            flat_index = int(best_index[i])
+            p, rest = divmod(flat_index, n_seg * n_ang)
+            s, a = divmod(rest, n_ang)
+            ranked.append(RankedCombination(products[p], audiences[s], angle_names[a], float(best_scores[i])))
+        return ranked
+
+    def iter_plans(
+        self,
+        snapshot: BusinessSnapshot,
+        top_k: int = 10,
+        budget: Optional[float] = None,
+        min_spend_per_variant: float = 200.0,
+        min_conversions: int = 50,
+        product_stats: Optional[Mapping[str, Mapping[str, float]]] = None,
+        segment_stats: Optional[Mapping[str, Mapping[str, float]]] = None,
+        max_per_product: Optional[int] = None,
+    ) -> Iterator[ExperimentPlan]:
+        """Yield up to `top_k` plans, best first, that `budget` can fund."""
+        k = top_k
+        if budget is not None:
+            k = min(k, int(budget // (VARIANTS_PER_PLAN * min_spend_per_variant)))
+        rules = SampleSizeRules(min_spend_per_variant=min_spend_per_variant, min_conversions=min_conversions)
+        for combination in self.rank(snapshot, k, product_stats, segment_stats, max_per_product):
+            yield self._plan(combination, rules, snapshot)
+
+    def _plan(self, combination: RankedCombination, rules: SampleSizeRules, snapshot: BusinessSnapshot) -> ExperimentPlan:
+        product, audience, angle = combination.product, combination.audience, combination.angle
+        description = ANGLES[angle].format(
+            product=product.name,
+            segment=audience.segment,
+            benefit=(product.benefits or ["saves time"])[0],
+            pain_point=(audience.pain_points or ["everyday problems"])[0],
+            objection=(product.objections or ["Is it worth it?"])[0],
+        )
+        return ExperimentPlan(
+            experiment_id=experiment_id(product.id, audience.segment, angle),
+            objective="Increase ROAS",
+            hypothesis=f"{angle.replace('_', ' ').capitalize()} creative targeting {audience.segment} "
+                       f"for {product.name} will outperform control",
+            variants=[
+                VariantPlan(variant_id="A", control=True, description="Control variant (Generic)"),
+                VariantPlan(variant_id="B", control=False, description=description),
+            ],
+            metrics=list(PLAN_METRICS),
+            sample_size_rules=rules,
+            guardrails=snapshot.guardrails,
+            priority_score=round(combination.score, 6),
+        )
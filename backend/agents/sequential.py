@@ -0,0 +1,259 @@
+"""Sequential testing with always-valid p-values (mixture SPRT).
+
+A fixed-horizon test has to wait for `min_conversions` before anyone may
+look at it.  The mixture sequential probability ratio test (mSPRT) instead
+gives p-values that stay valid however often they are checked, so a
+losing variant can be stopped as soon as the evidence is there.
+
+Each challenger is compared with the control on conversion rate per
+click.  With the difference `d = cvr_b - cvr_a`, its estimated variance
+`V = cvr_a(1 - cvr_a)/clicks_a + cvr_b(1 - cvr_b)/clicks_b` and a normal
+mixing prior of variance `tau**2` on the true difference, the likelihood
+ratio against "no difference" is::
+
+    L = sqrt(V / (V + tau**2)) * exp(tau**2 * d**2 / (2 * V * (V + tau**2)))
+
+The always-valid p-value is the running minimum of `1 / L` over every
+look.  A challenger is decided once its p-value falls to
+`alpha / challengers` (Bonferroni across challengers).  It is a "winner"
+if it beats the control and a "loser" otherwise.  The call is latched: the
+p-value never rises again, but the sign of the difference can still flip
+after the decision, and a paused loser must not come back as a winner.
+
+State per variant is five running sums, so applying an hourly delta is
+O(1).  Checking a test is O(variants) and does not look at past deltas.
+
+`SequentialTestRegistry` keeps at most `max_tests` tests in memory, least
+recently updated first out.  With a `state_dir`, every test is written
+there after each update and read back on a miss, so evicted tests and
+restarts lose nothing.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from ..schemas.models import ExperimentResult, SequentialStatus, VariantResult
+
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 2
+CONTINUE, WINNER, LOSER, CONTROL = "continue", "winner", "loser", "control"
+
+# Running sums kept per variant, in this order
+_FIELDS = ("impressions", "clicks", "conversions", "spend", "revenue")
+
+
+@dataclass
+class SequentialDecision:
+    experiment_id: str
+    # True once the test can stop: a challenger won, or every challenger lost
+    stop: bool
+    winner_variant_id: Optional[str]
+    variants: List[SequentialStatus]
+
+
+class SequentialTest:
+    """Running sufficient statistics and always-valid p-values for one test."""
+
+    def __init__(
+        self,
+        experiment_id: str,
+        control_id: Optional[str] = None,
+        alpha: float = 0.05,
+        tau: float = 0.01,
+    ) -> None:
+        self.experiment_id = experiment_id
+        self.control_id = control_id
+        self.alpha = alpha
+        # Prior standard deviation of the CVR difference, in absolute terms
+        self.tau = tau
+        self.totals: Dict[str, List[float]] = {}
+        self.p_values: Dict[str, float] = {}
+        # WINNER or LOSER per challenger, fixed once first reached
+        self.decided: Dict[str, str] = {}
+
+    def update(self, delta: VariantResult) -> None:
+        """Add one variant's counts since the last update."""
+        if self.control_id is None:
+            self.control_id = delta.variant_id
+        totals = self.totals.setdefault(delta.variant_id, [0, 0, 0, 0.0, 0.0])
+        totals[0] += delta.impressions
+        totals[1] += delta.clicks
+        totals[2] += delta.conversions
+        totals[3] += delta.spend
+        totals[4] += delta.revenue
+
+    def result(self, winner_variant_id: Optional[str] = None) -> ExperimentResult:
+        """The accumulated totals as an `ExperimentResult`."""
+        variants = [
+            VariantResult(variant_id=vid, **dict(zip(_FIELDS, totals)))
+            for vid, totals in self.totals.items()
+        ]
+        return ExperimentResult(
+            experiment_id=self.experiment_id,
+            results=variants,
+            winner_variant_id=winner_variant_id or self.control_id or "",
+        )
+
+    def decide(self) -> SequentialDecision:
+        """Look at the test: refresh every challenger's p-value and classify it."""
+        ids = list(self.totals)
+        if self.control_id not in self.totals:
+            return SequentialDecision(self.experiment_id, False, None, [])
+        challengers = [vid for vid in ids if vid != self.control_id]
+        stats = np.array([self.totals[vid] for vid in [self.control_id] + challengers], dtype=np.float64)
+        clicks, conversions = stats[:, 1], np.minimum(stats[:, 2], stats[:, 1])
+        cvr = np.divide(conversions, clicks, out=np.zeros_like(clicks), where=clicks > 0)
+        variance = np.divide(cvr * (1.0 - cvr), clicks, out=np.zeros_like(clicks), where=clicks > 0)
+
+        diff = cvr[1:] - cvr[0]
+        v = variance[1:] + variance[0]
+        tau2 = self.tau ** 2
+        # Without variance (no clicks, or 0% / 100% CVR everywhere) there is no evidence yet
+        informative = (v > 0) & (clicks[1:] > 0) & (clicks[0] > 0)
+        safe_v = np.where(informative, v, 1.0)
+        log_lr = 0.5 * np.log(safe_v / (safe_v + tau2)) + tau2 * diff ** 2 / (2 * safe_v * (safe_v + tau2))
+        p_now = np.where(informative, np.minimum(1.0, np.exp(-log_lr)), 1.0)
+        lift = np.divide(diff, cvr[0], out=np.zeros_like(diff), where=cvr[0] > 0)
+
+        threshold = self.alpha / max(len(challengers), 1)
+        statuses = [SequentialStatus(variant_id=self.control_id, status=CONTROL, p_value=1.0, lift=0.0)]
+        for vid, p, d, rel in zip(challengers, p_now, diff, lift):
+            p_value = min(self.p_values.get(vid, 1.0), float(p))
+            self.p_values[vid] = p_value
+            status = self.decided.get(vid, CONTINUE)
+            if status == CONTINUE and p_value <= threshold:
+                status = self.decided[vid] = WINNER if d > 0 else LOSER
+            statuses.append(SequentialStatus(
+                variant_id=vid, status=status, p_value=round(p_value, 6), lift=round(float(rel), 6),
+            ))
+
+        winners = [s for s in statuses if s.status == WINNER]
+        winner_id = None
+        if winners:
+            winner_id = max(winners, key=lambda s: s.lift).variant_id
+        elif challengers and all(s.status == LOSER for s in statuses[1:]):
+            winner_id = self.control_id
+        return SequentialDecision(self.experiment_id, winner_id is not None, winner_id, statuses)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "version": STATE_VERSION,
+            "experiment_id": self.experiment_id,
+            "control_id": self.control_id,
+            "alpha": self.alpha,
+            "tau": self.tau,
+            "totals": self.totals,
+            "p_values": self.p_values,
+            "decided": self.decided,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "SequentialTest":
+        # Version 1 predates latched decisions; its tests simply have none yet
+        if data.get("version") not in (1, STATE_VERSION):
+            raise ValueError(f"Unsupported sequential test state version: {data.get('version')}")
+        test = cls(data["experiment_id"], data["control_id"], data["alpha"], data["tau"])
+        test.totals = data["totals"]
+        test.p_values = data["p_values"]
+        test.decided = data.get("decided", {})
+        return test
+
+
+class SequentialTestRegistry:
+    """Live sequential tests by experiment id; safe to share between threads."""
+
+    def __init__(
+        self,
+        alpha: float = 0.05,
+        tau: float = 0.01,
+        max_tests: int = 10000,
+        state_dir: Optional[str] = None,
+    ) -> None:
+        self.alpha = alpha
+        self.tau = tau
+        self.max_tests = max_tests
+        self.state_dir = state_dir
+        self.tests: "OrderedDict[str, SequentialTest]" = OrderedDict()
+        self._lock = threading.Lock()
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+    def _path(self, experiment_id: str) -> str:
+        # Experiment ids come from clients; never use them as file names
+        name = hashlib.sha256(experiment_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.state_dir, f"{name}.json")
+
+    def _load(self, experiment_id: str) -> Optional[SequentialTest]:
+        if not self.state_dir:
+            return None
+        try:
+            with open(self._path(experiment_id), encoding="utf-8") as f:
+                return SequentialTest.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("unreadable sequential test state", extra={"experiment_id": experiment_id, "error": str(e)})
+            return None
+
+    def _save(self, test: SequentialTest) -> None:
+        """Write the test's state atomically, so a crash never leaves half a file."""
+        fd, tmp = tempfile.mkstemp(dir=self.state_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(test.to_dict(), f)
+            os.replace(tmp, self._path(test.experiment_id))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _get(self, experiment_id: str) -> SequentialTest:
+        test = self.tests.get(experiment_id)
+        if test is not None:
+            self.tests.move_to_end(experiment_id)
+            return test
+        test = self._load(experiment_id)
+        if test is None:
+            test = SequentialTest(experiment_id, alpha=self.alpha, tau=self.tau)
+        self.tests[experiment_id] = test
+        while len(self.tests) > self.max_tests:
+            evicted, _ = self.tests.popitem(last=False)
+            if not self.state_dir:
+                logger.warning("sequential test evicted without a state dir", extra={"experiment_id": evicted})
+        return test
+
+    def apply(self, deltas: ExperimentResult) -> Tuple[ExperimentResult, SequentialDecision]:
+        """Fold one batch of per-variant deltas into its experiment's test.
+
+        Returns the accumulated totals and the decision after this look.  The
+        first variant ever reported for an experiment is its control.
+        """
+        with self._lock:
+            test = self._get(deltas.experiment_id)
+            for delta in deltas.results:
+                test.update(delta)
+            totals = test.result(deltas.winner_variant_id)
+            totals.product_margin = deltas.product_margin
+            decision = test.decide()
+            if self.state_dir:
+                self._save(test)
+            return totals, decision
+
+    def reset(self, experiment_id: str) -> None:
+        with self._lock:
+            self.tests.pop(experiment_id, None)
+            if self.state_dir:
+                try:
+                    os.remove(self._path(experiment_id))
+                except FileNotFoundError:
+                    pass
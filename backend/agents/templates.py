@@ -0,0 +1,293 @@
+"""Precompiled copy templates for bulk creative generation.
+
+Creative copy used to be built with f-strings per variant.  Here copy
+comes from a library of `{field}` templates keyed by brand voice.  Each
+template is parsed and validated once (`compile_template`), and rendering
+is a plain `str.format_map`.  For each (voice, channel) pair,
+`TemplateEngine` prepares its hooks, headlines, bodies and call to action
+together with the channel's headline length limit, and caches the result.
+
+A template is only used when the context has every field it names.  Plans
+carry no product name, so templates mentioning `{product}` are skipped
+unless the caller supplies one; no placeholder text reaches the copy.
+
+Guardrails are compiled once per batch: required terms and avoid words are
+lowercased ahead of time, and each creative's copy is lowercased once.
+The pass behaves like the one in `/creative-variants`: append the
+disclaimer and any missing required terms to the body, and report avoid
+words as `needs_fix`.
+
+`render_batch` renders one creative per variant.  `iter_permutations`
+renders each template once per variant and then walks every hook x
+headline x body combination lazily, so a permutation costs only the
+guardrails pass and the `CreativeVariant` itself.
+"""
+
+from dataclasses import dataclass
+from itertools import product as cartesian
+from string import Formatter
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+import threading
+
+from ..schemas.models import CreativeVariant, Guardrails
+
+
+DEFAULT_VOICE = "default"
+
+# Variant letter -> (hook, headline); other variants use the fallback
+_DEFAULT_BY_VARIANT = {
+    "A": ("Stop scrolling!", "The best solution."),
+    "B": ("Tired of wasting time?", "Save hours every day."),
+    "C": ("See what everyone is talking about.", "Rated 5 stars by thousands."),
+}
+
+# Voice -> copy library.  "by_variant" keeps the classic A/B/C copy and the
+# first body is the classic body, so one-per-variant copy matches every
+# voice; the lists are what permutations are drawn from.
+VOICE_LIBRARY: Dict[str, Dict[str, object]] = {
+    DEFAULT_VOICE: {
+        "by_variant": _DEFAULT_BY_VARIANT,
+        "fallback": ("Discover {description}", "Learn More"),
+        "hooks": [hook for hook, _ in _DEFAULT_BY_VARIANT.values()] + ["Discover {description}"],
+        "headlines": [headline for _, headline in _DEFAULT_BY_VARIANT.values()] + ["Learn More"],
+        "bodies": ["Experience the difference with our latest offering. {description}."],
+        "call_to_action": "Shop Now",
+    },
+    "scientific": {
+        "by_variant": _DEFAULT_BY_VARIANT,
+        "fallback": ("Discover {description}", "Learn More"),
+        "hooks": ["What the research says about {product}.", "Tested, measured, proven.",
+                  "Discover {description}"],
+        "headlines": ["Formulated to perform.", "Backed by science.", "Learn More"],
+        "bodies": ["Experience the difference with our latest offering. {description}.", "{product}: {description}."],
+        "call_to_action": "Shop Now",
+    },
+    "playful": {
+        "by_variant": _DEFAULT_BY_VARIANT,
+        "fallback": ("Discover {description}", "Learn More"),
+        "hooks": ["Okay, hear us out...", "Your new favorite thing?", "Discover {description}"],
+        "headlines": ["Meet {product}.", "You'll wonder how you lived without it.", "Learn More"],
+        "bodies": ["Experience the difference with our latest offering. {description}.", "{description}. Yes, really."],
+        "call_to_action": "Shop Now",
+    },
+    "premium": {
+        "by_variant": _DEFAULT_BY_VARIANT,
+        "fallback": ("Discover {description}", "Learn More"),
+        "hooks": ["Crafted for those who notice.", "Discover {description}"],
+        "headlines": ["{product}, refined.", "Quality you can feel.", "Learn More"],
+        "bodies": ["Experience the difference with our latest offering. {description}.", "{product}. {description}."],
+        "call_to_action": "Shop Now",
+    },
+}
+
+# Headline length limits per channel (characters)
+CHANNEL_HEADLINE_LIMITS = {"meta": 40, "google": 30, "tiktok": 100}
+
+
+class CompiledTemplate:
+    """A `{field}` template, parsed and validated once."""
+
+    __slots__ = ("source", "fields")
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        fields: List[str] = []
+        for _, field, spec, conversion in Formatter().parse(source):
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion:
+                raise ValueError(f"Unsupported template field {{{field}}} in {source!r}")
+            fields.append(field)
+        self.fields = frozenset(fields)
+
+    def renders(self, context: Mapping[str, object]) -> bool:
+        """Whether `context` has every field the template uses."""
+        return self.fields.issubset(context.keys())
+
+    def render(self, context: Mapping[str, object]) -> str:
+        return self.source.format_map(context)
+
+
+_compiled: Dict[str, CompiledTemplate] = {}
+
+
+def compile_template(source: str) -> CompiledTemplate:
+    """Compile `source`, reusing earlier compilations of the same text."""
+    template = _compiled.get(source)
+    if template is None:
+        template = _compiled[source] = CompiledTemplate(source)
+    return template
+
+
+def _truncate(text: str, limit: Optional[int]) -> str:
+    if limit is None or len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0]
+    return cut or text[:limit]
+
+
+@dataclass
+class TemplateSet:
+    """One voice's templates compiled for one channel."""
+
+    voice: str
+    channel: str
+    by_variant: Dict[str, Tuple[CompiledTemplate, CompiledTemplate]]
+    fallback: Tuple[CompiledTemplate, CompiledTemplate]
+    hooks: List[CompiledTemplate]
+    headlines: List[CompiledTemplate]
+    bodies: List[CompiledTemplate]
+    call_to_action: str
+    headline_limit: Optional[int]
+
+    def pair_for(self, variant_id: str) -> Tuple[CompiledTemplate, CompiledTemplate]:
+        return self.by_variant.get(variant_id[-1:] if variant_id else "A", self.fallback)
+
+
+class CompiledGuardrails:
+    """Guardrails prepared once for checking many creatives."""
+
+    def __init__(self, guardrails: Optional[Guardrails]) -> None:
+        self.active = guardrails is not None
+        self.disclaimer = guardrails.disclaimer if guardrails else None
+        self.required = [(term, term.lower()) for term in (guardrails.required_terms if guardrails else []) if term]
+        self.avoid = [(word, word.lower()) for word in (guardrails.avoid_words if guardrails else []) if word]
+
+    def with_disclaimer(self, body: str) -> str:
+        if self.disclaimer and self.disclaimer not in body:
+            return f"{body} {self.disclaimer}"
+        return body
+
+    def apply(self, hook: str, headline: str, body: str) -> Tuple[str, Dict[str, object]]:
+        """Return the fixed body and the guardrails report."""
+        if not self.active:
+            return body, {"status": "pass", "issues": []}
+        body = self.with_disclaimer(body)
+        blob = f"{body} {headline} {hook}".lower()
+        for term, lowered in self.required:
+            if lowered not in blob:
+                body += f" {term}."
+                blob = f"{body} {headline} {hook}".lower()
+        issues = [f"Avoided word found: '{word}'" for word, lowered in self.avoid if lowered in blob]
+        return body, {"status": "needs_fix" if issues else "pass", "issues": issues}
+
+
+def voice_for(brand_voice: Optional[str]) -> str:
+    """The library voice named in a free-text brand voice, else the default."""
+    text = (brand_voice or "").lower()
+    for voice in VOICE_LIBRARY:
+        if voice != DEFAULT_VOICE and voice in text:
+            return voice
+    return DEFAULT_VOICE
+
+
+class TemplateEngine:
+    """Compiles template sets per (voice, channel) and renders creatives in bulk."""
+
+    def __init__(self, library: Optional[Mapping[str, Mapping[str, object]]] = None) -> None:
+        self.library = dict(library or VOICE_LIBRARY)
+        self._sets: Dict[Tuple[str, str], TemplateSet] = {}
+        self._lock = threading.Lock()
+
+    def template_set(self, voice: str = DEFAULT_VOICE, channel: str = "Meta") -> TemplateSet:
+        key = (voice if voice in self.library else DEFAULT_VOICE, channel.lower())
+        cached = self._sets.get(key)
+        if cached is not None:
+            return cached
+        entry = self.library[key[0]]
+        pair = lambda texts: (compile_template(texts[0]), compile_template(texts[1]))  # noqa: E731
+        compiled = TemplateSet(
+            voice=key[0],
+            channel=key[1],
+            by_variant={vid: pair(texts) for vid, texts in entry["by_variant"].items()},
+            fallback=pair(entry["fallback"]),
+            hooks=[compile_template(t) for t in entry["hooks"]],
+            headlines=[compile_template(t) for t in entry["headlines"]],
+            bodies=[compile_template(t) for t in entry["bodies"]],
+            call_to_action=str(entry["call_to_action"]),
+            headline_limit=CHANNEL_HEADLINE_LIMITS.get(key[1]),
+        )
+        with self._lock:
+            return self._sets.setdefault(key, compiled)
+
+    def _creative(
+        self,
+        variant_id: str,
+        hook: str,
+        headline: str,
+        body: str,
+        templates: TemplateSet,
+        guardrails: CompiledGuardrails,
+    ) -> CreativeVariant:
+        """`headline` must already be truncated to the channel's limit."""
+        body, report = guardrails.apply(hook, headline, body)
+        return CreativeVariant(
+            variant_id=variant_id,
+            hook=hook,
+            primary_text=body,
+            headline=headline,
+            call_to_action=templates.call_to_action,
+            guardrails_report=report,
+        )
+
+    def render_batch(
+        self,
+        contexts: Sequence[Mapping[str, object]],
+        guardrails: Optional[Guardrails] = None,
+        voice: Optional[str] = None,
+        channel: Optional[str] = None,
+    ) -> List[CreativeVariant]:
+        """One creative per context; each context needs `variant_id` and `description`.
+
+        The hook and headline follow the variant letter (A, B, C), and the
+        body is the voice's first body template the context can fill.
+        """
+        templates = self.template_set(voice or voice_for(guardrails.brand_voice if guardrails else None),
+                                      channel or (guardrails.target_channel if guardrails else "Meta"))
+        checks = CompiledGuardrails(guardrails)
+        limit = templates.headline_limit
+        creatives = []
+        fields: frozenset = frozenset()
+        body = templates.bodies[0]
+        for context in contexts:
+            variant_id = str(context["variant_id"])
+            hook, headline = templates.pair_for(variant_id)
+            # Contexts in a batch usually share their fields; pick the body once per field set
+            if context.keys() != fields:
+                fields = frozenset(context.keys())
+                body = next((t for t in templates.bodies if t.renders(context)), None)
+                if body is None:
+                    raise ValueError(f"No {templates.voice} body template can be filled from {sorted(fields)}")
+            creatives.append(self._creative(
+                variant_id, hook.render(context), _truncate(headline.render(context), limit), body.render(context),
+                templates, checks,
+            ))
+        return creatives
+
+    def iter_permutations(
+        self,
+        context: Mapping[str, object],
+        guardrails: Optional[Guardrails] = None,
+        voice: Optional[str] = None,
+        channel: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CreativeVariant]:
+        """Yield hook x headline x body permutations for one variant.
+
+        Each template the context can fill is rendered once per variant, and
+        permutations only recombine the rendered strings.  Ids are
+        `<variant_id>-p<n>`.
+        """
+        templates = self.template_set(voice or voice_for(guardrails.brand_voice if guardrails else None),
+                                      channel or (guardrails.target_channel if guardrails else "Meta"))
+        checks = CompiledGuardrails(guardrails)
+        hooks = [t.render(context) for t in templates.hooks if t.renders(context)]
+        headlines = [_truncate(t.render(context), templates.headline_limit)
+                     for t in templates.headlines if t.renders(context)]
+        # The disclaimer depends only on the body, so append it once per body
+        bodies = [checks.with_disclaimer(t.render(context)) for t in templates.bodies if t.renders(context)]
+        base = str(context["variant_id"])
+        for n, (hook, headline, body) in enumerate(cartesian(hooks, headlines, bodies)):
+            if limit is not None and n >= limit:
+                return
+            yield self._creative(f"{base}-p{n}", hook, headline, body, templates, checks)
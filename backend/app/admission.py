@@ -0,0 +1,178 @@
+"""Admission control and load shedding for the image generation routes.
+
+Generation endpoints are sync and hold a threadpool worker for as long as
+Bria takes to answer.  Without a limit, a slow upstream lets them occupy
+every worker and the whole API, `/health` included, stops responding.
+
+`AdmissionMiddleware` gates each configured route with a bounded queue in
+front of a fixed number of concurrent slots:
+
+- a request is admitted straight away while a slot is free;
+- otherwise it waits in the route's queue for at most `max_wait_s`;
+- when the queue is already full it is rejected at once with 429;
+- when its wait times out it is rejected with 503.
+
+Both rejections carry a `Retry-After` header estimated from the route's
+recent service time.  Waiting happens on the event loop, so queued
+requests do not consume threadpool workers, and routes that are not
+gated (`/health`, `/score-creatives`, `/apply-guardrails`, ...) keep the
+remaining workers.  Keep the sum of `max_concurrent` across gated routes
+well below the threadpool size (40 by default in AnyIO).
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, Optional
+import asyncio
+import json
+import math
+import os
+import time
+
+
+@dataclass
+class RouteLimit:
+    """Capacity settings for one gated route."""
+
+    max_concurrent: int = 4
+    max_queue: int = 16
+    max_wait_s: float = 10.0
+
+
+@dataclass
+class RouteStats:
+    """Counters exposed for monitoring a gated route."""
+
+    admitted: int = 0
+    rejected_queue_full: int = 0
+    rejected_timeout: int = 0
+    active: int = 0
+    queued: int = 0
+    avg_service_s: float = 0.0
+
+
+class AdmissionRejected(Exception):
+    """Raised by `RouteGate.acquire` when a request is shed."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass
+class RouteGate:
+    """Bounded queue plus concurrency slots for a single route.
+
+    All methods must be called from the event loop thread.
+    """
+
+    limit: RouteLimit
+    stats: RouteStats = field(default_factory=RouteStats)
+    _waiters: Deque["asyncio.Future[None]"] = field(default_factory=deque)
+
+    def retry_after(self) -> int:
+        """Estimate seconds until a retry is likely to be admitted."""
+        service = self.stats.avg_service_s or self.limit.max_wait_s
+        backlog = (len(self._waiters) + 1) / max(1, self.limit.max_concurrent)
+        return max(1, math.ceil(service * backlog))
+
+    async def acquire(self) -> None:
+        if self.stats.active < self.limit.max_concurrent and not self._waiters:
+            self.stats.active += 1
+            self.stats.admitted += 1
+            return
+        if len(self._waiters) >= self.limit.max_queue:
+            self.stats.rejected_queue_full += 1
+            raise AdmissionRejected(429, "Generation queue is full, retry later", self.retry_after())
+
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.stats.queued = len(self._waiters)
+        try:
+            await asyncio.wait_for(waiter, self.limit.max_wait_s)
+        except asyncio.TimeoutError:
+            self.stats.rejected_timeout += 1
+            raise AdmissionRejected(503, "Generation capacity exhausted, retry later", self.retry_after())
+        except BaseException:
+            # Client went away; hand the slot on if we had just been granted it
+            if waiter.done() and not waiter.cancelled():
+                self.release(0.0)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self.stats.queued = len(self._waiters)
+        self.stats.admitted += 1
+
+    def release(self, service_s: float) -> None:
+        if service_s > 0:
+            previous = self.stats.avg_service_s
+            self.stats.avg_service_s = service_s if previous == 0 else 0.8 * previous + 0.2 * service_s
+        # Hand the slot directly to the oldest live waiter
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.stats.queued = len(self._waiters)
+                return
+        self.stats.active -= 1
+        self.stats.queued = 0
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying `RouteGate`s to POST requests by path."""
+
+    def __init__(self, app: Any, limits: Dict[str, RouteLimit]) -> None:
+        self.app = app
+        self.gates = {path: RouteGate(limit) for path, limit in limits.items()}
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {path: vars(gate.stats).copy() for path, gate in self.gates.items()}
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        gate: Optional[RouteGate] = None
+        if scope["type"] == "http" and scope.get("method") == "POST":
+            gate = self.gates.get(scope.get("path", ""))
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await gate.acquire()
+        except AdmissionRejected as rejected:
+            await _send_rejection(send, rejected)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release(time.monotonic() - started)
+
+
+async def _send_rejection(send: Any, rejected: AdmissionRejected) -> None:
+    body = json.dumps({"detail": rejected.detail}).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": rejected.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(rejected.retry_after).encode("latin-1")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def limits_from_env(paths: Iterable[str]) -> Dict[str, RouteLimit]:
+    """Build the same `RouteLimit` for each path from `ADMISSION_*` variables."""
+    limit = RouteLimit(
+        max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "4")),
+        max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "16")),
+        max_wait_s=float(os.getenv("ADMISSION_MAX_WAIT_S", "10")),
+    )
+    return {path: RouteLimit(**vars(limit)) for path in paths}
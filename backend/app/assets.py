@@ -0,0 +1,209 @@
+"""Content-addressed local store for generated images.
+
+Every generated `image_url` is fetched once and its bytes are stored on
+disk under their SHA-256 digest, so identical images (such as the mock
+placeholder, which is the same URL for every cell) are stored once.
+`/assets/{hash}` serves them with `FileResponse`, which uses the server's
+zero-copy `pathsend` extension where available.  Responses carry a strong
+`ETag` equal to the hash and an immutable `Cache-Control`, since the
+content of a hash can never change.
+
+Downloads run on a small thread pool (`ingest_many`), so a request waits
+for all of its images in parallel and at most `timeout` seconds.  Fetches
+still running at the deadline finish in the background, and later
+requests for the same URL find the stored digest.  The URL -> digest map
+is an LRU of at most `max_urls` entries; a URL that falls out of it is
+simply fetched again, and its bytes dedupe by hash on write.
+
+The store is enabled by setting `ASSET_STORE_DIR`.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Optional
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+
+try:
+    import requests  # type: ignore  # Only needed to fetch remote images
+except Exception:
+    requests = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Served when a requested derivative could not be rendered: the original
+# stands in for it, so clients must revalidate rather than keep it forever.
+FALLBACK_CACHE_CONTROL = "no-cache"
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Leading bytes of the image formats Bria and the placeholders return
+_MAGIC = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+Fetcher = Callable[[str], bytes]
+
+
+def _http_fetch(url: str, max_bytes: int) -> bytes:
+    if requests is None:
+        raise RuntimeError("requests is not installed")
+    response = requests.get(url, timeout=30, stream=True)
+    response.raise_for_status()
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(64 * 1024):
+        size += len(chunk)
+        if size > max_bytes:
+            raise ValueError(f"Image larger than {max_bytes} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def sniff_media_type(head: bytes) -> str:
+    """Guess an image media type from its first bytes."""
+    for magic, media_type in _MAGIC:
+        if head.startswith(magic):
+            return media_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class AssetStore:
+    """Stores image bytes by SHA-256 under `root/objects/ab/abcdef...`."""
+
+    def __init__(
+        self,
+        root: str,
+        fetch: Optional[Fetcher] = None,
+        max_bytes: int = 20 * 1024 * 1024,
+        workers: int = 4,
+        max_urls: int = 10000,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_urls = max_urls
+        self._fetch = fetch or (lambda url: _http_fetch(url, max_bytes))
+        self._by_url: "OrderedDict[str, str]" = OrderedDict()
+        self._url_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asset-fetch")
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+    def _known_digest(self, url: str) -> Optional[str]:
+        """Digest recorded for `url`, refreshing its LRU position; hold `_lock`."""
+        digest = self._by_url.get(url)
+        if digest is not None:
+            self._by_url.move_to_end(url)
+        return digest
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def path_for(self, digest: str) -> Optional[str]:
+        """Return the file path of a stored asset, or None if unknown."""
+        if not _HASH_RE.match(digest):
+            return None
+        path = self._object_path(digest)
+        return path if os.path.isfile(path) else None
+
+    def put_bytes(self, data: bytes) -> str:
+        """Store `data` if it is new and return its hash."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if os.path.isfile(path):
+            return digest
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest
+
+    def ingest_url(self, url: str) -> Optional[str]:
+        """Fetch `url` once and return the hash of its content.
+
+        Concurrent calls for the same URL share one download.  Returns None
+        if the image cannot be fetched.
+        """
+        with self._lock:
+            digest = self._known_digest(url)
+            if digest is not None:
+                return digest
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+        with url_lock:
+            with self._lock:
+                digest = self._known_digest(url)
+            if digest is not None:
+                return digest
+            try:
+                digest = self.put_bytes(self._fetch(url))
+            except Exception as e:
+                logger.warning("asset fetch failed", extra={"url": url, "error": str(e)})
+            finally:
+                # Record the digest and drop the per-URL lock together, whether
+                # or not the fetch worked, so failed URLs do not leak locks
+                with self._lock:
+                    if digest is not None:
+                        self._by_url[url] = digest
+                        while len(self._by_url) > self.max_urls:
+                            self._by_url.popitem(last=False)
+                    self._url_locks.pop(url, None)
+            return digest
+
+    def ingest_many(self, urls: Iterable[str], timeout: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """Ingest `urls` in parallel, waiting at most `timeout` seconds.
+
+        Returns the digest (or None on failure) of every URL that finished in
+        time; URLs still downloading are left out and complete in the
+        background.
+        """
+        digests: Dict[str, Optional[str]] = {}
+        pending = {}
+        for url in dict.fromkeys(urls):
+            with self._lock:
+                digest = self._known_digest(url)
+            if digest is not None:
+                digests[url] = digest
+            else:
+                pending[self._pool.submit(self.ingest_url, url)] = url
+        if pending:
+            done, _ = wait(pending, timeout=timeout)
+            for future in done:
+                digests[pending[future]] = future.result()
+        return digests
+
+    def media_type(self, digest: str) -> str:
+        path = self.path_for(digest)
+        if path is None:
+            return "application/octet-stream"
+        with open(path, "rb") as f:
+            return sniff_media_type(f.read(16))
+
+
+def asset_store_from_env() -> Optional[AssetStore]:
+    """Build an `AssetStore` rooted at `ASSET_STORE_DIR`, if it is set."""
+    root = os.getenv("ASSET_STORE_DIR")
+    if not root:
+        return None
+    return AssetStore(
+        root,
+        workers=int(os.getenv("ASSET_FETCH_WORKERS", "4")),
+        max_urls=int(os.getenv("ASSET_URL_CACHE_SIZE", "10000")),
+    )
@@ -0,0 +1,163 @@
+"""Thumbnail and channel-size derivatives of stored images.
+
+Derivatives are rendered with Pillow in a `ProcessPoolExecutor`, so
+decoding and resampling neither block the event loop nor hold the GIL of
+the API process.  Each derivative is cached on disk next to the asset
+store, keyed by source hash plus size name, and served through
+`/assets/{hash}?size=<name>`.
+
+A source that fails to decode is remembered per `(digest, size)` for
+`failure_ttl` seconds, so repeated requests for it fall back to the
+original at once instead of resubmitting it to the pool each time.
+
+Pillow is optional: without it `DerivativePipeline.get` returns None and
+the asset route falls back to the original image.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+try:
+    from PIL import Image, ImageOps  # type: ignore
+except Exception:
+    # Pillow is only needed for derivatives; originals are served without it
+    Image = None  # type: ignore
+    ImageOps = None  # type: ignore
+
+from .assets import AssetStore
+
+
+logger = logging.getLogger(__name__)
+
+# Target (width, height) per derivative; images are centre-cropped to fit
+DERIVATIVE_SIZES: Dict[str, Tuple[int, int]] = {
+    "thumb": (320, 320),
+    "feed": (1080, 1080),
+    "story": (1080, 1920),
+    "banner": (1200, 628),
+}
+
+
+def render_derivative(src_path: str, dst_path: str, width: int, height: int) -> str:
+    """Resize `src_path` to `width`x`height` as JPEG at `dst_path`.
+
+    Runs in a worker process, so it must stay a picklable module-level
+    function.
+    """
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        fitted = ImageOps.fit(img, (width, height), Image.LANCZOS)
+    directory = os.path.dirname(dst_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".jpg")
+    os.close(fd)
+    try:
+        fitted.save(tmp_path, "JPEG", quality=85, optimize=True, progressive=True)
+        os.replace(tmp_path, dst_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return dst_path
+
+
+class DerivativePipeline:
+    """Create and cache resized copies of assets in a process pool."""
+
+    def __init__(
+        self, store: AssetStore, max_workers: Optional[int] = None, failure_ttl: float = 300.0
+    ) -> None:
+        self.store = store
+        self.max_workers = max_workers
+        self.failure_ttl = failure_ttl
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[Tuple[str, str], "Future[str]"] = {}
+        # (digest, size) -> monotonic time until which the render is not retried
+        self._failed: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self.failures = 0
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def path_for(self, digest: str, size: str) -> str:
+        return os.path.join(self.store.root, "derivatives", digest[:2], f"{digest}_{size}.jpg")
+
+    def _submit(self, digest: str, size: str) -> Optional["Future[str]"]:
+        """Start rendering a derivative unless it exists or is in flight."""
+        src = self.store.path_for(digest)
+        if src is None or size not in DERIVATIVE_SIZES or not self.available:
+            return None
+        dst = self.path_for(digest, size)
+        key = (digest, size)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                return pending
+            if os.path.isfile(dst):
+                return None
+            retry_at = self._failed.get(key)
+            if retry_at is not None:
+                if time.monotonic() < retry_at:
+                    return None
+                del self._failed[key]
+            if self._executor is None:
+                # Spawn rather than fork: the API process runs logging and worker threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            width, height = DERIVATIVE_SIZES[size]
+            future = self._executor.submit(render_derivative, src, dst, width, height)
+            self._pending[key] = future
+        future.add_done_callback(lambda f: self._finished(key, f))
+        return future
+
+    def _finished(self, key: Tuple[str, str], future: "Future[str]") -> None:
+        failed = future.exception() is not None
+        with self._lock:
+            self._pending.pop(key, None)
+            if failed:
+                now = time.monotonic()
+                # Drop expired entries so the map only holds live failures
+                for stale in [k for k, retry_at in self._failed.items() if retry_at <= now]:
+                    del self._failed[stale]
+                self._failed[key] = now + self.failure_ttl
+                self.failures += 1
+        if failed:
+            logger.warning(
+                "derivative render failed",
+                extra={"asset": key[0], "size": key[1], "error": str(future.exception())},
+            )
+
+    def warm(self, digest: str, sizes: Iterable[str] = ("thumb",)) -> None:
+        """Queue derivatives in the background without waiting for them."""
+        for size in sizes:
+            self._submit(digest, size)
+
+    async def get(self, digest: str, size: str) -> Optional[str]:
+        """Return the path of a derivative, rendering it off-loop if needed.
+
+        Returns None when the source is unknown, Pillow is missing or the
+        image cannot be decoded.
+        """
+        future = self._submit(digest, size)
+        if future is not None:
+            try:
+                await asyncio.wrap_future(future)
+            except Exception:
+                return None
+        dst = self.path_for(digest, size)
+        return dst if os.path.isfile(dst) else None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,94 @@
+"""In-process event bus for live generation progress.
+
+Generation runs in threadpool workers; WebSocket clients live on the event
+loop.  `GenerationEventBus.publish()` may be called from any thread and
+hands each event to every subscriber's loop with `call_soon_threadsafe`.
+Filtering against the subscriber's topics happens on the loop thread.
+
+Events are plain dicts with a `type` (`queued`, `started`, `completed` or
+`failed`), the `variant_id` they concern and, for explore grid cells, the
+`parent_id` of the base creative.  A subscriber receives an event when its
+topics contain the variant id, the parent id, or `"*"`.
+
+Events are published on behalf of a tenant, and a subscriber bound to a
+tenant only ever sees that tenant's events, `"*"` included.  The tenant is
+used for routing only and is not part of the event sent to clients.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set
+import asyncio
+import threading
+import time
+
+
+@dataclass(eq=False)
+class Subscriber:
+    """One WebSocket client's view of the bus."""
+
+    loop: asyncio.AbstractEventLoop
+    queue: "asyncio.Queue[Dict[str, Any]]"
+    topics: Set[str] = field(default_factory=set)
+    dropped: int = 0
+    # None only for in-process listeners, which see every tenant
+    tenant: Optional[str] = None
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        return (
+            "*" in self.topics
+            or event.get("variant_id") in self.topics
+            or event.get("parent_id") in self.topics
+        )
+
+    def offer(self, event: Dict[str, Any], force: bool = False) -> None:
+        """Queue an event, dropping the oldest one if the client lags behind."""
+        if not force and not self.matches(event):
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class GenerationEventBus:
+    """Fan generation events out to subscribed WebSocket clients."""
+
+    def __init__(self, max_queue: int = 256) -> None:
+        self.max_queue = max_queue
+        self._subscribers: Set[Subscriber] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop, tenant: Optional[str] = None) -> Subscriber:
+        subscriber = Subscriber(loop=loop, queue=asyncio.Queue(self.max_queue), tenant=tenant)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(
+        self,
+        event_type: str,
+        variant_id: Optional[str],
+        parent_id: Optional[str] = None,
+        tenant: Optional[str] = None,
+        **fields: Any,
+    ) -> None:
+        """Publish an event for `tenant`'s subscribers; safe to call from any thread."""
+        if variant_id is None:
+            return
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s.tenant is None or s.tenant == tenant]
+        if not subscribers:
+            return
+        event = {"type": event_type, "variant_id": variant_id, "ts": time.time(), **fields}
+        if parent_id is not None:
+            event["parent_id"] = parent_id
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; it will unsubscribe itself
+                pass
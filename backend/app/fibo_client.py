@@ -22,6 +22,7 @@ from dataclasses import dataclass
 from typing import Dict, Any, Optional
 import os
 import json
+import logging
 
 try:
     import requests  # type: ignore  # External dependency used only when FIBO_API_KEY is set
@@ -32,6 +33,16 @@ except Exception:
     requests = None  # type: ignore
 
 
+logger = logging.getLogger(__name__)
+
+# Mock and error images are served from here; they carry no content
+PLACEHOLDER_HOST = "https://placehold.co/"
+
+
+def is_placeholder(url: Optional[str]) -> bool:
+    """True for the mock and error placeholder images."""
+    return bool(url) and url.startswith(PLACEHOLDER_HOST)
+
 @dataclass
 class FiboImageSpec:
     """Typed representation of an image specification for FIBO.
@@ -49,10 +60,15 @@ class FiboImageSpec:
 
 @dataclass
 class FiboImageResult:
-    """Return type for image generation calls."""
+    """Return type for image generation calls.
+
+    `is_fallback` is True when the image is the error placeholder returned
+    after a failed API call, so callers can avoid caching it.
+    """
 
     image_url: str
     resolved_spec: Dict[str, Any]
+    is_fallback: bool = False
 
 
 def generate_fibo_image(spec: Dict[str, Any], prompt: str) -> FiboImageResult:
@@ -117,7 +133,10 @@ def generate_fibo_image(spec: Dict[str, Any], prompt: str) -> FiboImageResult:
         # If the service returns a 202, the request is asynchronous; we
         # could poll the status_url here but for now fall back to mock
         if response.status_code != 200:
-             print(f"Bria API Error Check: {response.text}")
+            logger.warning(
+                "Bria API returned non-200",
+                extra={"status_code": response.status_code, "body": response.text[:500]},
+            )
         response.raise_for_status()
         data = response.json()
         # Navigate the response to extract the image URL; according to
@@ -130,12 +149,10 @@ def generate_fibo_image(spec: Dict[str, Any], prompt: str) -> FiboImageResult:
         if not image_url:
             raise ValueError("Missing image_url in FIBO response")
         return FiboImageResult(image_url=image_url, resolved_spec=spec.copy())
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"Bria API Error: {e}")
+    except Exception:
+        logger.exception("Bria API request failed")
         # In case of network failure, bad status, or JSON decoding
         # errors we return a deterministic error placeholder.  In a
         # production setting you might log the exception.
         fallback_url = f"https://placehold.co/600x400/png?text=Image+Error"
-        return FiboImageResult(image_url=fallback_url, resolved_spec=spec.copy())
+        return FiboImageResult(image_url=fallback_url, resolved_spec=spec.copy(), is_fallback=True)
@@ -0,0 +1,157 @@
+"""Structured, non-blocking logging for the backend.
+
+All loggers under the `backend` namespace hand their records to a
+`QueueHandler`; a `QueueListener` thread formats them as JSON lines and does
+the actual I/O, so request threads never block on a file or terminal write.
+
+Configuration is read from the environment:
+
+- `LOG_LEVEL`: level for the `backend` logger (default `INFO`).
+- `LOG_LEVELS`: per-logger overrides, e.g.
+  `backend.app.fibo_client=DEBUG,backend.app.cells=WARNING`.
+- `LOG_FILE`: optional JSON log file, rotated at `LOG_MAX_BYTES`
+  (default 10 MB) keeping `LOG_BACKUP_COUNT` files (default 5).
+- `ERROR_LOG_FILE`: errors and above are appended here (default
+  `backend_error.log`), with the same rotation settings.
+- `LOG_CELL_SAMPLE_RATE`: fraction of per-cell generation messages to keep
+  (default 0.1).  Warnings and errors are never sampled out.
+"""
+
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, List, Optional
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+
+
+# Logger for high-frequency per-cell messages (explore grids, regenerations)
+CELL_LOGGER = "backend.app.cells"
+
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects.
+
+    Fields passed through `extra=` are included at the top level.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep roughly `rate` of records below WARNING, deterministically.
+
+    With a rate of 0.1 every tenth record is kept.  Warnings and errors
+    always pass.
+    """
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = max(0.0, min(1.0, rate))
+        self._every = round(1 / self.rate) if self.rate > 0 else 0
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        if self._every == 0:
+            return False
+        return next(self._counter) % self._every == 0
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels: Dict[str, str] = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _rotating_handler(path: str, level: int) -> RotatingFileHandler:
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+        encoding="utf-8",
+        delay=True,
+    )
+    handler.setLevel(level)
+    return handler
+
+
+def configure_logging(force: bool = False) -> None:
+    """Install the queue-based JSON logging pipeline (idempotent).
+
+    Args:
+        force: Tear down a previous configuration and re-read the
+            environment; mainly useful in tests.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None and not force:
+            return
+        shutdown_logging()
+
+        formatter = JsonFormatter()
+        handlers: List[logging.Handler] = [logging.StreamHandler(sys.stderr)]
+        log_file = os.getenv("LOG_FILE")
+        if log_file:
+            handlers.append(_rotating_handler(log_file, logging.NOTSET))
+        error_file = os.getenv("ERROR_LOG_FILE", "backend_error.log")
+        if error_file:
+            handlers.append(_rotating_handler(error_file, logging.ERROR))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        backend_logger = logging.getLogger("backend")
+        backend_logger.handlers = [QueueHandler(log_queue)]
+        backend_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        backend_logger.propagate = False
+
+        for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+            logging.getLogger(name).setLevel(level)
+
+        cell_logger = logging.getLogger(CELL_LOGGER)
+        cell_logger.filters = [
+            SamplingFilter(float(os.getenv("LOG_CELL_SAMPLE_RATE", "0.1")))
+        ]
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -2,9 +2,16 @@ import os
 from dotenv import load_dotenv
 
 load_dotenv()
+import asyncio
+import functools
+import hashlib
+import json
+import logging
 import random
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from backend.schemas.models import (
     BusinessSnapshot,
     ExperimentPlan,
@@ -17,20 +24,204 @@ from backend.schemas.models import (
     NextTestRecommendation,
     Guardrails,
 )
-from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from backend.agents.cubes import ResultCubes
+from backend.agents.decision_engine import METRIC_LABELS, BayesianDecisionEngine, ExperimentDecision, observed_metric
+from backend.agents.metrics import with_kpis, with_kpis_batch
+from backend.agents.optimizer_agent import BATCH_CHUNK_SIZE, parse_result_line
+from backend.agents.planner import ExperimentPlanner
+from backend.agents.sequential import LOSER, SequentialTestRegistry
+from backend.agents.templates import TemplateEngine
+from pydantic import BaseModel, TypeAdapter
+from typing import Dict, Any, List, Optional, Tuple
+
+from .fibo_client import FiboImageResult, generate_fibo_image, is_placeholder
+from . import profiling
+from .admission import AdmissionMiddleware, limits_from_env
+from .assets import ASSET_CACHE_CONTROL, FALLBACK_CACHE_CONTROL, asset_store_from_env
+from .derivatives import DERIVATIVE_SIZES, DerivativePipeline
+from .phash import NearDuplicateIndex, perceptual_hash
+from .events import GenerationEventBus
+from .logging_config import CELL_LOGGER, configure_logging
+from .result_cache import GenerationCache
+from .scoring import ScoreCache
+from .spec_index import SpecIndex
+from .scheduler import BULK, CREATIVE, INTERACTIVE, SPECULATIVE, scheduler_from_env
+from .speculative import prerenderer_from_env
+
+
+configure_logging()
+logger = logging.getLogger(__name__)
+cell_logger = logging.getLogger(CELL_LOGGER)
+
+# Shared upstream capacity for every Bria call, ordered by priority class
+scheduler = scheduler_from_env()
+# Only consulted while speculative pre-rendering is enabled, to serve its renders
+result_cache = GenerationCache(int(os.getenv("RESULT_CACHE_SIZE", "2048")))
+# Rubric scores keyed by creative content; the seed makes scores reproducible
+score_cache = ScoreCache(int(os.getenv("SCORE_CACHE_SIZE", "10000")), seed=int(os.getenv("SCORE_SEED", "0")))
+event_bus = GenerationEventBus()
+# Local content-addressed copies of generated images (enabled by ASSET_STORE_DIR)
+asset_store = asset_store_from_env()
+# Longest a request waits for its images to be stored before responding without asset_url
+ASSET_INGEST_TIMEOUT = float(os.getenv("ASSET_INGEST_TIMEOUT", "2.0"))
+derivatives = (
+    DerivativePipeline(asset_store, failure_ttl=float(os.getenv("DERIVATIVE_FAILURE_TTL", "300")))
+    if asset_store is not None
+    else None
+)
+# Perceptual hashes of explore cells per experiment, for cross-grid dedupe
+duplicate_index = NearDuplicateIndex(threshold=int(os.getenv("PHASH_THRESHOLD", "6")))
+# Specs rendered so far, for instant previews while a new render runs
+spec_index = SpecIndex(int(os.getenv("SPEC_INDEX_SIZE", "10000")))
+# Posterior winner selection for /results; seeded so answers are reproducible
+decision_engine = BayesianDecisionEngine(draws=int(os.getenv("DECISION_DRAWS", "1000")))
+# Running totals and always-valid p-values for incremental /results calls
+sequential_tests = SequentialTestRegistry(
+    alpha=float(os.getenv("SEQUENTIAL_ALPHA", "0.05")),
+    max_tests=int(os.getenv("SEQUENTIAL_MAX_TESTS", "10000")),
+    state_dir=os.getenv("SEQUENTIAL_STATE_DIR") or None,
+)
+# Compiled copy templates, cached per brand voice and channel
+template_engine = TemplateEngine()
+# Incremental deltas pre-aggregated by variant, channel, segment and time for dashboards
+result_cubes = ResultCubes(
+    max_experiments=int(os.getenv("RESULT_CUBE_EXPERIMENTS", "1000")),
+    retention_days=int(os.getenv("RESULT_CUBE_RETENTION_DAYS", "90")),
+)
+
+
+def _tenant_id(x_tenant_id: Optional[str], x_api_key: Optional[str]) -> str:
+    """Identify the caller for fair queuing; API keys are hashed, never stored.
+
+    `X-Tenant-Id` is client-controlled, so it is only honoured when
+    `TRUST_TENANT_HEADER` says a trusted proxy sets it (and strips any value
+    sent by the client); otherwise the tenant is derived from the API key.
+    """
+    if x_tenant_id and os.getenv("TRUST_TENANT_HEADER", "").lower() in ("1", "true", "yes", "on"):
+        return x_tenant_id
+    if x_api_key:
+        return "key:" + hashlib.sha256(x_api_key.encode("utf-8")).hexdigest()[:12]
+    return "anonymous"
+
+
+def _publish_result(
+    result: FiboImageResult, variant_id: Optional[str], parent_id: Optional[str], tenant: str
+) -> None:
+    if result.is_fallback:
+        event_bus.publish("failed", variant_id, parent_id, tenant, image_url=result.image_url)
+        return
+    event_bus.publish(
+        "completed",
+        variant_id,
+        parent_id,
+        tenant,
+        image_url=result.image_url,
+        image_status="fibo" if os.getenv("FIBO_API_KEY") else "mocked",
+        fibo_spec=result.resolved_spec,
+    )
+
+
+def _render(
+    spec: Dict[str, Any],
+    prompt: str,
+    priority: str,
+    tenant: str,
+    variant_id: Optional[str] = None,
+    parent_id: Optional[str] = None,
+    preview_url: Optional[str] = None,
+    use_cache: bool = True,
+) -> FiboImageResult:
+    """Generate a FIBO image once the scheduler grants an upstream slot.
+
+    With speculative pre-rendering enabled, identical spec/prompt pairs are
+    served from the result cache without waiting for a slot; otherwise, or
+    with `use_cache=False`, every call renders afresh.  Progress is
+    published on the event bus when a `variant_id` is given; the `queued`
+    event carries `preview_url` so clients can show it straight away.
+    """
+    event_bus.publish("queued", variant_id, parent_id, tenant, preview_url=preview_url)
+    use_cache = use_cache and speculator is not None
+    cached = result_cache.get(spec, prompt) if use_cache else None
+    if cached is not None:
+        _publish_result(cached, variant_id, parent_id, tenant)
+        return cached
+    with scheduler.slot(priority, tenant):
+        event_bus.publish("started", variant_id, parent_id, tenant)
+        try:
+            result = generate_fibo_image(spec, prompt)
+        except Exception as e:
+            event_bus.publish("failed", variant_id, parent_id, tenant, error=str(e))
+            raise
+    if use_cache:
+        result_cache.put(spec, prompt, result)
+    if not result.is_fallback:
+        spec_index.insert(result.resolved_spec, result.image_url, scope=tenant)
+    _publish_result(result, variant_id, parent_id, tenant)
+    return result
+
+
+def _attach_assets(creatives: List[CreativeVariant]) -> None:
+    """Store the creatives' images locally and point `asset_url` at them.
+
+    Images are fetched in parallel, and the request waits at most
+    `ASSET_INGEST_TIMEOUT` seconds; creatives whose download is still running
+    keep only `image_url`.
+    """
+    if asset_store is None:
+        return
+    eligible = [c for c in creatives if c.image_status != "error" and c.image_url]
+    if not eligible:
+        return
+    digests = asset_store.ingest_many([c.image_url for c in eligible], timeout=ASSET_INGEST_TIMEOUT)
+    for creative in eligible:
+        digest = digests.get(creative.image_url)
+        if digest:
+            creative.asset_url = f"/assets/{digest}"
+            if derivatives is not None:
+                # Grid tiles ask for thumbnails first; render them ahead of time
+                derivatives.warm(digest, ("thumb",))
+
+
+@functools.lru_cache(maxsize=4096)
+def _asset_phash(digest: str) -> Optional[int]:
+    """Perceptual hash of a stored asset; assets are immutable, so cache it."""
+    path = asset_store.path_for(digest) if asset_store is not None else None
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return perceptual_hash(f.read())
+    except Exception as e:
+        logger.warning("perceptual hash failed", extra={"asset": digest, "error": str(e)})
+        return None
+
 
-from .fibo_client import generate_fibo_image
+# Optional idle-time pre-rendering of likely regeneration patches
+speculator = prerenderer_from_env(
+    lambda spec, prompt: _render(spec, prompt, SPECULATIVE, "speculative"),
+    scheduler,
+    result_cache,
+)
 
 
 app = FastAPI(title="Agentic Ad Optimizer API")
 
+# Opt-in request profiling; nothing is installed unless PROFILING_ENABLED is set
+if profiling.is_enabled():
+    profiling.install(app)
+
+# Routes that call Bria and may be slow; they are queued and shed under load
+GENERATION_ROUTES = ["/creative-variants", "/regenerate-image", "/explore-variants"]
+app.add_middleware(AdmissionMiddleware, limits=limits_from_env(GENERATION_ROUTES))
+
+# CORS stays outermost so load-shedding responses remain readable by the UI
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Score-Cache-Hits", "X-Score-Cache-Misses", "X-Score-Duplicates"],
 )
 
 
@@ -41,8 +232,9 @@ def root():
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint to confirm backend is online and check FIBO mode."""
+    # Async so it runs on the event loop and never waits for a busy threadpool
     is_live = bool(os.getenv("FIBO_API_KEY"))
     return {
         "status": "ok",
@@ -51,6 +243,101 @@ def health_check():
     }
 
 
+@app.get("/metrics/scheduler")
+def scheduler_metrics():
+    """Queue-wait metrics per generation priority class."""
+    metrics: Dict[str, Any] = {
+        "capacity": scheduler.capacity,
+        "classes": scheduler.metrics(),
+        "result_cache": result_cache.stats(),
+        "score_cache": score_cache.stats(),
+    }
+    if speculator is not None:
+        metrics["speculative"] = {**speculator.stats(), "credits_remaining": speculator.credits_remaining()}
+    return metrics
+
+
+@app.get("/assets/{asset_hash}")
+async def get_asset(
+    asset_hash: str,
+    size: Optional[str] = None,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """Serve a stored image by content hash with immutable caching.
+
+    `size` selects a derivative (`thumb`, `feed`, `story`, `banner`); it is
+    rendered in a process pool on first request.  If it cannot be rendered
+    the original is served instead, with `no-cache` so that the size URL
+    is revalidated rather than cached as immutable.
+    """
+    path = asset_store.path_for(asset_hash) if asset_store is not None else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    if size is not None and size not in DERIVATIVE_SIZES:
+        raise HTTPException(status_code=400, detail=f"Unknown size '{size}'")
+    media_type = asset_store.media_type(asset_hash)
+    etag, cache_control = f'"{asset_hash}"', ASSET_CACHE_CONTROL
+    if size is not None:
+        derivative = await derivatives.get(asset_hash, size) if derivatives is not None else None
+        if derivative is not None:
+            path, media_type, etag = derivative, "image/jpeg", f'"{asset_hash}-{size}"'
+        else:
+            cache_control = FALLBACK_CACHE_CONTROL
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+@app.websocket("/ws/generation")
+async def generation_events(websocket: WebSocket):
+    """Push generation events for the creatives a client subscribes to.
+
+    Clients send `{"action": "subscribe" | "unsubscribe", "ids": [...]}`.
+    Ids are creative variant ids; subscribing to a base creative also
+    delivers events for its explore grid cells, and `"*"` delivers all of
+    the caller's own events.  The caller's tenant is identified like on
+    the HTTP routes; browsers, which cannot set headers on a WebSocket, may
+    pass the API key as the `api_key` query parameter.  A malformed message
+    gets an `error` ack and the connection stays open.
+    """
+    tenant = _tenant_id(
+        websocket.headers.get("x-tenant-id"),
+        websocket.headers.get("x-api-key") or websocket.query_params.get("api_key"),
+    )
+    await websocket.accept()
+    subscriber = event_bus.subscribe(asyncio.get_running_loop(), tenant)
+
+    async def pump() -> None:
+        while True:
+            await websocket.send_json(await subscriber.queue.get())
+
+    sender = asyncio.create_task(pump())
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+                if not isinstance(message, dict) or not isinstance(message.get("ids") or [], list):
+                    raise ValueError("expected an object with an 'ids' list")
+            except ValueError as e:
+                logger.warning("bad websocket message", extra={"error": str(e)})
+                subscriber.offer({"type": "error", "error": f"Invalid message: {e}"}, force=True)
+                continue
+            ids = [str(i) for i in message.get("ids") or []]
+            if message.get("action") == "subscribe":
+                subscriber.topics.update(ids)
+            elif message.get("action") == "unsubscribe":
+                subscriber.topics.difference_update(ids)
+            # Acks go through the same queue so only one task writes to the socket
+            subscriber.offer({"type": "subscribed", "ids": sorted(subscriber.topics)}, force=True)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        event_bus.unsubscribe(subscriber)
+
+
 @app.post("/experiment-plan", response_model=ExperimentPlan)
 def create_experiment_plan(snapshot: BusinessSnapshot):
     """Generate a simple experiment plan from a business snapshot."""
@@ -81,68 +368,60 @@ def create_experiment_plan(snapshot: BusinessSnapshot):
     return plan
 
 
+class PlanningRequest(BaseModel):
+    """Request model for combinatorial experiment planning."""
+    snapshot: BusinessSnapshot
+    top_k: int = 10
+    # Total test budget; caps the plans at what it can fund
+    budget: Optional[float] = None
+    min_spend_per_variant: float = 200.0
+    min_conversions: int = 50
+    # Angle -> conversion multiplier; defaults to every angle at 1.0
+    angles: Optional[Dict[str, float]] = None
+    # Per product id / audience segment totals with clicks and conversions
+    product_stats: Optional[Dict[str, Dict[str, float]]] = None
+    segment_stats: Optional[Dict[str, Dict[str, float]]] = None
+    # Cap on plans for any single product
+    max_per_product: Optional[int] = None
+
+
+@app.post("/experiment-plans")
+def create_experiment_plans(req: PlanningRequest):
+    """Rank every product x audience x angle combination and stream the top plans as NDJSON."""
+    try:
+        planner = ExperimentPlanner(angles=req.angles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    plans = planner.iter_plans(
+        req.snapshot,
+        top_k=req.top_k,
+        budget=req.budget,
+        min_spend_per_variant=req.min_spend_per_variant,
+        min_conversions=req.min_conversions,
+        product_stats=req.product_stats,
+        segment_stats=req.segment_stats,
+        max_per_product=req.max_per_product,
+    )
+    return StreamingResponse((plan.model_dump_json() + "\n" for plan in plans), media_type="application/x-ndjson")
+
+
 @app.post("/creative-variants", response_model=list[CreativeVariant])
-def generate_creative_variants(plan: ExperimentPlan):
+def generate_creative_variants(
+    plan: ExperimentPlan,
+    x_tenant_id: Optional[str] = Header(default=None),
+    x_api_key: Optional[str] = Header(default=None),
+):
     """Generate dummy creative variants for each variant in an experiment plan and attach FIBO images."""
     creatives: list[CreativeVariant] = []
+    tenant = _tenant_id(x_tenant_id, x_api_key)
 
-    templates: Dict[str, Dict[str, str]] = {
-        "A": {"hook": "Stop scrolling!", "headline": "The best solution."},
-        "B": {"hook": "Tired of wasting time?", "headline": "Save hours every day."},
-        "C": {
-            "hook": "See what everyone is talking about.",
-            "headline": "Rated 5 stars by thousands.",
-        },
-    }
-
-    for variant in plan.variants:
-        # Simple template selection based on variant ID suffix or random
-        vid = variant.variant_id[-1] if variant.variant_id else "A"
-        template = templates.get(
-            vid, {"hook": f"Discover {variant.description}", "headline": "Learn More"}
-        )
-
-        primary_text = f"Experience the difference with our latest offering. {variant.description}."
-        
-        # Apply Guardrails - Enforce by default (Task A1)
-        guardrails_report = {"status": "pass", "issues": []}
-        if plan.guardrails:
-            # 1. Append disclaimer if missing
-            if plan.guardrails.disclaimer and plan.guardrails.disclaimer not in primary_text:
-                primary_text += f" {plan.guardrails.disclaimer}"
-
-            # 2. Append required terms if missing (Task A1)
-            # Check combined text blob
-            text_blob = (primary_text + " " + template["headline"] + " " + template["hook"]).lower()
-            for term in plan.guardrails.required_terms:
-                if term and term.lower() not in text_blob:
-                    # Satisfy requirement by appending to primary text
-                    primary_text += f" {term}."
-                    # Update text_blob for subsequent checks
-                    text_blob = (primary_text + " " + template["headline"] + " " + template["hook"]).lower()
-
-            # 3. Validation Check (Double check)
-            # Check avoid words
-            for word in plan.guardrails.avoid_words:
-                if word and word.lower() in text_blob:
-                    guardrails_report["status"] = "needs_fix"
-                    guardrails_report["issues"].append(f"Avoided word found: '{word}'")
-            
-            # Check required terms again (should be safe now, but good to verify)
-            for term in plan.guardrails.required_terms:
-                if term and term.lower() not in text_blob:
-                     guardrails_report["status"] = "needs_fix"
-                     guardrails_report["issues"].append(f"Missing required term: '{term}'")
-
-        creative = CreativeVariant(
-            variant_id=variant.variant_id,
-            hook=template["hook"],
-            primary_text=primary_text,
-            headline=template["headline"],
-            call_to_action="Shop Now",
-            guardrails_report=guardrails_report
-        )
+    # Copy and the guardrails pass come from templates compiled per brand voice and channel
+    rendered = template_engine.render_batch(
+        [{"variant_id": v.variant_id, "description": v.description} for v in plan.variants],
+        plan.guardrails,
+    )
 
+    for variant, creative in zip(plan.variants, rendered):
         # Build a default image spec keyed off the experiment plan; real logic could
         # incorporate channel, audience and product attributes.  Here we keep it
         # simple and deterministic.
@@ -164,7 +443,9 @@ def generate_creative_variants(plan: ExperimentPlan):
             spec["background_type"] = "testimonial"
             spec["lighting_style"] = "neutral" 
         try:
-            result = generate_fibo_image(spec, f"{creative.hook} {creative.headline}")
+            result = _render(
+                spec, f"{creative.hook} {creative.headline}", CREATIVE, tenant, variant_id=creative.variant_id
+            )
             creative.image_url = result.image_url
             creative.fibo_spec = result.resolved_spec
             # Mark whether we hit the real API or are in mock mode
@@ -175,87 +456,249 @@ def generate_creative_variants(plan: ExperimentPlan):
             creative.fibo_spec = spec
             creative.image_status = "error"
         creatives.append(creative)
+    _attach_assets(creatives)
+    if speculator is not None:
+        speculator.submit(creatives)
     return creatives
 
 
 @app.post("/score-creatives", response_model=list[RubricScore])
-def evaluate_creatives(creatives: list[CreativeVariant]):
-    """Assign heuristic rubric scores to creatives based on FIBO image specs."""
+def evaluate_creatives(creatives: list[CreativeVariant], response: Response):
+    """Assign heuristic rubric scores to creatives based on FIBO image specs.
+
+    Unchanged creatives are served from the score cache; the
+    `X-Score-Cache-Hits` / `X-Score-Cache-Misses` headers report how many.
+    `X-Score-Duplicates` counts near-duplicates that reused the score of an
+    earlier creative in the same request.
+    """
     try:
-        scores: list[RubricScore] = []
-        for creative in creatives:
-            # Compute baseline clarity and emotional scores based on FIBO spec
-            # Start with random base values in a moderate range
-            clarity = random.uniform(3, 5)
-            emotional = random.uniform(2, 5)
-            spec = getattr(creative, "fibo_spec", {}) or {}
-            shot = spec.get("shot_type")
-            palette = spec.get("color_palette")
-            
-            # Adjust clarity based on shot type
-            if shot == "product_only":
-                clarity += 2
-            elif shot == "product_in_use":
-                clarity += 1
-            elif shot == "people_with_product":
-                clarity -= 1
-                
-            # Adjust emotional resonance
-            if shot == "people_with_product":
-                emotional += 2
-            if palette == "vibrant":
-                emotional += 1
-            elif palette == "neutral":
-                clarity += 1
-                
-            # Penalize scores if image generation failed
-            if getattr(creative, "image_status", "") == "error":
-                clarity = 0
-                emotional = 0
-            
-            scores.append(
-                RubricScore(
-                    creative_id=creative.variant_id,
-                    clarity_of_promise=int(clarity),
-                    emotional_resonance=int(emotional),
-                    proof_and_credibility=random.randint(3, 5),
-                    offer_and_risk_reversal=random.randint(3, 5),
-                    call_to_action_score=random.randint(3, 5),
-                    channel_fit=random.randint(3, 5),
-                    curiosity_hook_factor=random.randint(2, 5),
-                    overall_strength=(clarity + emotional) / 2 + 0.5,
-                    feedback=f"Good clarity ({int(clarity)}). Consider improving emotional resonance." if emotional < 4 else "Strong emotional appeal!",
-                )
-            )
+        scores, hits, misses, reused = score_cache.score_batch(creatives)
+        response.headers["X-Score-Cache-Hits"] = str(hits)
+        response.headers["X-Score-Cache-Misses"] = str(misses)
+        response.headers["X-Score-Duplicates"] = str(reused)
         return scores
-    except Exception as e:
-        import traceback
-        with open("backend_error.log", "w") as f:
-            f.write(str(e) + "\n")
-            traceback.print_exc(file=f)
-        raise e
+    except Exception:
+        logger.exception("score-creatives failed", extra={"creative_count": len(creatives)})
+        raise
 
 
 @app.post("/results", response_model=NextTestRecommendation)
-def process_experiment_results(results: ExperimentResult):
-    """Process experiment results and suggest next tests."""
+def process_experiment_results(results: ExperimentResult, incremental: bool = False):
+    """Process experiment results and suggest next tests.
+
+    With `incremental=true` the body holds only the counts since the previous
+    call for the experiment; they are added to its running totals, which are
+    then used as the full results, and a sequential stop/continue decision is
+    attached.
+    """
     if not results.results:
         raise HTTPException(status_code=400, detail="No results provided")
-    # determine winner by highest profit
-    winner = max(results.results, key=lambda r: r.profit)
+    sequential = None
+    if incremental:
+        result_cubes.add(results)
+        results, sequential = sequential_tests.apply(results)
+    # KPIs are derived here so every client sees the same profit, CAC and ROAS
+    results = with_kpis(results)
+    # determine winner by lowest expected loss under the Bayesian posteriors
+    recommendation = _recommendation(results, decision_engine.decide(results))
+    if sequential is not None:
+        recommendation.stop = sequential.stop
+        recommendation.sequential = sequential.variants
+        losers = [s.variant_id for s in sequential.variants if s.status == LOSER]
+        if sequential.stop:
+            recommendation.summary += f" Sequential test: stop now, {sequential.winner_variant_id} wins."
+        elif losers:
+            recommendation.summary += f" Sequential test: stop spending on {', '.join(losers)}."
+    return recommendation
+
+
+def _recommendation(results: ExperimentResult, decision: ExperimentDecision) -> NextTestRecommendation:
+    winner = next(r for r in results.results if r.variant_id == decision.winner_variant_id)
+    prob_best = decision.winner.prob_best
 
+    # Quote the metric the winner was actually chosen on, not profit
+    label = METRIC_LABELS[decision.metric]
+    observed = observed_metric(decision.metric, winner.clicks, winner.conversions, winner.revenue, winner.spend)
+
+    if decision.confident:
+        summary = (
+            f"Variant {winner.variant_id} was the clear winner on {label} with {observed} "
+            f"({prob_best:.0%} probability to be best) and ${winner.profit} profit. "
+            "We recommend iterating on its successful elements."
+        )
+    else:
+        summary = (
+            f"Variant {winner.variant_id} leads on {label} with {observed}, but only a {prob_best:.0%} "
+            "probability to be best. Consider letting the test run longer before iterating on it."
+        )
     recommendation = NextTestRecommendation(
         experiment_id=results.experiment_id,
         recommended_variants=[
             VariantPlan(variant_id="D", control=False, description=f"Iterate on {winner.variant_id} - Angle 1"),
             VariantPlan(variant_id="E", control=False, description=f"Iterate on {winner.variant_id} - Angle 2"),
         ],
-        summary=f"Variant {winner.variant_id} was the clear winner with ${winner.profit} profit. "
-        "We recommend iterating on its successful elements.",
+        summary=summary,
+        winner_variant_id=winner.variant_id,
+        confident=decision.confident,
+        posteriors=decision.posteriors(),
+        results=results.results,
     )
     return recommendation
 
 
+@app.get("/results/{experiment_id}/cube")
+def query_result_cube(
+    experiment_id: str,
+    by: str = "",
+    grain: Optional[str] = None,
+    variant: Optional[str] = None,
+    channel: Optional[str] = None,
+    segment: Optional[str] = None,
+    day: Optional[str] = None,
+):
+    """Slice an experiment's incremental results from the pre-aggregated cubes.
+
+    `by` is a comma-separated list of variant, channel and segment; the other
+    query parameters pin a dimension to one value.
+    """
+    if experiment_id not in result_cubes:
+        raise HTTPException(status_code=404, detail="No incremental results for this experiment")
+    dims = [d.strip() for d in by.split(",") if d.strip()]
+    where = {
+        name: value
+        for name, value in (("variant", variant), ("channel", channel), ("segment", segment), ("day", day))
+        if value is not None
+    }
+    try:
+        cells = result_cubes.query(experiment_id, by=dims, grain=grain, where=where)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"experiment_id": experiment_id, "by": dims, "grain": grain, "cells": cells}
+
+
+_results_list = TypeAdapter(List[ExperimentResult])
+
+
+def _recommendation_lines(chunk: List[ExperimentResult]) -> List[str]:
+    chunk = with_kpis_batch(chunk)
+    decisions = decision_engine.decide_batch(chunk)
+    return [_recommendation(results, decision).model_dump_json() + "\n" for results, decision in zip(chunk, decisions)]
+
+
+def _safe_recommendation_lines(chunk: List[ExperimentResult], labels: List[Dict[str, int]]) -> List[str]:
+    """`_recommendation_lines`, with an error record for each experiment that cannot be decided.
+
+    The vectorized pass fails as a whole, so on failure the chunk is decided
+    one experiment at a time to find the bad ones; `labels` locate them
+    in the input.
+    """
+    try:
+        return _recommendation_lines(chunk)
+    except Exception:
+        logger.warning("batch decision failed; deciding experiments one by one", extra={"experiment_count": len(chunk)})
+    out = []
+    for results, label in zip(chunk, labels):
+        try:
+            out.extend(_recommendation_lines([results]))
+        except Exception as e:
+            out.append(json.dumps({**label, "error": f"Cannot decide experiment {results.experiment_id}: {e}"}) + "\n")
+    return out
+
+
+def _stream_recommendations(batch: List[ExperimentResult]):
+    for start in range(0, len(batch), BATCH_CHUNK_SIZE):
+        chunk = batch[start:start + BATCH_CHUNK_SIZE]
+        labels = [{"index": start + i} for i in range(len(chunk))]
+        # One write per chunk; a write per line costs more than the decisions
+        yield "".join(_safe_recommendation_lines(chunk, labels))
+
+
+def _decide_ndjson_chunk(lines: List[Tuple[int, bytes]]) -> str:
+    """Recommendations for numbered NDJSON lines, with an error record for each bad line."""
+    out: List[Optional[str]] = []
+    valid: List[ExperimentResult] = []
+    labels: List[Dict[str, int]] = []
+    for number, line in lines:
+        # Validate every line before the vectorized pass, so one bad line cannot sink the chunk
+        try:
+            results = parse_result_line(line, number)
+            if not results.results:
+                raise ValueError(f"No results provided on line {number}")
+        except ValueError as e:
+            out.append(json.dumps({"line": number, "error": str(e)}) + "\n")
+            continue
+        out.append(None)
+        valid.append(results)
+        labels.append({"line": number})
+    decided = iter(_safe_recommendation_lines(valid, labels) if valid else [])
+    return "".join(line if line is not None else next(decided) for line in out)
+
+
+async def _body_lines(request: Request):
+    """The request body split into lines as it arrives."""
+    pending = b""
+    async for piece in request.stream():
+        pending += piece
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+class _BodyStreamingResponse(StreamingResponse):
+    """A streaming response produced while the request body is still being read.
+
+    `StreamingResponse` normally watches `receive` for a disconnect, which
+    would steal the body messages `request.stream()` is waiting for.  Reading
+    the body already raises `ClientDisconnect` when the client goes away.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+async def _stream_ndjson_recommendations(request: Request):
+    chunk: List[Tuple[int, bytes]] = []
+    count = 0
+    number = 0
+    async for line in _body_lines(request):
+        number += 1
+        if not line.strip():
+            continue
+        chunk.append((number, line))
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            count += len(chunk)
+            yield await run_in_threadpool(_decide_ndjson_chunk, chunk)
+            chunk = []
+    if chunk:
+        count += len(chunk)
+        yield await run_in_threadpool(_decide_ndjson_chunk, chunk)
+    logger.info("results batch", extra={"experiment_count": count})
+
+
+@app.post("/results/batch")
+async def process_experiment_results_batch(request: Request):
+    """Process many experiment results at once, streaming recommendations as NDJSON.
+
+    As `application/x-ndjson`, the body is read line by line as it arrives and
+    decided `BATCH_CHUNK_SIZE` lines at a time, so memory does not grow with
+    the upload; a bad line yields `{"line": n, "error": ...}` in its place.
+    A JSON array body is validated as a whole before streaming starts.
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        return _BodyStreamingResponse(_stream_ndjson_recommendations(request), media_type="application/x-ndjson")
+    body = await request.body()
+    try:
+        batch = await run_in_threadpool(_results_list.validate_json, body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if any(not results.results for results in batch):
+        raise HTTPException(status_code=400, detail="No results provided")
+    logger.info("results batch", extra={"experiment_count": len(batch)})
+    return StreamingResponse(_stream_recommendations(batch), media_type="application/x-ndjson")
+
+
 class SpecPatch(BaseModel):
     """Explicit fields for a FIBO image spec patch.
     All fields are optional because the client may only override a subset.
@@ -276,7 +719,11 @@ class RegenerateRequest(BaseModel):
 
 # Updated endpoint to use the new model and log actions
 @app.post("/regenerate-image", response_model=CreativeVariant)
-def regenerate_image(req: RegenerateRequest) -> CreativeVariant:
+def regenerate_image(
+    req: RegenerateRequest,
+    x_tenant_id: Optional[str] = Header(default=None),
+    x_api_key: Optional[str] = Header(default=None),
+) -> CreativeVariant:
     """Regenerate a FIBO image based on a patch to the existing spec.
     The incoming patch overrides the existing `fibo_spec`. The endpoint returns the updated creative.
     """
@@ -285,18 +732,40 @@ def regenerate_image(req: RegenerateRequest) -> CreativeVariant:
     # Convert SpecPatch to dict, excluding None values
     patch_dict = req.spec_patch.dict(exclude_unset=True)
     merged_spec = {**base_spec, **patch_dict}
+    tenant = _tenant_id(x_tenant_id, x_api_key)
+    req.variant.preview_url = spec_index.nearest_url(merged_spec, scope=tenant)
+    prompt = f"{req.variant.hook} {req.variant.headline}"
+    if speculator is not None:
+        speculator.observe(merged_spec, prompt)
     try:
-        result = generate_fibo_image(merged_spec, f"{req.variant.hook} {req.variant.headline}")
+        result = _render(
+            merged_spec,
+            prompt,
+            INTERACTIVE,
+            tenant,
+            # Regenerating an unchanged spec asks for a new image, not the cached one
+            use_cache=merged_spec != base_spec,
+            variant_id=req.variant.variant_id,
+            preview_url=req.variant.preview_url,
+        )
         req.variant.image_url = result.image_url
         req.variant.fibo_spec = result.resolved_spec
         req.variant.image_status = "fibo" if os.getenv("FIBO_API_KEY") else "mocked"
+        req.variant.asset_url = None
+        _attach_assets([req.variant])
         # Log concise info (no secrets)
-        print(f"regenerate-image creative_id={req.variant.variant_id} status={req.variant.image_status}")
+        cell_logger.info(
+            "regenerate-image",
+            extra={"creative_id": req.variant.variant_id, "status": req.variant.image_status},
+        )
     except Exception as e:
         # On error, keep existing image URL but update the spec anyway
         req.variant.fibo_spec = merged_spec
         req.variant.image_status = "error"
-        print(f"regenerate-image creative_id={req.variant.variant_id} status=error error={str(e)}")
+        cell_logger.warning(
+            "regenerate-image failed",
+            extra={"creative_id": req.variant.variant_id, "status": "error", "error": str(e)},
+        )
     return req.variant
 
 
@@ -310,6 +779,9 @@ class ExploreVariantsRequest(BaseModel):
         "background_type": ["studio", "natural"]
     }
     preset: Optional[str] = "full8"  # "fast4" or "full8"
+    # Near-duplicate detection (needs the asset store for image bytes)
+    experiment_id: Optional[str] = None
+    collapse_duplicates: bool = False
 
 
 class ExploreVariantsResponse(BaseModel):
@@ -319,8 +791,33 @@ class ExploreVariantsResponse(BaseModel):
     meta: Dict[str, Any]
 
 
+def _flag_duplicate(
+    variant: CreativeVariant, grid_index: NearDuplicateIndex, experiment_id: Optional[str]
+) -> None:
+    """Set `duplicate_of` when the variant's image matches an earlier one.
+
+    The grid itself is checked first, then earlier grids of the experiment.
+    Placeholder images (mock mode, failed renders) are identical for every
+    cell regardless of spec, so they are never compared.
+    """
+    if not variant.asset_url or is_placeholder(variant.image_url):
+        return
+    image_hash = _asset_phash(variant.asset_url.rsplit("/", 1)[-1])
+    if image_hash is None:
+        return
+    duplicate_of = grid_index.add("grid", variant.variant_id, image_hash)
+    if experiment_id:
+        earlier = duplicate_index.add(experiment_id, variant.variant_id, image_hash)
+        duplicate_of = duplicate_of or earlier
+    variant.duplicate_of = duplicate_of
+
+
 @app.post("/explore-variants", response_model=ExploreVariantsResponse)
-def explore_variants(req: ExploreVariantsRequest) -> ExploreVariantsResponse:
+def explore_variants(
+    req: ExploreVariantsRequest,
+    x_tenant_id: Optional[str] = Header(default=None),
+    x_api_key: Optional[str] = Header(default=None),
+) -> ExploreVariantsResponse:
     """Generate visual variants by exploring combinations of FIBO parameters.
     
     This endpoint creates a cartesian product of the specified axes
@@ -331,7 +828,11 @@ def explore_variants(req: ExploreVariantsRequest) -> ExploreVariantsResponse:
     from itertools import product
     
     start_time = time.time()
+    tenant = _tenant_id(x_tenant_id, x_api_key)
     generated_variants: list[CreativeVariant] = []
+    cells: list[CreativeVariant] = []
+    grid_index = NearDuplicateIndex(threshold=duplicate_index.threshold)
+    duplicates: Dict[str, str] = {}
     
     # Handle Presets
     if req.preset == "fast4":
@@ -368,27 +869,61 @@ def explore_variants(req: ExploreVariantsRequest) -> ExploreVariantsResponse:
         # Create a copy of the base variant
         variant_copy = req.base_variant.copy(deep=True)
         variant_copy.variant_id = f"{req.base_variant.variant_id}_{variant_suffix}"
+        variant_copy.duplicate_of = None
         
         # Apply the logic (similar to regenerate_image)
         base_spec: Dict[str, Any] = variant_copy.fibo_spec or {}
         merged_spec = {**base_spec, **spec_update}
+        variant_copy.preview_url = spec_index.nearest_url(merged_spec, scope=tenant)
         
         try:
             # Generate image with new spec
-            result = generate_fibo_image(merged_spec, f"{variant_copy.hook} {variant_copy.headline}")
+            result = _render(
+                merged_spec,
+                f"{variant_copy.hook} {variant_copy.headline}",
+                BULK,
+                tenant,
+                variant_id=variant_copy.variant_id,
+                parent_id=req.base_variant.variant_id,
+                preview_url=variant_copy.preview_url,
+            )
             variant_copy.image_url = result.image_url
             variant_copy.fibo_spec = result.resolved_spec
             variant_copy.image_status = "fibo" if os.getenv("FIBO_API_KEY") else "mocked"
+            variant_copy.asset_url = None
             
             # Log simple status
-            print(f"explore-variants {idx+1}/{len(combinations)}: {spec_update} status={variant_copy.image_status}")
+            cell_logger.info(
+                "explore-variants cell",
+                extra={
+                    "cell": idx + 1,
+                    "total": len(combinations),
+                    "spec_update": spec_update,
+                    "status": variant_copy.image_status,
+                },
+            )
             
         except Exception as e:
             variant_copy.fibo_spec = merged_spec
             variant_copy.image_status = "error"
-            print(f"explore-variants {idx+1} error: {str(e)}")
-        
-        generated_variants.append(variant_copy)
+            cell_logger.warning(
+                "explore-variants cell failed",
+                extra={"cell": idx + 1, "spec_update": spec_update, "error": str(e)},
+            )
+
+        cells.append(variant_copy)
+
+    # Store every cell's image in parallel, then flag duplicates in grid order
+    _attach_assets(cells)
+    if asset_store is None and (req.experiment_id or req.collapse_duplicates):
+        logger.warning("duplicate detection requested but ASSET_STORE_DIR is not set")
+    for variant_copy in cells:
+        if variant_copy.image_status != "error":
+            _flag_duplicate(variant_copy, grid_index, req.experiment_id)
+        if variant_copy.duplicate_of:
+            duplicates[variant_copy.variant_id] = variant_copy.duplicate_of
+        if not (req.collapse_duplicates and variant_copy.duplicate_of):
+            generated_variants.append(variant_copy)
     
     runtime_ms = int((time.time() - start_time) * 1000)
     
@@ -398,7 +933,11 @@ def explore_variants(req: ExploreVariantsRequest) -> ExploreVariantsResponse:
         meta={
             "count": len(generated_variants),
             "runtime_ms": runtime_ms,
-            "axes_explored": req.axes
+            "axes_explored": req.axes,
+            "duplicates": duplicates,
+            "collapsed": len(duplicates) if req.collapse_duplicates else 0,
+            # Hashing needs the stored image bytes
+            "duplicate_detection": asset_store is not None,
         }
     )
 
@@ -0,0 +1,127 @@
+"""Perceptual hashing and near-duplicate detection for generated images.
+
+Explore grids often produce visually near-identical images (`warm` vs
+`warm_golden` on a studio background).  Hashes are 64-bit integers:
+
+- `average_hash`: 8x8 grayscale thumbnail thresholded at its mean;
+- `perceptual_hash`: 2D DCT of a 32x32 thumbnail, keeping the 8x8 lowest
+  frequencies thresholded at their median (more robust to small shifts in
+  lighting and colour).
+
+Two images are near-duplicates when the Hamming distance between their
+hashes is at most a small threshold.  `NearDuplicateIndex` keeps hashes per
+scope (an explore grid, an experiment) and compares a new hash against all
+earlier ones in one vectorized NumPy pass.
+
+Pillow is used only to decode and downscale the image; without it the
+hash functions raise `RuntimeError`.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import io
+import threading
+
+import numpy as np
+
+try:
+    from PIL import Image  # type: ignore
+except Exception:
+    Image = None  # type: ignore
+
+
+def _gray_pixels(data: bytes, size: int) -> np.ndarray:
+    if Image is None:
+        raise RuntimeError("Pillow is required for perceptual hashing")
+    with Image.open(io.BytesIO(data)) as img:
+        small = img.convert("L").resize((size, size), Image.LANCZOS)
+    return np.asarray(small, dtype=np.float64)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), "big")
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II matrix, so `M @ X @ M.T` is the 2D DCT of X."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+def average_hash(data: bytes, hash_size: int = 8) -> int:
+    """Return the 64-bit average hash of an encoded image."""
+    pixels = _gray_pixels(data, hash_size)
+    return _bits_to_int(pixels > pixels.mean())
+
+
+def perceptual_hash(data: bytes, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """Return the 64-bit DCT perceptual hash of an encoded image."""
+    size = hash_size * highfreq_factor
+    pixels = _gray_pixels(data, size)
+    dct = _dct_matrix(size)
+    low = (dct @ pixels @ dct.T)[:hash_size, :hash_size]
+    # Ignore the DC term when picking the threshold; it only tracks brightness
+    median = np.median(low.ravel()[1:])
+    return _bits_to_int(low > median)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _popcount64(values: np.ndarray) -> np.ndarray:
+    as_bytes = values.astype(">u8").view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(as_bytes, axis=1).sum(axis=1)
+
+
+class NearDuplicateIndex:
+    """Per-scope store of image hashes with vectorized near-duplicate lookup.
+
+    Each scope keeps at most `max_per_scope` hashes (oldest dropped first)
+    and at most `max_scopes` scopes are retained.
+    """
+
+    def __init__(self, threshold: int = 6, max_per_scope: int = 4096, max_scopes: int = 1024) -> None:
+        self.threshold = threshold
+        self.max_per_scope = max_per_scope
+        self.max_scopes = max_scopes
+        self._scopes: Dict[str, Tuple[np.ndarray, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def find(self, scope: str, image_hash: int) -> Optional[str]:
+        """Return the id of the closest near-duplicate in `scope`, if any."""
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is None or not entry[1]:
+                return None
+            hashes, ids = entry
+            distances = _popcount64(hashes ^ np.uint64(image_hash))
+            best = int(np.argmin(distances))
+            return ids[best] if distances[best] <= self.threshold else None
+
+    def add(self, scope: str, item_id: str, image_hash: int) -> Optional[str]:
+        """Record a hash and return the id it duplicates, if any.
+
+        Duplicates are still recorded, so later lookups can match them too.
+        An item never duplicates itself: re-adding an id (the same cell of a
+        re-explored grid) replaces its earlier entry instead of matching it.
+        """
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is not None and item_id in entry[1]:
+                keep = [i for i, existing in enumerate(entry[1]) if existing != item_id]
+                self._scopes[scope] = (entry[0][keep], [entry[1][i] for i in keep])
+        duplicate_of = self.find(scope, image_hash)
+        with self._lock:
+            hashes, ids = self._scopes.pop(scope, (np.empty(0, dtype=np.uint64), []))
+            hashes = np.append(hashes, np.uint64(image_hash))[-self.max_per_scope:]
+            ids = (ids + [item_id])[-self.max_per_scope:]
+            # Re-inserting keeps scopes in least-recently-used order
+            self._scopes[scope] = (hashes, ids)
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.pop(next(iter(self._scopes)))
+        return duplicate_of
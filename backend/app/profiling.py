@@ -0,0 +1,211 @@
+"""Opt-in per-request profiling for the FastAPI backend.
+
+Profiling is disabled unless `PROFILING_ENABLED` is set in the environment.
+When it is disabled nothing in this module is installed on the app, so the
+request path is exactly the same as without profiling.
+
+When enabled, a request is profiled if it carries an `X-Profile: 1` header
+or if it is picked by random sampling (`PROFILE_SAMPLE_RATE`, a float
+between 0 and 1, default 0).  Sync endpoints run in the Starlette
+threadpool, so the cProfile profiler is enabled inside the worker thread by
+`ProfiledRoute` rather than in the middleware.  The collected stats are
+written from the threadpool as a `.prof` file (loadable with `pstats` or
+snakeviz) into `PROFILES_DIR` (default `profiles`), named after the route
+and trace id.
+
+Async endpoints are skipped: cProfile is per thread, so profiling a
+coroutine would also record every other request interleaved on the event
+loop.  Their responses carry `X-Profile-Skipped: async-endpoint` instead
+of `X-Profile-Id`, and no file is written.
+
+The files can be listed with `GET /profiles` and downloaded with
+`GET /profiles/{profile_id}`.
+"""
+
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import cProfile
+import functools
+import inspect
+import os
+import random
+import re
+import uuid
+
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from fastapi.routing import APIRoute
+
+
+PROFILE_HEADER = b"x-profile"
+TRACE_HEADER = b"x-trace-id"
+
+@dataclass
+class _RequestProfile:
+    profile: cProfile.Profile
+    used: bool = False  # Set once a sync endpoint has run under the profiler
+
+
+# The profile for the request currently being handled, if any.  Starlette
+# copies the context into threadpool workers, so sync endpoints see it too.
+_active_profile: ContextVar[Optional[_RequestProfile]] = ContextVar(
+    "_active_profile", default=None
+)
+
+
+@dataclass
+class ProfilingSettings:
+    """Runtime settings for the profiling hook."""
+
+    profiles_dir: str = "profiles"
+    sample_rate: float = 0.0
+
+
+_settings = ProfilingSettings()
+
+
+def is_enabled() -> bool:
+    """Return True when profiling has been switched on via the environment."""
+    return os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes", "on")
+
+
+def _profiled_call(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a sync endpoint so it runs under the request's profiler."""
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        state = _active_profile.get()
+        if state is None:
+            return func(*args, **kwargs)
+        state.used = True
+        state.profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            state.profile.disable()
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that profiles sync endpoints inside their worker thread."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _profiled_call(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _slug(path: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")
+    return slug or "root"
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that decides which requests get profiled.
+
+    Profiled responses carry `X-Trace-Id` and `X-Profile-Id` headers so the
+    caller can fetch the matching profile afterwards.
+    """
+
+    def __init__(self, app: Any, settings: ProfilingSettings) -> None:
+        self.app = app
+        self.settings = settings
+
+    def _should_profile(self, headers: Dict[bytes, bytes]) -> bool:
+        if headers.get(PROFILE_HEADER, b"").lower() in (b"1", b"true", b"yes"):
+            return True
+        rate = self.settings.sample_rate
+        return rate > 0 and random.random() < rate
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        if not self._should_profile(headers):
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = headers.get(TRACE_HEADER, b"").decode("latin-1") or uuid.uuid4().hex
+        trace_id = re.sub(r"[^A-Za-z0-9_-]", "", trace_id)[:64] or uuid.uuid4().hex
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        profile_id = f"{stamp}_{_slug(scope.get('path', ''))}_{trace_id}.prof"
+
+        state = _RequestProfile(cProfile.Profile())
+
+        async def send_with_ids(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                # A sync endpoint has finished by the time its response starts
+                extra = [(b"x-trace-id", trace_id.encode("latin-1"))]
+                if state.used:
+                    extra.append((b"x-profile-id", profile_id.encode("latin-1")))
+                else:
+                    extra.append((b"x-profile-skipped", b"async-endpoint"))
+                message["headers"] = list(message.get("headers", [])) + extra
+            await send(message)
+
+        token = _active_profile.set(state)
+        try:
+            await self.app(scope, receive, send_with_ids)
+        finally:
+            _active_profile.reset(token)
+            if state.used:
+                await run_in_threadpool(_dump, state.profile, self.settings.profiles_dir, profile_id)
+
+
+def _dump(profile: cProfile.Profile, directory: str, profile_id: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    profile.dump_stats(os.path.join(directory, profile_id))
+
+
+router = APIRouter()
+
+
+@router.get("/profiles")
+def list_profiles() -> List[Dict[str, Any]]:
+    """List captured profiles, newest first."""
+    directory = _settings.profiles_dir
+    if not os.path.isdir(directory):
+        return []
+    entries = []
+    for name in os.listdir(directory):
+        if not name.endswith(".prof"):
+            continue
+        stat = os.stat(os.path.join(directory, name))
+        entries.append({"profile_id": name, "size_bytes": stat.st_size, "created_at": stat.st_mtime})
+    entries.sort(key=lambda e: e["created_at"], reverse=True)
+    return entries
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str) -> FileResponse:
+    """Download a single `.prof` file by id."""
+    if os.path.basename(profile_id) != profile_id or not profile_id.endswith(".prof"):
+        raise HTTPException(status_code=400, detail="Invalid profile id")
+    path = os.path.join(_settings.profiles_dir, profile_id)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=profile_id)
+
+
+def install(
+    app: FastAPI,
+    profiles_dir: Optional[str] = None,
+    sample_rate: Optional[float] = None,
+) -> None:
+    """Install the profiling route class, middleware and endpoints on `app`.
+
+    Must be called before the app's routes are declared so that they are
+    created with `ProfiledRoute`.
+    """
+    _settings.profiles_dir = profiles_dir or os.getenv("PROFILES_DIR", "profiles")
+    if sample_rate is None:
+        sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0") or 0)
+    _settings.sample_rate = sample_rate
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(ProfilingMiddleware, settings=_settings)
+    app.include_router(router)
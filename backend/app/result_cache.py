@@ -0,0 +1,67 @@
+"""In-memory cache of FIBO generation results.
+
+Results are keyed by a stable hash of the resolved spec and the prompt, so
+an identical request (for example a `/regenerate-image` call whose patch was
+already pre-rendered speculatively) is answered without touching Bria.
+Error placeholders are never cached.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import threading
+
+from .fibo_client import FiboImageResult
+
+
+def result_key(spec: Dict[str, Any], prompt: str) -> str:
+    """Return a stable cache key for a spec/prompt pair."""
+    canonical = json.dumps({"spec": spec, "prompt": prompt}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """Thread-safe LRU cache of `FiboImageResult`s."""
+
+    def __init__(self, max_entries: int = 2048) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, FiboImageResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, spec: Dict[str, Any], prompt: str) -> Optional[FiboImageResult]:
+        key = result_key(spec, prompt)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return FiboImageResult(
+            image_url=result.image_url, resolved_spec=dict(result.resolved_spec)
+        )
+
+    def put(self, spec: Dict[str, Any], prompt: str, result: FiboImageResult) -> None:
+        if result.is_fallback:
+            return
+        key = result_key(spec, prompt)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
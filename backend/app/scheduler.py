@@ -0,0 +1,199 @@
+"""Shared scheduler for upstream image generation capacity.
+
+Every call to Bria goes through `GenerationScheduler.slot()`, which blocks
+the calling worker thread until one of `capacity` upstream slots is free.
+Waiting requests are ordered by:
+
+1. priority class: interactive regenerations first, then creative variant
+   generation, then bulk exploration grids, and speculative pre-renders
+   last;
+2. within a class, start-time fair queuing between tenants, so a tenant
+   submitting a 64-cell grid cannot starve another tenant's requests.
+   Tenants can be given relative weights (a tenant with weight 2 gets
+   twice the share of one with weight 1).
+
+Because the explore grid takes a slot per cell, an interactive regeneration
+only waits for the cells already in flight, not for the whole grid.
+
+A tenant's last finish tag only matters while it is ahead of the class's
+virtual time; once the virtual time catches up, the tenant is idle and its
+entry is dropped.  When a class drains completely its virtual time jumps to
+the largest finish tag, which makes every tenant idle.  The bookkeeping
+therefore only tracks tenants active in the current busy period.
+Queue-wait metrics are kept per class and returned by `metrics()`.
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+import heapq
+import itertools
+import os
+import threading
+import time
+
+
+# Priority classes, highest priority first
+INTERACTIVE = "interactive"
+CREATIVE = "creative"
+BULK = "bulk"
+SPECULATIVE = "speculative"
+PRIORITY_CLASSES: Tuple[str, ...] = (INTERACTIVE, CREATIVE, BULK, SPECULATIVE)
+
+# Smallest per-class tenant count that triggers a prune of idle tenants
+_MIN_PRUNE = 64
+
+
+@dataclass
+class ClassMetrics:
+    """Queue-wait statistics for one priority class."""
+
+    granted: int = 0
+    queued: int = 0
+    in_flight: int = 0
+    total_wait_s: float = 0.0
+    max_wait_s: float = 0.0
+    recent_waits: Deque[float] = field(default_factory=lambda: deque(maxlen=512))
+
+    def snapshot(self) -> Dict[str, float]:
+        waits = sorted(self.recent_waits)
+        p95 = waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0
+        return {
+            "granted": self.granted,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "avg_wait_ms": 1000 * self.total_wait_s / self.granted if self.granted else 0.0,
+            "p95_wait_ms": 1000 * p95,
+            "max_wait_ms": 1000 * self.max_wait_s,
+        }
+
+
+@dataclass(order=True)
+class _Ticket:
+    rank: int
+    finish_tag: float
+    seq: int
+    start_tag: float = field(compare=False)
+    priority: str = field(compare=False)
+
+
+class GenerationScheduler:
+    """Priority plus weighted-fair admission to a fixed number of slots."""
+
+    def __init__(self, capacity: int = 4, tenant_weights: Optional[Dict[str, float]] = None) -> None:
+        self.capacity = max(1, capacity)
+        self.tenant_weights = dict(tenant_weights or {})
+        self._cond = threading.Condition()
+        self._heap: List[_Ticket] = []
+        self._in_flight = 0
+        self._seq = itertools.count()
+        self._virtual_time: Dict[str, float] = {cls: 0.0 for cls in PRIORITY_CLASSES}
+        # Per class: tenant -> finish tag of its latest ticket
+        self._last_finish: Dict[str, Dict[str, float]] = {cls: {} for cls in PRIORITY_CLASSES}
+        # Per class: size at which idle tenants are next pruned, so pruning is amortized O(1)
+        self._prune_at: Dict[str, int] = {cls: _MIN_PRUNE for cls in PRIORITY_CLASSES}
+        self._metrics: Dict[str, ClassMetrics] = {cls: ClassMetrics() for cls in PRIORITY_CLASSES}
+
+    def _weight(self, tenant: str) -> float:
+        return max(1e-6, self.tenant_weights.get(tenant, 1.0))
+
+    def _enqueue(self, priority: str, tenant: str, cost: float) -> _Ticket:
+        if priority not in self._metrics:
+            raise ValueError(f"Unknown priority class: {priority}")
+        last_finish = self._last_finish[priority]
+        start = max(self._virtual_time[priority], last_finish.get(tenant, 0.0))
+        finish = start + cost / self._weight(tenant)
+        last_finish[tenant] = finish
+        if len(last_finish) >= self._prune_at[priority]:
+            self._prune(priority)
+        ticket = _Ticket(PRIORITY_CLASSES.index(priority), finish, next(self._seq), start, priority)
+        heapq.heappush(self._heap, ticket)
+        self._metrics[priority].queued += 1
+        return ticket
+
+    def _prune(self, priority: str) -> None:
+        """Forget tenants whose finish tag the virtual time has reached.
+
+        For them `max(virtual_time, finish)` is the virtual time anyway, so
+        dropping the entry does not change any future start tag.
+        """
+        virtual_time = self._virtual_time[priority]
+        last_finish = self._last_finish[priority]
+        for tenant in [t for t, finish in last_finish.items() if finish <= virtual_time]:
+            del last_finish[tenant]
+        self._prune_at[priority] = max(_MIN_PRUNE, 2 * len(last_finish))
+
+    def tracked_tenants(self) -> int:
+        """Number of tenants with a live finish tag, across all classes."""
+        with self._cond:
+            return sum(len(tenants) for tenants in self._last_finish.values())
+
+    def _can_start(self, ticket: _Ticket) -> bool:
+        return self._in_flight < self.capacity and self._heap[0] is ticket
+
+    @contextmanager
+    def slot(self, priority: str = BULK, tenant: str = "anonymous", cost: float = 1.0) -> Iterator[None]:
+        """Hold one upstream slot for the duration of the `with` block."""
+        enqueued_at = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority, tenant, cost)
+            while not self._can_start(ticket):
+                self._cond.wait()
+            heapq.heappop(self._heap)
+            self._in_flight += 1
+            self._virtual_time[priority] = max(self._virtual_time[priority], ticket.start_tag)
+            waited = time.monotonic() - enqueued_at
+            stats = self._metrics[priority]
+            stats.queued -= 1
+            stats.in_flight += 1
+            stats.granted += 1
+            stats.total_wait_s += waited
+            stats.max_wait_s = max(stats.max_wait_s, waited)
+            stats.recent_waits.append(waited)
+            # The next ticket in line may also fit in the remaining capacity
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                stats = self._metrics[priority]
+                stats.in_flight -= 1
+                if not stats.in_flight and not stats.queued:
+                    # The class is idle: start the next busy period afresh
+                    last_finish = self._last_finish[priority]
+                    self._virtual_time[priority] = max([self._virtual_time[priority], *last_finish.values()])
+                    last_finish.clear()
+                    self._prune_at[priority] = _MIN_PRUNE
+                self._cond.notify_all()
+
+    def is_idle(self) -> bool:
+        """Return True when nothing is queued and a slot is free."""
+        with self._cond:
+            return not self._heap and self._in_flight < self.capacity
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Return queue-wait metrics keyed by priority class."""
+        with self._cond:
+            return {cls: m.snapshot() for cls, m in self._metrics.items()}
+
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    weights: Dict[str, float] = {}
+    for item in spec.split(","):
+        tenant, sep, weight = item.partition("=")
+        if sep and tenant.strip():
+            weights[tenant.strip()] = float(weight)
+    return weights
+
+
+def scheduler_from_env() -> GenerationScheduler:
+    """Build a scheduler from `FIBO_MAX_CONCURRENCY` and `TENANT_WEIGHTS`.
+
+    `TENANT_WEIGHTS` is a comma separated list such as `acme=2,beta=1`.
+    """
+    return GenerationScheduler(
+        capacity=int(os.getenv("FIBO_MAX_CONCURRENCY", "4")),
+        tenant_weights=_parse_weights(os.getenv("TENANT_WEIGHTS", "")),
+    )
@@ -0,0 +1,142 @@
+"""Memoized rubric scoring for `/score-creatives`.
+
+The UI resubmits the whole creative list after every regeneration, so most
+creatives in a request were already scored by an earlier one.  Scores are
+cached under a stable hash of what the rubric reads: the text fields,
+`fibo_spec` and `image_status`.  The variant id is deliberately left out,
+so a renamed but otherwise identical creative is still a hit.
+
+The heuristic's random components come from a `random.Random` seeded with
+the cache seed and the content hash, rather than from the global RNG.  The
+same creative therefore always gets the same score, whether it is served
+from the cache, re-scored after eviction or scored by another worker.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import random
+import threading
+
+from ..schemas.models import CreativeVariant, RubricScore
+
+
+# Bump when the heuristic changes so stale scores are not served
+SCORER_VERSION = 1
+_SCORED_FIELDS = ("hook", "primary_text", "headline", "call_to_action", "fibo_spec", "image_status")
+
+
+def score_key(creative: CreativeVariant) -> str:
+    """Return a stable hash of the fields that determine a creative's score."""
+    content: Dict[str, Any] = {field: getattr(creative, field) for field in _SCORED_FIELDS}
+    content["version"] = SCORER_VERSION
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def score_creative(creative: CreativeVariant, seed: int = 0, key: Optional[str] = None) -> RubricScore:
+    """Score one creative from its FIBO image spec, deterministically."""
+    rng = random.Random(f"{seed}:{key or score_key(creative)}")
+    # Start with random base values in a moderate range
+    clarity = rng.uniform(3, 5)
+    emotional = rng.uniform(2, 5)
+    spec = creative.fibo_spec or {}
+    shot = spec.get("shot_type")
+    palette = spec.get("color_palette")
+
+    # Adjust clarity based on shot type
+    if shot == "product_only":
+        clarity += 2
+    elif shot == "product_in_use":
+        clarity += 1
+    elif shot == "people_with_product":
+        clarity -= 1
+
+    # Adjust emotional resonance
+    if shot == "people_with_product":
+        emotional += 2
+    if palette == "vibrant":
+        emotional += 1
+    elif palette == "neutral":
+        clarity += 1
+
+    # Penalize scores if image generation failed
+    if creative.image_status == "error":
+        clarity = 0
+        emotional = 0
+
+    return RubricScore(
+        creative_id=creative.variant_id,
+        clarity_of_promise=int(clarity),
+        emotional_resonance=int(emotional),
+        proof_and_credibility=rng.randint(3, 5),
+        offer_and_risk_reversal=rng.randint(3, 5),
+        call_to_action_score=rng.randint(3, 5),
+        channel_fit=rng.randint(3, 5),
+        curiosity_hook_factor=rng.randint(2, 5),
+        overall_strength=(clarity + emotional) / 2 + 0.5,
+        feedback=f"Good clarity ({int(clarity)}). Consider improving emotional resonance." if emotional < 4 else "Strong emotional appeal!",
+    )
+
+
+class ScoreCache:
+    """Thread-safe LRU cache of rubric scores keyed by `score_key`."""
+
+    def __init__(self, max_entries: int = 10000, seed: int = 0) -> None:
+        self.max_entries = max_entries
+        self.seed = seed
+        self._entries: "OrderedDict[str, RubricScore]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reused = 0  # Scores copied from a near-duplicate in the same batch
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def score_batch(self, creatives: List[CreativeVariant]) -> Tuple[List[RubricScore], int, int, int]:
+        """Score `creatives`, re-scoring only new or changed ones.
+
+        Returns the scores in input order with this call's hit, miss and
+        reused counts.  A near-duplicate (`duplicate_of` naming an earlier
+        creative in the batch) reuses that creative's score; it is counted
+        as reused, not as a cache hit, and never touches the cache.
+        """
+        scores: List[RubricScore] = []
+        scored: Dict[str, RubricScore] = {}
+        hits = misses = reused = 0
+        for creative in creatives:
+            original = scored.get(creative.duplicate_of) if creative.duplicate_of else None
+            if original is not None:
+                score = original.model_copy(update={"creative_id": creative.variant_id})
+                reused += 1
+            else:
+                key = score_key(creative)
+                with self._lock:
+                    cached = self._entries.get(key)
+                    if cached is not None:
+                        self._entries.move_to_end(key)
+                if cached is not None:
+                    score = cached.model_copy(update={"creative_id": creative.variant_id})
+                    hits += 1
+                else:
+                    score = score_creative(creative, self.seed, key)
+                    misses += 1
+                    with self._lock:
+                        self._entries[key] = score
+                        while len(self._entries) > self.max_entries:
+                            self._entries.popitem(last=False)
+            scores.append(score)
+            scored[creative.variant_id] = score
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.reused += reused
+        return scores, hits, misses, reused
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "reused": self.reused}
@@ -0,0 +1,156 @@
+"""Nearest-neighbour index over generated `fibo_spec`s for instant previews.
+
+Before a new render finishes we can show the closest image generated so
+far.  Each spec is encoded as one integer code per categorical field.  The
+Hamming distance between one-hot vectors is twice the number of fields
+that differ, so comparing codes gives the same ranking as comparing the
+one-hot vectors, with a much smaller matrix.  A query is compared with
+every stored row in one vectorized NumPy pass, with optional per-field
+weights.
+
+Every row belongs to a scope (the tenant that rendered it), and a query
+only matches rows of its own scope, so a preview never shows another
+tenant's image.  The scope is stored as one more coded column.
+
+Memory is bounded: the index is a ring buffer of `capacity` rows, and the
+oldest spec is overwritten once it is full.  Re-inserting an identical spec
+updates its row in place.  Value codes are reference counted and released
+when the last row using them is overwritten, so the vocabularies never
+hold more than `capacity` values per column either.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import threading
+
+import numpy as np
+
+
+INDEXED_FIELDS: Tuple[str, ...] = (
+    "camera_angle",
+    "shot_type",
+    "lighting_style",
+    "color_palette",
+    "background_type",
+)
+
+_MISSING = -1  # Code for a field absent from the spec
+_UNKNOWN = -2  # Query value never seen before; matches no stored row
+
+
+class _Vocabulary:
+    """Reference-counted value codes for one column; freed codes are reused."""
+
+    def __init__(self) -> None:
+        self.codes: Dict[Any, int] = {}
+        self._values: Dict[int, Any] = {}
+        self._refs: Dict[int, int] = {}
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def lookup(self, value: Any) -> int:
+        if value is None:
+            return _MISSING
+        return self.codes.get(value, _UNKNOWN)
+
+    def acquire(self, value: Any) -> int:
+        if value is None:
+            return _MISSING
+        code = self.codes.get(value)
+        if code is None:
+            code = self._free.pop() if self._free else len(self.codes)
+            self.codes[value] = code
+            self._values[code] = value
+            self._refs[code] = 0
+        self._refs[code] += 1
+        return code
+
+    def release(self, code: int) -> None:
+        if code < 0:
+            return
+        self._refs[code] -= 1
+        if not self._refs[code]:
+            del self._refs[code]
+            del self.codes[self._values.pop(code)]
+            self._free.append(code)
+
+
+class SpecIndex:
+    """Bounded, incrementally updated nearest-neighbour index of specs."""
+
+    def __init__(
+        self,
+        capacity: int = 10000,
+        fields: Sequence[str] = INDEXED_FIELDS,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self.weights = np.array([(weights or {}).get(f, 1.0) for f in self.fields], dtype=np.float32)
+        self._codes = np.full((capacity, len(self.fields)), _MISSING, dtype=np.int32)
+        self._scopes = np.full(capacity, _MISSING, dtype=np.int32)
+        self._urls: list = [None] * capacity
+        self._keys: list = [None] * capacity
+        self._slot_by_key: Dict[str, int] = {}
+        self._vocab: Tuple[_Vocabulary, ...] = tuple(_Vocabulary() for _ in self.fields)
+        self._scope_vocab = _Vocabulary()
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def vocabulary_size(self) -> int:
+        """Distinct values held across all columns, scopes included."""
+        with self._lock:
+            return sum(len(vocab) for vocab in self._vocab) + len(self._scope_vocab)
+
+    def _spec_key(self, spec: Dict[str, Any], scope: str) -> str:
+        return json.dumps([scope] + [spec.get(f) for f in self.fields], default=str)
+
+    def insert(self, spec: Dict[str, Any], image_url: str, scope: str = "") -> None:
+        """Add or refresh the image for `spec` within `scope`."""
+        key = self._spec_key(spec, scope)
+        with self._lock:
+            slot = self._slot_by_key.get(key)
+            if slot is None:
+                slot = self._next
+                self._next = (self._next + 1) % self.capacity
+                evicted = self._keys[slot]
+                if evicted is not None:
+                    del self._slot_by_key[evicted]
+                    for vocab, code in zip(self._vocab, self._codes[slot]):
+                        vocab.release(int(code))
+                    self._scope_vocab.release(int(self._scopes[slot]))
+                else:
+                    self._size += 1
+                self._keys[slot] = key
+                self._slot_by_key[key] = slot
+                self._codes[slot] = [vocab.acquire(spec.get(f)) for f, vocab in zip(self.fields, self._vocab)]
+                self._scopes[slot] = self._scope_vocab.acquire(scope)
+            self._urls[slot] = image_url
+
+    def nearest(self, spec: Dict[str, Any], scope: str = "") -> Optional[Tuple[str, float]]:
+        """Return `(image_url, distance)` of the closest stored spec in `scope`.
+
+        The distance is the weighted number of differing fields.
+        """
+        with self._lock:
+            scope_code = self._scope_vocab.lookup(scope)
+            if self._size == 0 or scope_code == _UNKNOWN:
+                return None
+            query = np.array([vocab.lookup(spec.get(f)) for f, vocab in zip(self.fields, self._vocab)],
+                             dtype=np.int32)
+            rows = self._codes[: self._size]
+            distances = np.where(self._scopes[: self._size] == scope_code, (rows != query) @ self.weights, np.inf)
+            best = int(np.argmin(distances))
+            if not np.isfinite(distances[best]):
+                return None
+            return self._urls[best], float(distances[best])
+
+    def nearest_url(self, spec: Dict[str, Any], scope: str = "") -> Optional[str]:
+        found = self.nearest(spec, scope)
+        return found[0] if found else None
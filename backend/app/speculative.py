@@ -0,0 +1,231 @@
+"""Speculative pre-rendering of likely regeneration patches.
+
+After `/creative-variants`, users usually click one of the UI's
+regeneration presets next.  A preset sends a `SpecPatch` holding its
+`prompt` plus the two fields the UI derives from that prompt's keywords,
+and `/regenerate-image` merges the whole patch, prompt included, into the
+spec it renders.  When enabled (`SPECULATIVE_PRERENDER=1`),
+`SpeculativePrerenderer` builds exactly those patches for each fresh
+creative and renders them on a background thread into the generation
+result cache, so the matching `/regenerate-image` call is a cache hit.
+`observe` is called for every regeneration, and `stats()` reports how many
+of them a speculative render had already answered.
+
+Speculation never competes with real traffic: a job only starts while the
+scheduler reports idle capacity, it runs in the lowest priority class, and
+at most one speculative render is in flight.  Spend is capped by a credit
+budget (one credit per render) that refills every `budget_window_s`.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import queue
+import threading
+import time
+
+from ..schemas.models import CreativeVariant
+from .fibo_client import FiboImageResult
+from .result_cache import GenerationCache, result_key
+from .scheduler import GenerationScheduler
+
+
+logger = logging.getLogger(__name__)
+
+# Prompts of the UI's regeneration presets (Product Shot, Lifestyle, Punchy
+# Ad, Lock Lighting), in the order they are offered
+PRESET_PROMPTS: List[str] = [
+    "Professional product photography, studio lighting, eye level",
+    "Lifestyle photography, warm natural lighting, candid moment",
+    "Vibrant advertisement, high contrast, dramatic lighting, close up",
+    "Same framing, warmer lighting with golden hour glow",
+]
+
+# Keyword rules the UI applies to a prompt before sending it, first match wins
+_PROMPT_RULES: List[Tuple[Tuple[str, ...], Dict[str, str]]] = [
+    (("same framing", "lock"), {"lighting_style": "warm", "color_palette": "warm_golden"}),
+    (("studio",), {"background_type": "studio", "lighting_style": "soft"}),
+    (("lifestyle",), {"background_type": "lifestyle", "lighting_style": "warm"}),
+    (("dramatic",), {"lighting_style": "dramatic", "color_palette": "vibrant"}),
+]
+
+RenderFn = Callable[[Dict[str, Any], str], FiboImageResult]
+
+
+def regenerate_patch(prompt: str) -> Dict[str, str]:
+    """The `spec_patch` the UI sends when regenerating with `prompt`."""
+    patch = {"prompt": prompt}
+    lowered = prompt.lower()
+    for keywords, fields in _PROMPT_RULES:
+        if any(keyword in lowered for keyword in keywords):
+            patch.update(fields)
+            break
+    return patch
+
+
+def likely_patches() -> List[Dict[str, str]]:
+    """Patches of the preset regenerations, most likely first."""
+    return [regenerate_patch(prompt) for prompt in PRESET_PROMPTS]
+
+
+class SpeculativePrerenderer:
+    """Background worker that pre-renders neighbour specs when idle."""
+
+    def __init__(
+        self,
+        render: RenderFn,
+        scheduler: GenerationScheduler,
+        cache: GenerationCache,
+        credit_budget: int = 50,
+        budget_window_s: float = 3600.0,
+        per_creative: int = 4,
+        idle_poll_s: float = 0.05,
+        max_pending: int = 256,
+        max_tracked: int = 4096,
+    ) -> None:
+        self.render = render
+        self.scheduler = scheduler
+        self.cache = cache
+        self.credit_budget = credit_budget
+        self.budget_window_s = budget_window_s
+        self.per_creative = per_creative
+        self.idle_poll_s = idle_poll_s
+        self.max_tracked = max_tracked
+        self._jobs: "queue.Queue[Optional[Tuple[Dict[str, Any], str]]]" = queue.Queue(max_pending)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._spent = 0
+        self._thread: Optional[threading.Thread] = None
+        # Cache keys rendered speculatively, to tell which regenerations they served
+        self._rendered: "OrderedDict[str, None]" = OrderedDict()
+        self._stats: Dict[str, int] = {"queued": 0, "rendered": 0, "skipped_cached": 0,
+                                       "dropped": 0, "over_budget": 0, "hits": 0, "misses": 0}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        observed = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / observed if observed else 0.0
+        return stats
+
+    def _take_credit(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.budget_window_s:
+                self._window_start = now
+                self._spent = 0
+            if self._spent >= self.credit_budget:
+                return False
+            self._spent += 1
+            return True
+
+    def credits_remaining(self) -> int:
+        with self._lock:
+            return max(0, self.credit_budget - self._spent)
+
+    def submit(self, creatives: Iterable[CreativeVariant]) -> int:
+        """Queue neighbour renders for freshly generated creatives.
+
+        Returns the number of jobs queued.
+        """
+        queued = 0
+        for creative in creatives:
+            if not creative.fibo_spec or creative.image_status == "error":
+                continue
+            prompt = f"{creative.hook} {creative.headline}"
+            for patch in likely_patches()[: self.per_creative]:
+                spec = {**creative.fibo_spec, **patch}
+                if result_key(spec, prompt) in self.cache:
+                    continue
+                try:
+                    self._jobs.put_nowait((spec, prompt))
+                except queue.Full:
+                    self._count("dropped")
+                    continue
+                queued += 1
+        self._count("queued", queued)
+        if queued:
+            self._ensure_worker()
+        return queued
+
+    def observe(self, spec: Dict[str, Any], prompt: str) -> bool:
+        """Record a real regeneration; True if a speculative render covered it."""
+        key = result_key(spec, prompt)
+        with self._lock:
+            hit = key in self._rendered
+            self._stats["hits" if hit else "misses"] += 1
+        return hit
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="speculative-prerender", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                self._render_job(*job)
+            finally:
+                self._jobs.task_done()
+
+    def _render_job(self, spec: Dict[str, Any], prompt: str) -> None:
+        key = result_key(spec, prompt)
+        if key in self.cache:
+            self._count("skipped_cached")
+            return
+        while not self.scheduler.is_idle():
+            time.sleep(self.idle_poll_s)
+        if not self._take_credit():
+            self._count("over_budget")
+            return
+        try:
+            self.render(spec, prompt)
+            with self._lock:
+                self._stats["rendered"] += 1
+                self._rendered[key] = None
+                while len(self._rendered) > self.max_tracked:
+                    self._rendered.popitem(last=False)
+        except Exception:
+            logger.exception("speculative pre-render failed")
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Block until every queued job has been handled (used in tests)."""
+        deadline = time.monotonic() + timeout
+        while self._jobs.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self) -> None:
+        """Stop the worker thread after the jobs already queued."""
+        if self._thread is not None and self._thread.is_alive():
+            self._jobs.put(None)
+            self._thread.join()
+
+
+def prerenderer_from_env(
+    render: RenderFn, scheduler: GenerationScheduler, cache: GenerationCache
+) -> Optional[SpeculativePrerenderer]:
+    """Build a prerenderer when `SPECULATIVE_PRERENDER` is set, else None."""
+    if os.getenv("SPECULATIVE_PRERENDER", "").lower() not in ("1", "true", "yes", "on"):
+        return None
+    return SpeculativePrerenderer(
+        render,
+        scheduler,
+        cache,
+        credit_budget=int(os.getenv("SPECULATIVE_CREDIT_BUDGET", "50")),
+        budget_window_s=float(os.getenv("SPECULATIVE_BUDGET_WINDOW_S", "3600")),
+        per_creative=int(os.getenv("SPECULATIVE_PER_CREATIVE", "4")),
+    )
@@ -3,6 +3,43 @@
 This package exposes the DataIngestion service for generating or ingesting business snapshots.
 """
 
+from .archive import convert_exports, open_archive, write_archive
+from .connectors import (
+    AssembledSnapshot,
+    Connector,
+    ConnectorResult,
+    FilePerformanceConnector,
+    FileSalesConnector,
+    assemble_snapshot,
+    fixture_connectors,
+)
+from .columnar import ColumnarPerformanceStore, Rollup
 from .data_ingestion import DataIngestion
+from .incremental import IncrementalAggregates
+from .streaming import (
+    LoadStats,
+    PerformanceAggregator,
+    iter_performance_chunks,
+    load_performance_exports,
+)
 
-__all__ = ["DataIngestion"]
+__all__ = [
+    "AssembledSnapshot",
+    "ColumnarPerformanceStore",
+    "Connector",
+    "ConnectorResult",
+    "DataIngestion",
+    "FilePerformanceConnector",
+    "FileSalesConnector",
+    "IncrementalAggregates",
+    "LoadStats",
+    "PerformanceAggregator",
+    "Rollup",
+    "assemble_snapshot",
+    "convert_exports",
+    "fixture_connectors",
+    "iter_performance_chunks",
+    "load_performance_exports",
+    "open_archive",
+    "write_archive",
+]
@@ -0,0 +1,136 @@
+"""Memory-mapped binary archive of historical performance.
+
+Parsing years of CSV on every worker start is slow, and each uvicorn worker
+ends up with its own copy.  An archive stores the columns of a
+`ColumnarPerformanceStore` as fixed-width little-endian arrays.  Workers
+open it with `mmap`, and the NumPy columns are views straight onto the
+mapped pages, so loading is O(1) and every process shares one copy through
+the OS page cache.
+
+Layout::
+
+    b"PERFARC1"                  8-byte magic
+    uint32 (little-endian)       length of the JSON header
+    JSON header                  version, rows, channels, products, columns
+    padding                      up to a 64-byte boundary
+    column data                  each column starts on a 64-byte boundary
+
+Each column entry in the header gives its `name`, `dtype`, `offset` from
+the start of the file, and `nbytes`.
+"""
+
+from typing import Dict, Iterable, Optional
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from .columnar import ColumnarPerformanceStore
+from .streaming import DEFAULT_CHUNK_SIZE
+
+
+MAGIC = b"PERFARC1"
+ARCHIVE_VERSION = 1
+_ALIGN = 64
+_PREFIX = struct.Struct("<8sI")
+COLUMN_ORDER = ("day", "channel", "product", "impressions", "clicks", "conversions", "spend", "revenue")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def write_archive(store: ColumnarPerformanceStore, path: str) -> None:
+    """Write `store` to `path` atomically."""
+    columns = {}
+    for name in COLUMN_ORDER:
+        values = store.column(name)
+        columns[name] = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder("<"))
+    header = {
+        "version": ARCHIVE_VERSION,
+        "rows": len(store),
+        "channels": store.channels,
+        "products": store.products,
+        "columns": [],
+    }
+    # Column offsets depend on the header length, which depends on the offsets;
+    # recompute until the aligned data start stops moving
+    data_start = 0
+    while True:
+        offset = data_start
+        header["columns"] = []
+        for name in COLUMN_ORDER:
+            values = columns[name]
+            header["columns"].append(
+                {"name": name, "dtype": values.dtype.str, "offset": offset, "nbytes": values.nbytes}
+            )
+            offset = _aligned(offset + values.nbytes)
+        encoded = json.dumps(header).encode("utf-8")
+        needed = _aligned(_PREFIX.size + len(encoded))
+        if needed == data_start:
+            break
+        data_start = needed
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".perf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, len(encoded)))
+            f.write(encoded)
+            for entry in header["columns"]:
+                f.write(b"\0" * (entry["offset"] - f.tell()))
+                f.write(columns[entry["name"]].tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_header(buffer) -> Dict[str, object]:
+    if len(buffer) < _PREFIX.size:
+        raise ValueError("Not a performance archive: file too short")
+    magic, header_len = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a performance archive: bad magic")
+    header = json.loads(bytes(buffer[_PREFIX.size:_PREFIX.size + header_len]))
+    if header.get("version") != ARCHIVE_VERSION:
+        raise ValueError(f"Unsupported archive version: {header.get('version')}")
+    return header
+
+
+def open_archive(path: str) -> ColumnarPerformanceStore:
+    """Map an archive read-only and return a store backed by its pages.
+
+    No data is copied; the mapping stays alive as long as any column array
+    references it.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("Not a performance archive: empty file")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header = read_header(mapped)
+    rows = header["rows"]
+    columns = {}
+    for entry in header["columns"]:
+        dtype = np.dtype(entry["dtype"])
+        if entry["nbytes"] != rows * dtype.itemsize or entry["offset"] + entry["nbytes"] > len(mapped):
+            raise ValueError(f"Corrupt archive column: {entry['name']}")
+        columns[entry["name"]] = np.frombuffer(mapped, dtype=dtype, count=rows, offset=entry["offset"])
+    return ColumnarPerformanceStore.from_columns(columns, header["channels"], header["products"])
+
+
+def convert_exports(
+    paths: Iterable[str],
+    archive_path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    channels: Optional[Dict[str, str]] = None,
+) -> int:
+    """Stream CSV/NDJSON exports into an archive; returns the row count."""
+    store = ColumnarPerformanceStore.from_exports(paths, chunk_size=chunk_size, channels=channels)
+    write_archive(store, archive_path)
+    return len(store)
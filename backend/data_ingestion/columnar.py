@@ -0,0 +1,272 @@
+"""Columnar in-memory store of historical performance rows.
+
+Rows are kept as one NumPy array per field instead of one Pydantic object
+per row.  Channels and products are dictionary-encoded as small integer
+codes, days as days since the Unix epoch, and money as float32, which
+takes 30 bytes per row.  Sums are always accumulated in float64.
+
+Group-by rollups by channel, product and/or day pack the key columns into
+one int64 per row, then use `np.unique` and `np.bincount` with weights, so a rollup is a handful of
+vectorized passes however many rows there are.  Pydantic models are only
+built at the API boundary (`from_models` / `to_models`).
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..schemas.models import HistoricalPerformance
+from .streaming import DEFAULT_CHUNK_SIZE, PerformanceRow, iter_performance_chunks
+
+
+MISSING_DAY = np.iinfo(np.int32).min
+DIMENSIONS = ("channel", "product", "day")
+
+_COLUMN_DTYPES: Dict[str, type] = {
+    "day": np.int32,
+    "channel": np.int16,
+    "product": np.int32,
+    "impressions": np.int32,
+    "clicks": np.int32,
+    "conversions": np.int32,
+    "spend": np.float32,
+    "revenue": np.float32,
+}
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise division that yields 0 where the denominator is 0."""
+    out = np.zeros(len(numerator), dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+@dataclass
+class Rollup:
+    """Totals and KPIs per group; every array has one entry per group."""
+
+    keys: Dict[str, list]
+    impressions: np.ndarray
+    clicks: np.ndarray
+    conversions: np.ndarray
+    spend: np.ndarray
+    revenue: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.impressions)
+
+    @property
+    def ctr(self) -> np.ndarray:
+        return _ratio(self.clicks, self.impressions)
+
+    @property
+    def cvr(self) -> np.ndarray:
+        return _ratio(self.conversions, self.clicks)
+
+    @property
+    def cpc(self) -> np.ndarray:
+        return _ratio(self.spend, self.clicks)
+
+    @property
+    def roas(self) -> np.ndarray:
+        return _ratio(self.revenue, self.spend)
+
+    def to_records(self) -> List[Dict[str, object]]:
+        ctr, cvr, cpc, roas = self.ctr, self.cvr, self.cpc, self.roas
+        return [
+            {
+                **{name: values[i] for name, values in self.keys.items()},
+                "impressions": int(self.impressions[i]),
+                "clicks": int(self.clicks[i]),
+                "conversions": int(self.conversions[i]),
+                "spend": round(float(self.spend[i]), 2),
+                "revenue": round(float(self.revenue[i]), 2),
+                "ctr": float(ctr[i]),
+                "cvr": float(cvr[i]),
+                "cpc": float(cpc[i]),
+                "roas": float(roas[i]),
+            }
+            for i in range(len(self))
+        ]
+
+
+class ColumnarPerformanceStore:
+    """Append-only columnar table of performance rows."""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in _COLUMN_DTYPES.items()}
+        self._size = 0
+        self.channels: List[str] = []
+        self.products: List[str] = []
+        self._channel_codes: Dict[str, int] = {}
+        self._product_codes: Dict[str, int] = {}
+        self._day_codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of one column's filled rows."""
+        view = self._columns[name][: self._size]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self.column(name).nbytes for name in self._columns)
+
+    def _code(self, value: str, codes: Dict[str, int], values: List[str]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def _day(self, day: str) -> int:
+        code = self._day_codes.get(day)
+        if code is None:
+            try:
+                code = date.fromisoformat(day).toordinal() - _EPOCH_ORDINAL
+            except ValueError:
+                code = MISSING_DAY
+            self._day_codes[day] = code
+        return code
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = len(self._columns["day"])
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name, values in self._columns.items():
+            grown = np.zeros(capacity, dtype=values.dtype)
+            grown[: self._size] = values[: self._size]
+            self._columns[name] = grown
+
+    def append_rows(self, rows: Sequence[PerformanceRow]) -> None:
+        """Append parsed rows, as yielded by `iter_performance_chunks`."""
+        n = len(rows)
+        if not n:
+            return
+        self._reserve(n)
+        start, end = self._size, self._size + n
+        days, channels, products, impressions, clicks, conversions, spend, revenue = zip(*rows)
+        cols = self._columns
+        cols["day"][start:end] = [self._day(d) for d in days]
+        cols["channel"][start:end] = [self._code(c, self._channel_codes, self.channels) for c in channels]
+        cols["product"][start:end] = [self._code(p, self._product_codes, self.products) for p in products]
+        cols["impressions"][start:end] = impressions
+        cols["clicks"][start:end] = clicks
+        cols["conversions"][start:end] = conversions
+        cols["spend"][start:end] = spend
+        cols["revenue"][start:end] = revenue
+        self._size = end
+
+    @classmethod
+    def from_columns(
+        cls, columns: Dict[str, np.ndarray], channels: List[str], products: List[str]
+    ) -> "ColumnarPerformanceStore":
+        """Wrap existing column arrays (e.g. memory-mapped) without copying.
+
+        Appending later copies the columns into private, growable arrays.
+        """
+        missing = set(_COLUMN_DTYPES) - set(columns)
+        if missing:
+            raise ValueError(f"Missing columns: {sorted(missing)}")
+        sizes = {len(values) for values in columns.values()}
+        if len(sizes) > 1:
+            raise ValueError("Columns differ in length")
+        store = cls(capacity=0)
+        store._columns = {name: columns[name] for name in _COLUMN_DTYPES}
+        store._size = sizes.pop() if sizes else 0
+        store.channels = list(channels)
+        store.products = list(products)
+        store._channel_codes = {name: i for i, name in enumerate(store.channels)}
+        store._product_codes = {name: i for i, name in enumerate(store.products)}
+        return store
+
+    @classmethod
+    def from_exports(
+        cls,
+        paths: Iterable[str],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        channels: Optional[Dict[str, str]] = None,
+    ) -> "ColumnarPerformanceStore":
+        store = cls()
+        for path in paths:
+            for chunk in iter_performance_chunks(path, chunk_size, (channels or {}).get(path)):
+                store.append_rows(chunk)
+        return store
+
+    @classmethod
+    def from_models(cls, rows: Iterable[HistoricalPerformance]) -> "ColumnarPerformanceStore":
+        """Load API models, which carry no day or product."""
+        store = cls()
+        store.append_rows([
+            ("", r.channel, "", r.impressions, r.clicks, r.conversions, r.spend, r.revenue)
+            for r in rows
+        ])
+        return store
+
+    def _decode(self, dimension: str, codes: np.ndarray) -> list:
+        if dimension == "channel":
+            return [self.channels[c] for c in codes]
+        if dimension == "product":
+            return [self.products[c] for c in codes]
+        return [
+            None if c == MISSING_DAY else date.fromordinal(int(c) + _EPOCH_ORDINAL).isoformat()
+            for c in codes
+        ]
+
+    def rollup(self, by: Sequence[str] = ("channel",), mask: Optional[np.ndarray] = None) -> Rollup:
+        """Sum every metric per distinct combination of the `by` dimensions.
+
+        `mask` optionally restricts the rows, e.g. `store.column("day") >= d`.
+        Groups are ordered by their key codes.
+        """
+        unknown = set(by) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown rollup dimensions: {sorted(unknown)}")
+        select = slice(None) if mask is None else mask
+        key_columns = [self.column(name)[select].astype(np.int64) for name in by]
+        # Pack the key columns into one int64 per row (mixed radix), so grouping
+        # is a 1-D unique instead of a much slower row-wise one
+        packed = np.zeros(len(self.column("day")[select]), dtype=np.int64)
+        for values in key_columns:
+            if len(values):
+                low = values.min()
+                packed = packed * (int(values.max() - low) + 1) + (values - low)
+        _, first, inverse = np.unique(packed, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        n_groups = len(first) if by else 1
+
+        def total(name: str) -> np.ndarray:
+            weights = self.column(name)[select].astype(np.float64)
+            return np.bincount(inverse, weights=weights, minlength=n_groups)
+
+        return Rollup(
+            keys={name: self._decode(name, values[first]) for name, values in zip(by, key_columns)},
+            impressions=total("impressions").astype(np.int64),
+            clicks=total("clicks").astype(np.int64),
+            conversions=total("conversions").astype(np.int64),
+            spend=total("spend"),
+            revenue=total("revenue"),
+        )
+
+    def to_models(self) -> List[HistoricalPerformance]:
+        """Per-channel totals as the API's `HistoricalPerformance` models."""
+        rollup = self.rollup(("channel",))
+        return [
+            HistoricalPerformance(
+                channel=record["channel"],
+                impressions=record["impressions"],
+                clicks=record["clicks"],
+                conversions=record["conversions"],
+                spend=record["spend"],
+                revenue=record["revenue"],
+            )
+            for record in rollup.to_records()
+        ]
@@ -0,0 +1,206 @@
+"""Concurrent multi-source ingestion connectors.
+
+A snapshot is assembled from several exports: ad platforms (Meta, Google,
+TikTok) supply `historical_performance`, and a store (Shopify) supplies
+`sales_data`.  Each source is a connector whose `fetch()` returns a
+partial result.  `assemble_snapshot` runs all connectors at once on a
+thread pool (or a process pool for CPU-heavy parsing), merges the results
+into one `BusinessSnapshot`, and reports timing per source.  A failing
+source is logged and reported but does not stop the others.
+
+`sales_data` rows always have the shape of `streaming.sales_row`
+(`timestamp`, `conversions`, `spend`, `revenue`): a store supplies orders
+as conversions and its own revenue, and spend comes from the ad platforms
+for the same day.
+
+The file-based connectors read local exports, and `fixture_connectors()`
+points them at the sample files in `fixtures/` so everything works offline.
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+import csv
+import logging
+import math
+import multiprocessing
+import os
+import time
+
+from ..schemas.models import Audience, BusinessSnapshot, Product
+from .streaming import DEFAULT_CHUNK_SIZE, PerformanceAggregator, sales_row
+
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+@dataclass
+class ConnectorResult:
+    """What one source contributed, and how long it took."""
+
+    source: str
+    performance: Optional[PerformanceAggregator] = None
+    sales: Dict[str, List[float]] = field(default_factory=dict)  # day -> [orders, revenue]
+    rows: int = 0
+    skipped: int = 0  # Rows that could not be parsed
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+
+
+class Connector(ABC):
+    """A data source; subclasses implement `fetch()`.
+
+    Connectors must be picklable so they can run on a process pool.
+    """
+
+    name: str = "connector"
+
+    @abstractmethod
+    def fetch(self) -> ConnectorResult:
+        """Read the source and return what it contributes."""
+
+
+class FilePerformanceConnector(Connector):
+    """Ad platform performance from local CSV/NDJSON exports."""
+
+    def __init__(
+        self,
+        name: str,
+        paths: Sequence[str],
+        channel: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        self.name = name
+        self.paths = list(paths)
+        self.channel = channel
+        self.chunk_size = chunk_size
+
+    def fetch(self) -> ConnectorResult:
+        aggregator = PerformanceAggregator()
+        for path in self.paths:
+            aggregator.add_file(path, self.chunk_size, self.channel)
+        return ConnectorResult(source=self.name, performance=aggregator, rows=aggregator.stats.rows,
+                               skipped=aggregator.stats.skipped)
+
+
+class FileSalesConnector(Connector):
+    """Store orders from a Shopify-style CSV export, totalled per day.
+
+    Expected columns: `created_at` and `total_price`; each row is one order.
+    Rows that cannot be parsed are counted in `skipped` and logged.
+    """
+
+    def __init__(self, name: str, path: str) -> None:
+        self.name = name
+        self.path = path
+
+    def fetch(self) -> ConnectorResult:
+        result = ConnectorResult(source=self.name)
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                try:
+                    day = record["created_at"][:10]
+                    revenue = float(record["total_price"])
+                    if not day or not math.isfinite(revenue):
+                        raise ValueError("row has no date or a non-finite total")
+                except (KeyError, TypeError, ValueError):
+                    result.skipped += 1
+                    continue
+                totals = result.sales.setdefault(day, [0, 0.0])
+                totals[0] += 1
+                totals[1] += revenue
+                result.rows += 1
+        if result.skipped:
+            logger.warning("skipped unparseable order rows", extra={"source": self.name, "path": self.path,
+                                                                   "skipped": result.skipped})
+        return result
+
+
+def _run(connector: Connector) -> ConnectorResult:
+    """Fetch one source, turning any failure into an error result."""
+    started = time.perf_counter()
+    try:
+        result = connector.fetch()
+    except Exception as e:
+        result = ConnectorResult(source=connector.name, error=f"{type(e).__name__}: {e}")
+    result.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def _sales_rows(sales: Dict[str, List[float]], performance: PerformanceAggregator) -> List[Dict[str, float]]:
+    """Store orders per day as `sales_row`s, with that day's ad spend."""
+    rows = []
+    for day, (orders, revenue) in sorted(sales.items()):
+        spend = performance.by_day[day][3] if day in performance.by_day else 0.0
+        row = sales_row(day, orders, spend, revenue)
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+@dataclass
+class AssembledSnapshot:
+    snapshot: BusinessSnapshot
+    sources: List[ConnectorResult]
+
+    def timings(self) -> Dict[str, Dict[str, object]]:
+        """Per-source summary without the partial data."""
+        return {
+            r.source: {"rows": r.rows, "skipped": r.skipped, "elapsed_ms": r.elapsed_ms, "error": r.error}
+            for r in self.sources
+        }
+
+
+def assemble_snapshot(
+    connectors: Sequence[Connector],
+    products: Optional[List[Product]] = None,
+    audiences: Optional[List[Audience]] = None,
+    max_workers: Optional[int] = None,
+    use_processes: bool = False,
+) -> AssembledSnapshot:
+    """Fetch every source concurrently and merge them into one snapshot.
+
+    Without a sales connector, `sales_data` falls back to daily totals from
+    the ad platforms.
+    """
+    workers = max_workers or max(len(connectors), 1)
+    if use_processes:
+        executor: Executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        executor = ThreadPoolExecutor(workers, thread_name_prefix="connector")
+    with executor:
+        results = list(executor.map(_run, connectors))
+
+    performance = PerformanceAggregator()
+    sales: Dict[str, List[float]] = {}
+    for result in results:
+        if result.error:
+            logger.warning("connector failed", extra={"source": result.source, "error": result.error})
+            continue
+        logger.info("connector fetched", extra={"source": result.source, "rows": result.rows,
+                                                "elapsed_ms": result.elapsed_ms})
+        if result.performance is not None:
+            performance.merge(result.performance)
+        if result.sales:
+            for day, totals in result.sales.items():
+                current = sales.setdefault(day, [0, 0.0])
+                for i, value in enumerate(totals):
+                    current[i] += value
+
+    snapshot = performance.to_snapshot(products=products, audiences=audiences)
+    if sales:
+        snapshot.sales_data = _sales_rows(sales, performance)
+    return AssembledSnapshot(snapshot=snapshot, sources=results)
+
+
+def fixture_connectors(directory: str = FIXTURES_DIR) -> List[Connector]:
+    """Connectors over the sample exports shipped in `fixtures/`."""
+    return [
+        FilePerformanceConnector("meta", [os.path.join(directory, "meta_ads.csv")]),
+        FilePerformanceConnector("google", [os.path.join(directory, "google_ads.ndjson")], channel="Google"),
+        FilePerformanceConnector("tiktok", [os.path.join(directory, "tiktok_ads.csv")]),
+        FileSalesConnector("shopify", os.path.join(directory, "shopify_orders.csv")),
+    ]
@@ -5,7 +5,11 @@ This module provides simple routines to generate or ingest advertising and busin
 For the hackathon, it returns a mocked BusinessSnapshot object with dummy products, audiences and historical performance.
 """
 
+from typing import Dict, List, Optional, Sequence
+
 from ..schemas.models import BusinessSnapshot, Product, Audience, HistoricalPerformance
+from .connectors import Connector, assemble_snapshot
+from .streaming import DEFAULT_CHUNK_SIZE, load_performance_exports
 
 class DataIngestion:
     """Service for ingesting campaign and sales data."""
@@ -53,3 +57,30 @@ class DataIngestion:
             audiences=audiences,
             historical_performance=historical,
         )
+
+    def snapshot_from_exports(
+        self,
+        paths: Sequence[str],
+        products: Optional[List[Product]] = None,
+        audiences: Optional[List[Audience]] = None,
+        channels: Optional[Dict[str, str]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> BusinessSnapshot:
+        """Build a BusinessSnapshot by streaming CSV/NDJSON performance exports.
+
+        Without `products`, products are derived from the exports' `product_id`s.
+        """
+        aggregator = load_performance_exports(paths, chunk_size=chunk_size, channels=channels)
+        return aggregator.to_snapshot(products=products, audiences=audiences)
+
+    def snapshot_from_connectors(
+        self,
+        connectors: Sequence[Connector],
+        products: Optional[List[Product]] = None,
+        audiences: Optional[List[Audience]] = None,
+    ) -> BusinessSnapshot:
+        """Fetch every source concurrently and merge them into one BusinessSnapshot.
+
+        Failed sources are skipped; use `assemble_snapshot` for per-source timings and errors.
+        """
+        return assemble_snapshot(connectors, products=products, audiences=audiences).snapshot
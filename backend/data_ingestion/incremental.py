@@ -0,0 +1,226 @@
+"""Incrementally maintained snapshot aggregates with on-disk checkpoints.
+
+New daily spend data is applied as a batch of parsed rows.  Each batch
+updates these in O(batch) time, without rescanning history:
+
+- running totals per channel, day and product (a `PerformanceAggregator`);
+- row counts per channel and product;
+- daily buckets for the last `window_days` days, used for windowed CTR,
+  CVR, CPC and ROAS per channel or product.
+
+Days that fall out of the window are dropped whole, so the buckets stay
+bounded.  `checkpoint()` writes the state, including how far each
+append-only export file has been read, atomically as JSON.  After a
+restart, `load()` followed by `apply_file()` reads only the lines appended
+since the checkpoint.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence
+import json
+import logging
+import os
+import tempfile
+
+from ..agents.metrics import total_kpis
+from ..schemas.models import Audience, BusinessSnapshot, Product
+from .streaming import (
+    DEFAULT_CHUNK_SIZE,
+    LoadStats,
+    PerformanceAggregator,
+    PerformanceRow,
+    file_format,
+    iter_line_chunks,
+    iter_performance_chunks,
+)
+
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+WINDOW_DIMENSIONS = ("channel", "product")
+
+# Offset recorded for compressed exports, which are only ever read whole
+FULLY_READ = -1
+
+
+def _is_day(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+class IncrementalAggregates:
+    """Aggregates the planner needs, updated batch by batch."""
+
+    def __init__(self, window_days: int = 7) -> None:
+        self.window_days = window_days
+        self.totals = PerformanceAggregator()
+        self.row_counts: Dict[str, Dict[str, int]] = {dim: {} for dim in WINDOW_DIMENSIONS}
+        # day -> dimension -> key -> totals, for days inside the window only
+        self._daily: Dict[str, Dict[str, Dict[str, List[float]]]] = {}
+        self.watermark: Optional[str] = None  # Latest day seen
+        self.sources: Dict[str, int] = {}  # Export path -> bytes already applied
+        self.batches = 0
+
+    def _cutoff(self) -> Optional[str]:
+        if self.watermark is None:
+            return None
+        oldest = date.fromisoformat(self.watermark) - timedelta(days=self.window_days - 1)
+        return oldest.isoformat()
+
+    def apply(self, rows: Sequence[PerformanceRow]) -> None:
+        """Fold a batch of rows into every aggregate."""
+        if not rows:
+            return
+        self.totals.add_rows(rows)
+        self.totals.stats.rows += len(rows)
+
+        valid_days = {d for d in {row[0] for row in rows} if _is_day(d)}
+        latest = max(valid_days, default=None)
+        if latest is not None and (self.watermark is None or latest > self.watermark):
+            self.watermark = latest
+            cutoff = self._cutoff()
+            for day in [d for d in self._daily if d < cutoff]:
+                del self._daily[day]
+        cutoff = self._cutoff()
+
+        channel_counts, product_counts = self.row_counts["channel"], self.row_counts["product"]
+        for row in rows:
+            day, channel, product = row[0], row[1], row[2]
+            channel_counts[channel] = channel_counts.get(channel, 0) + 1
+            if product:
+                product_counts[product] = product_counts.get(product, 0) + 1
+            if cutoff is None or day < cutoff or day not in valid_days:
+                continue
+            buckets = self._daily.setdefault(day, {dim: {} for dim in WINDOW_DIMENSIONS})
+            for dim, key in (("channel", channel), ("product", product)):
+                if not key:
+                    continue
+                totals = buckets[dim].setdefault(key, [0, 0, 0, 0.0, 0.0])
+                for i in range(5):
+                    totals[i] += row[3 + i]
+        self.batches += 1
+
+    def windowed(self, dimension: str = "channel") -> Dict[str, Dict[str, float]]:
+        """Totals and rates per key over the last `window_days` days."""
+        if dimension not in WINDOW_DIMENSIONS:
+            raise ValueError(f"Unknown window dimension: {dimension}")
+        sums: Dict[str, List[float]] = {}
+        for buckets in self._daily.values():
+            for key, totals in buckets[dimension].items():
+                current = sums.setdefault(key, [0, 0, 0, 0.0, 0.0])
+                for i in range(5):
+                    current[i] += totals[i]
+        return {key: total_kpis(totals) for key, totals in sorted(sums.items())}
+
+    def _lines_from(self, path: str, offset: int) -> Iterator[str]:
+        """Yield complete lines after `offset`, advancing `sources[path]`.
+
+        A trailing line without a newline may still be being written, so it
+        is left for the next call.
+        """
+        with open(path, "rb") as f:
+            if file_format(path) == "csv":
+                header = f.readline()
+                yield header.decode("utf-8")
+                offset = max(offset, len(header))
+                self.sources[path] = offset
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                self.sources[path] = self.sources.get(path, 0) + len(raw)
+                yield raw.decode("utf-8")
+
+    def apply_file(self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, channel: Optional[str] = None) -> int:
+        """Apply the rows appended to an export since it was last read.
+
+        Returns the number of rows applied.  Compressed exports cannot be
+        resumed, so they are applied once and then skipped.
+        """
+        # apply() counts rows; only skipped rows and files come from the loader
+        load_stats = LoadStats()
+        offset = self.sources.get(path, 0)
+        if path.endswith(".gz"):
+            if offset == FULLY_READ:
+                return 0
+            chunks = iter_performance_chunks(path, chunk_size, channel, load_stats)
+        else:
+            if offset > os.path.getsize(path):
+                logger.warning("export shrank since last checkpoint; skipping", extra={"path": path})
+                return 0
+            load_stats.files += 1
+            lines = self._lines_from(path, offset)
+            chunks = iter_line_chunks(lines, file_format(path), chunk_size, channel, load_stats)
+        for chunk in chunks:
+            self.apply(chunk)
+        if path.endswith(".gz"):
+            self.sources[path] = FULLY_READ
+        self.totals.stats.skipped += load_stats.skipped
+        self.totals.stats.files += load_stats.files
+        logger.info("export applied", extra={"path": path, "rows": load_stats.rows})
+        return load_stats.rows
+
+    def to_snapshot(
+        self,
+        products: Optional[List[Product]] = None,
+        audiences: Optional[List[Audience]] = None,
+    ) -> BusinessSnapshot:
+        return self.totals.to_snapshot(products=products, audiences=audiences)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "version": CHECKPOINT_VERSION,
+            "window_days": self.window_days,
+            "by_channel": self.totals.by_channel,
+            "by_day": self.totals.by_day,
+            "by_product": self.totals.by_product,
+            "stats": vars(self.totals.stats),
+            "row_counts": self.row_counts,
+            "daily": self._daily,
+            "watermark": self.watermark,
+            "sources": self.sources,
+            "batches": self.batches,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "IncrementalAggregates":
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version: {data.get('version')}")
+        state = cls(window_days=int(data["window_days"]))
+        state.totals.by_channel = data["by_channel"]
+        state.totals.by_day = data["by_day"]
+        state.totals.by_product = data["by_product"]
+        for name, value in data["stats"].items():
+            setattr(state.totals.stats, name, value)
+        state.row_counts = data["row_counts"]
+        state._daily = data["daily"]
+        state.watermark = data["watermark"]
+        state.sources = data["sources"]
+        state.batches = data["batches"]
+        return state
+
+    def checkpoint(self, path: str) -> None:
+        """Write the state to `path` atomically."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, window_days: int = 7) -> "IncrementalAggregates":
+        """Restore a checkpoint, or start empty if there is none yet."""
+        if not os.path.isfile(path):
+            return cls(window_days=window_days)
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,292 @@
+"""Streaming loaders for historical performance exports.
+
+Channel exports can run to millions of rows, so they are never loaded
+whole.  Files are read in chunks of parsed rows and folded straight into
+per-channel, per-day and per-product totals.  Memory is bounded by the
+chunk size plus the number of distinct keys, not by the number of rows.
+
+Supported formats are CSV with a header row and NDJSON (one JSON object per
+line), optionally gzip-compressed (`.gz`).  Expected columns:
+
+    date, channel, product_id, impressions, clicks, conversions, spend, revenue
+
+`date` is an ISO date or timestamp; only the `YYYY-MM-DD` part is kept.
+A per-channel export may omit `channel`, and the loader's `channel`
+argument is used instead.  Rows that cannot be parsed, including ones
+with NaN, infinite or out-of-range numbers, are skipped and counted.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+import csv
+import gzip
+import io
+import json
+import math
+import os
+
+from ..schemas.models import Audience, BusinessSnapshot, HistoricalPerformance, Product
+
+
+# (day, channel, product_id, impressions, clicks, conversions, spend, revenue)
+PerformanceRow = Tuple[str, str, str, int, int, int, float, float]
+
+COLUMNS: Tuple[str, ...] = (
+    "date", "channel", "product_id", "impressions", "clicks", "conversions", "spend", "revenue",
+)
+METRICS: Tuple[str, ...] = ("impressions", "clicks", "conversions", "spend", "revenue")
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def _open_text(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def file_format(path: str) -> str:
+    """Return `csv` or `ndjson` from the file extension (ignoring `.gz`)."""
+    name = path[:-3] if path.endswith(".gz") else path
+    ext = os.path.splitext(name)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".ndjson", ".jsonl"):
+        return "ndjson"
+    raise ValueError(f"Unsupported export format: {path}")
+
+
+def _number(value: object) -> float:
+    """A finite float; NaN, infinities and out-of-range numbers reject the row."""
+    number = float(value or 0)
+    if not math.isfinite(number):
+        raise ValueError(f"non-finite value {value!r}")
+    return number
+
+
+def _parse(
+    day: object, channel: object, product: object,
+    impressions: object, clicks: object, conversions: object, spend: object, revenue: object,
+    default_channel: Optional[str],
+) -> PerformanceRow:
+    channel = channel or default_channel
+    if not channel or not day:
+        raise ValueError("row has no channel or date")
+    return (
+        str(day)[:10],
+        str(channel),
+        str(product or ""),
+        int(_number(impressions)),
+        int(_number(clicks)),
+        int(_number(conversions)),
+        _number(spend),
+        _number(revenue),
+    )
+
+
+def sales_row(day: str, conversions: float, spend: float, revenue: float) -> Optional[Dict[str, float]]:
+    """One `BusinessSnapshot.sales_data` row; `timestamp` is UTC midnight in epoch seconds.
+
+    Every source builds `sales_data` with this, so the row shape does not
+    depend on where the numbers came from.  Returns None for a bad date.
+    """
+    try:
+        midnight = datetime.combine(date.fromisoformat(day), datetime.min.time(), tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    return {
+        "timestamp": midnight.timestamp(),
+        "conversions": float(conversions),
+        "spend": round(spend, 2),
+        "revenue": round(revenue, 2),
+    }
+
+
+@dataclass
+class LoadStats:
+    """Counters for one or more loaded files."""
+
+    rows: int = 0
+    skipped: int = 0
+    files: int = 0
+
+    def merge(self, other: "LoadStats") -> None:
+        self.rows += other.rows
+        self.skipped += other.skipped
+        self.files += other.files
+
+
+def _csv_rows(f: Iterable[str], channel: Optional[str], stats: LoadStats) -> Iterator[PerformanceRow]:
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    positions = {name.strip().lower(): i for i, name in enumerate(header)}
+    indices = [positions.get(name) for name in COLUMNS]
+    for record in reader:
+        try:
+            values = [record[i] if i is not None else None for i in indices]
+            yield _parse(*values, default_channel=channel)
+        except (ValueError, IndexError, OverflowError):
+            stats.skipped += 1
+
+
+def _ndjson_rows(f: Iterable[str], channel: Optional[str], stats: LoadStats) -> Iterator[PerformanceRow]:
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            yield _parse(*(record.get(name) for name in COLUMNS), default_channel=channel)
+        except (ValueError, TypeError, AttributeError, OverflowError):
+            stats.skipped += 1
+
+
+def iter_line_chunks(
+    lines: Iterable[str],
+    fmt: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    channel: Optional[str] = None,
+    stats: Optional[LoadStats] = None,
+) -> Iterator[List[PerformanceRow]]:
+    """Parse `csv` (header first) or `ndjson` text lines into row chunks."""
+    stats = stats if stats is not None else LoadStats()
+    parse_rows = _csv_rows if fmt == "csv" else _ndjson_rows
+    chunk: List[PerformanceRow] = []
+    for row in parse_rows(lines, channel, stats):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            stats.rows += len(chunk)
+            yield chunk
+            chunk = []
+    if chunk:
+        stats.rows += len(chunk)
+        yield chunk
+
+
+def iter_performance_chunks(
+    path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    channel: Optional[str] = None,
+    stats: Optional[LoadStats] = None,
+) -> Iterator[List[PerformanceRow]]:
+    """Yield lists of at most `chunk_size` parsed rows from one export file."""
+    stats = stats if stats is not None else LoadStats()
+    fmt = file_format(path)
+    stats.files += 1
+    with _open_text(path) as f:
+        yield from iter_line_chunks(f, fmt, chunk_size, channel, stats)
+
+
+def _add(totals: List[float], row: PerformanceRow) -> None:
+    totals[0] += row[3]
+    totals[1] += row[4]
+    totals[2] += row[5]
+    totals[3] += row[6]
+    totals[4] += row[7]
+
+
+@dataclass
+class PerformanceAggregator:
+    """Running totals of the five performance metrics by channel, day and product.
+
+    Each totals list is `[impressions, clicks, conversions, spend, revenue]`.
+    """
+
+    by_channel: Dict[str, List[float]] = field(default_factory=dict)
+    by_day: Dict[str, List[float]] = field(default_factory=dict)
+    by_product: Dict[str, List[float]] = field(default_factory=dict)
+    stats: LoadStats = field(default_factory=LoadStats)
+
+    def add_rows(self, rows: Iterable[PerformanceRow]) -> None:
+        by_channel, by_day, by_product = self.by_channel, self.by_day, self.by_product
+        for row in rows:
+            day, channel, product = row[0], row[1], row[2]
+            totals = by_channel.get(channel)
+            if totals is None:
+                totals = by_channel[channel] = [0, 0, 0, 0.0, 0.0]
+            _add(totals, row)
+            totals = by_day.get(day)
+            if totals is None:
+                totals = by_day[day] = [0, 0, 0, 0.0, 0.0]
+            _add(totals, row)
+            if product:
+                totals = by_product.get(product)
+                if totals is None:
+                    totals = by_product[product] = [0, 0, 0, 0.0, 0.0]
+                _add(totals, row)
+
+    def add_file(self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, channel: Optional[str] = None) -> None:
+        for chunk in iter_performance_chunks(path, chunk_size, channel, self.stats):
+            self.add_rows(chunk)
+
+    def merge(self, other: "PerformanceAggregator") -> None:
+        """Fold another aggregator's totals into this one."""
+        for mine, theirs in (
+            (self.by_channel, other.by_channel),
+            (self.by_day, other.by_day),
+            (self.by_product, other.by_product),
+        ):
+            for key, totals in theirs.items():
+                current = mine.setdefault(key, [0, 0, 0, 0.0, 0.0])
+                for i, value in enumerate(totals):
+                    current[i] += value
+        self.stats.merge(other.stats)
+
+    def historical_performance(self) -> List[HistoricalPerformance]:
+        return [
+            HistoricalPerformance(
+                channel=channel,
+                impressions=int(t[0]),
+                clicks=int(t[1]),
+                conversions=int(t[2]),
+                spend=round(t[3], 2),
+                revenue=round(t[4], 2),
+            )
+            for channel, t in sorted(self.by_channel.items())
+        ]
+
+    def sales_data(self) -> List[Dict[str, float]]:
+        """Daily totals, oldest first, as `sales_row`s."""
+        rows = []
+        for day, t in sorted(self.by_day.items()):
+            row = sales_row(day, t[2], t[3], t[4])
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def products(self) -> List[Product]:
+        """Products seen in the exports, priced at their average order value."""
+        return [
+            Product(id=product, name=product, price=round(t[4] / t[2], 2) if t[2] else 0.0)
+            for product, t in sorted(self.by_product.items())
+        ]
+
+    def to_snapshot(
+        self,
+        products: Optional[List[Product]] = None,
+        audiences: Optional[List[Audience]] = None,
+    ) -> BusinessSnapshot:
+        return BusinessSnapshot(
+            products=products if products is not None else self.products(),
+            audiences=audiences or [],
+            historical_performance=self.historical_performance(),
+            sales_data=self.sales_data(),
+        )
+
+
+def load_performance_exports(
+    paths: Sequence[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    channels: Optional[Dict[str, str]] = None,
+) -> PerformanceAggregator:
+    """Stream every export in `paths` into one aggregator.
+
+    `channels` maps a path to the channel of a per-channel export whose rows
+    have no `channel` column.
+    """
+    aggregator = PerformanceAggregator()
+    for path in paths:
+        aggregator.add_file(path, chunk_size, (channels or {}).get(path))
+    return aggregator
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from datetime import datetime
+
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 
 
@@ -65,6 +67,8 @@ class ExperimentPlan(BaseModel):
     metrics: List[str]
     sample_size_rules: SampleSizeRules
     guardrails: Optional[Guardrails] = None
+    # Expected profit per click of the plan's combination (combinatorial planning only)
+    priority_score: Optional[float] = None
 
 
 class CreativeVariant(BaseModel):
@@ -75,9 +79,12 @@ class CreativeVariant(BaseModel):
     call_to_action: str
 
     image_url: Optional[str] = None
+    asset_url: Optional[str] = None
+    preview_url: Optional[str] = None
     fibo_spec: Optional[Dict[str, Any]] = None
     image_status: Optional[str] = None
     guardrails_report: Optional[Dict[str, Any]] = None
+    duplicate_of: Optional[str] = None
 
 
 class RubricScore(BaseModel):
@@ -97,23 +104,57 @@ class RubricScore(BaseModel):
 
 class VariantResult(BaseModel):
     variant_id: str
-    impressions: int
-    clicks: int
-    spend: float
-    conversions: int
-    revenue: float
-    profit: float
-    cac: float
-    roas: float
+    # Counts feed Beta/Gamma posteriors, which need non-negative, finite input
+    impressions: int = Field(ge=0)
+    clicks: int = Field(ge=0)
+    spend: float = Field(ge=0, allow_inf_nan=False)
+    conversions: int = Field(ge=0)
+    revenue: float = Field(ge=0, allow_inf_nan=False)
+    # Derived server-side from the fields above; client values are ignored
+    profit: Optional[float] = None
+    cac: Optional[float] = None
+    roas: Optional[float] = None
+    ctr: Optional[float] = None
+    cvr: Optional[float] = None
+    cpc: Optional[float] = None
+    # Optional breakdown of the row, used by the result cubes
+    channel: Optional[str] = None
+    audience_segment: Optional[str] = None
 
 
 class ExperimentResult(BaseModel):
     experiment_id: str
     results: List[VariantResult]
     winner_variant_id: str
+    # Gross margin of the tested product in percent, as in Product.margin
+    product_margin: Optional[float] = None
+    # End of the period the counts cover (incremental calls)
+    observed_at: Optional[datetime] = None
+
+
+class VariantPosterior(BaseModel):
+    variant_id: str
+    prob_best: float
+    expected_loss: float
+    expected_value: float
+
+
+class SequentialStatus(BaseModel):
+    variant_id: str
+    status: str  # "control", "continue", "winner" or "loser"
+    p_value: float  # Always-valid p-value against the control
+    lift: float  # Relative CVR difference against the control
 
 
 class NextTestRecommendation(BaseModel):
     experiment_id: str
     recommended_variants: List[VariantPlan]
     summary: str
+    winner_variant_id: Optional[str] = None
+    confident: Optional[bool] = None
+    posteriors: Optional[List[VariantPosterior]] = None
+    # The input results with server-computed KPIs
+    results: Optional[List[VariantResult]] = None
+    # Set for incremental /results calls
+    stop: Optional[bool] = None
+    sequential: Optional[List[SequentialStatus]] = None
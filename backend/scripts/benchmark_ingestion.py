@@ -0,0 +1,107 @@
+"""
+Benchmark streaming ingestion of historical performance exports.
+
+Writes a synthetic CSV and NDJSON export, streams both into a
+PerformanceAggregator and reports rows per second and peak Python memory
+(peak memory grows with --chunk-size, not with --rows).  It then loads the
+CSV into a ColumnarPerformanceStore, times a three-way rollup, and times
+opening the same data from a memory-mapped archive.
+
+Usage:
+    python backend/scripts/benchmark_ingestion.py --rows 1000000
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.data_ingestion.archive import open_archive, write_archive
+from backend.data_ingestion.columnar import ColumnarPerformanceStore
+from backend.data_ingestion.streaming import COLUMNS, PerformanceAggregator
+
+CHANNELS = ["Meta", "Google", "TikTok"]
+PRODUCTS = [f"prod_{i}" for i in range(50)]
+
+
+def synthetic_rows(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    start = date(2023, 1, 1)
+    for i in range(n):
+        impressions = rng.randint(100, 5000)
+        clicks = rng.randint(0, impressions // 20)
+        conversions = rng.randint(0, max(clicks // 10, 1))
+        spend = round(clicks * rng.uniform(0.2, 2.0), 2)
+        yield (
+            (start + timedelta(days=i % 730)).isoformat(),
+            CHANNELS[i % len(CHANNELS)],
+            PRODUCTS[i % len(PRODUCTS)],
+            impressions, clicks, conversions, spend,
+            round(conversions * rng.uniform(20, 60), 2),
+        )
+
+
+def write_exports(directory: Path, n: int) -> dict:
+    csv_path = directory / "export.csv"
+    ndjson_path = directory / "export.ndjson"
+    with open(csv_path, "w") as f:
+        f.write(",".join(COLUMNS) + "\n")
+        for row in synthetic_rows(n):
+            f.write(",".join(map(str, row)) + "\n")
+    with open(ndjson_path, "w") as f:
+        for row in synthetic_rows(n):
+            f.write(json.dumps(dict(zip(COLUMNS, row))) + "\n")
+    return {"csv": str(csv_path), "ndjson": str(ndjson_path)}
+
+
+def run(rows: int, chunk_size: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Writing {rows:,} synthetic rows per format...")
+        paths = write_exports(Path(tmp), rows)
+        for fmt, path in paths.items():
+            aggregator = PerformanceAggregator()
+            started = time.perf_counter()
+            aggregator.add_file(path, chunk_size=chunk_size)
+            elapsed = time.perf_counter() - started
+            # Memory is measured in a second pass; tracing slows parsing down a lot
+            tracemalloc.start()
+            PerformanceAggregator().add_file(path, chunk_size=chunk_size)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{fmt:>7}: {aggregator.stats.rows:,} rows in {elapsed:.2f}s "
+                f"({aggregator.stats.rows / elapsed:,.0f} rows/s), peak {peak / 1e6:.1f} MB, "
+                f"{len(aggregator.by_day)} days, {len(aggregator.by_product)} products"
+            )
+
+        store = ColumnarPerformanceStore.from_exports([paths["csv"]], chunk_size=chunk_size)
+        started = time.perf_counter()
+        rollup = store.rollup(("channel", "product", "day"))
+        elapsed = time.perf_counter() - started
+        print(
+            f"columnar: {len(store):,} rows in {store.nbytes / 1e6:.1f} MB, "
+            f"channel x product x day rollup ({len(rollup):,} groups) in {elapsed * 1000:.1f} ms"
+        )
+
+        archive_path = str(Path(tmp) / "export.perf")
+        write_archive(store, archive_path)
+        started = time.perf_counter()
+        archived = open_archive(archive_path)
+        elapsed = time.perf_counter() - started
+        print(f" archive: opened {len(archived):,} rows via mmap in {elapsed * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+    run(args.rows, args.chunk_size)
@@ -54,6 +54,19 @@ async def run_final_demo():
                         f.write(response.text)
                 raise e
 
+        # Fetch each image once: prefer the backend asset store and reuse
+        # bytes for repeated URLs (mock placeholders are all the same URL)
+        image_bytes: dict = {}
+
+        async def fetch_image(item):
+            url = f"{API_BASE}{item['asset_url']}" if item.get("asset_url") else item["image_url"]
+            if url not in image_bytes:
+                img_response = await client.get(url)
+                if img_response.status_code != 200:
+                    return None
+                image_bytes[url] = img_response.content
+            return image_bytes[url]
+
         # Step 1: Generate Plan (LunaGlow Sunscreen)
         print("\n1️⃣  Generating experiment plan (LunaGlow)...")
 
@@ -115,12 +128,12 @@ async def run_final_demo():
             if creative.get("image_url"):
                 variant_id = creative["variant_id"]
                 try:
-                    img_response = await client.get(creative["image_url"])
-                    if img_response.status_code == 200:
+                    content = await fetch_image(creative)
+                    if content:
                         ext = "png" if "png" in creative["image_url"] else "jpg"
                         img_path = images_dir / f"creative_{variant_id}_original.{ext}"
                         with open(img_path, "wb") as f:
-                            f.write(img_response.content)
+                            f.write(content)
                         print(f"   ✓ Downloaded image for variant {variant_id}")
                 except Exception as e:
                     print(f"   ⚠️  Could not download image: {e}")
@@ -160,12 +173,12 @@ async def run_final_demo():
             
             if regenerated.get("image_url"):
                 try:
-                    img_response = await client.get(regenerated["image_url"])
-                    if img_response.status_code == 200:
+                    content = await fetch_image(regenerated)
+                    if content:
                         ext = "png" if "png" in regenerated["image_url"] else "jpg"
                         img_path = images_dir / f"creative_B_regenerated.{ext}"
                         with open(img_path, "wb") as f:
-                            f.write(img_response.content)
+                            f.write(content)
                         print(f"   ✓ Downloaded regenerated image")
                 except Exception as e:
                     print(f"   ⚠️  Could not download regenerated image: {e}")
@@ -196,12 +209,12 @@ async def run_final_demo():
             for idx, explored in enumerate(exploration["generated"], 1):
                 if explored.get("image_url"):
                     try:
-                        img_response = await client.get(explored["image_url"])
-                        if img_response.status_code == 200:
+                        content = await fetch_image(explored)
+                        if content:
                             ext = "png" if "png" in explored["image_url"] else "jpg"
                             img_path = images_dir / f"explored_std_{idx:02d}.{ext}"
                             with open(img_path, "wb") as f:
-                                f.write(img_response.content)
+                                f.write(content)
                     except Exception as e:
                         pass
 
@@ -231,12 +244,12 @@ async def run_final_demo():
             for idx, explored in enumerate(adv_exploration["generated"], 1):
                 if explored.get("image_url"):
                     try:
-                        img_response = await client.get(explored["image_url"])
-                        if img_response.status_code == 200:
+                        content = await fetch_image(explored)
+                        if content:
                             ext = "png" if "png" in explored["image_url"] else "jpg"
                             img_path = images_dir / f"explored_adv_{idx:02d}.{ext}"
                             with open(img_path, "wb") as f:
-                                f.write(img_response.content)
+                                f.write(content)
                     except Exception as e:
                         pass
 
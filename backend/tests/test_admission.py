@@ -0,0 +1,80 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.admission import AdmissionMiddleware, RouteLimit
+
+
+def make_app(release: threading.Event):
+    app = FastAPI()
+    app.add_middleware(
+        AdmissionMiddleware,
+        limits={"/generate": RouteLimit(max_concurrent=1, max_queue=1, max_wait_s=0.3)},
+    )
+
+    @app.post("/generate")
+    def generate():
+        release.wait(5)
+        return {"ok": True}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def test_generation_route_sheds_load_and_health_stays_responsive():
+    release = threading.Event()
+    responses = {}
+
+    with TestClient(make_app(release)) as client:
+        def call(name):
+            responses[name] = client.post("/generate")
+
+        first = threading.Thread(target=call, args=("first",))
+        first.start()
+        time.sleep(0.1)
+        queued = threading.Thread(target=call, args=("queued",))
+        queued.start()
+        time.sleep(0.1)
+
+        # Queue is full: rejected straight away with a Retry-After hint
+        started = time.monotonic()
+        overflow = client.post("/generate")
+        assert overflow.status_code == 429
+        assert int(overflow.headers["retry-after"]) >= 1
+        assert time.monotonic() - started < 0.2
+
+        assert client.get("/health").status_code == 200
+
+        # The queued request gives up after max_wait_s
+        queued.join()
+        assert responses["queued"].status_code == 503
+        assert "retry-after" in responses["queued"].headers
+
+        release.set()
+        first.join()
+        assert responses["first"].status_code == 200
+        assert client.post("/generate").status_code == 200
+
+
+def test_queued_request_is_admitted_when_slot_frees():
+    release = threading.Event()
+    responses = {}
+
+    with TestClient(make_app(release)) as client:
+        def call(name):
+            responses[name] = client.post("/generate")
+
+        threads = [threading.Thread(target=call, args=(n,)) for n in ("a", "b")]
+        for t in threads:
+            t.start()
+            time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+        assert responses["a"].status_code == 200
+        assert responses["b"].status_code == 200
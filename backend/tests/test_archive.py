@@ -0,0 +1,40 @@
+import mmap
+
+import numpy as np
+import pytest
+
+from ..data_ingestion import ColumnarPerformanceStore, convert_exports, open_archive
+
+
+CSV = """date,channel,product_id,impressions,clicks,conversions,spend,revenue
+2024-03-01,Meta,prod_1,1000,50,5,40.0,150.0
+2024-03-01,Google,prod_2,800,40,4,30.5,120.0
+2024-03-02,Meta,prod_1,1200,60,6,45.0,180.0
+"""
+
+
+def test_converted_archive_is_memory_mapped_and_matches_source(tmp_path):
+    export = tmp_path / "export.csv"
+    export.write_text(CSV)
+    archive_path = str(tmp_path / "history.perf")
+    assert convert_exports([str(export)], archive_path) == 3
+
+    archived = open_archive(archive_path)
+    source = ColumnarPerformanceStore.from_exports([str(export)])
+    assert archived.rollup(("channel", "day")).to_records() == source.rollup(("channel", "day")).to_records()
+    base = archived.column("spend")
+    while isinstance(base, np.ndarray):
+        base = base.base
+    assert isinstance(base.obj if isinstance(base, memoryview) else base, mmap.mmap)
+
+    # Appending copies into private arrays and leaves the archive untouched
+    archived.append_rows([("2024-03-03", "TikTok", "prod_3", 10, 1, 0, 1.0, 0.0)])
+    assert archived.channels[-1] == "TikTok" and len(open_archive(archive_path)) == 3
+    np.testing.assert_array_equal(archived.column("clicks"), [50, 40, 60, 1])
+
+
+def test_rejects_files_that_are_not_archives(tmp_path):
+    bogus = tmp_path / "bogus.perf"
+    bogus.write_bytes(b"date,channel\n" * 4)
+    with pytest.raises(ValueError):
+        open_archive(str(bogus))
@@ -0,0 +1,96 @@
+import hashlib
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.app import main
+from backend.app.assets import AssetStore
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"fake image payload"
+
+
+def make_store(tmp_path, calls):
+    def fetch(url):
+        calls.append(url)
+        return PNG
+    return AssetStore(str(tmp_path), fetch=fetch)
+
+
+def test_ingest_fetches_each_url_once_and_dedupes_content(tmp_path):
+    calls = []
+    store = make_store(tmp_path, calls)
+    first = store.ingest_url("https://img/a.png")
+    again = store.ingest_url("https://img/a.png")
+    other = store.ingest_url("https://img/b.png")
+    assert first == again == other == hashlib.sha256(PNG).hexdigest()
+    assert calls == ["https://img/a.png", "https://img/b.png"]
+    objects = list((tmp_path / "objects").rglob("*"))
+    assert [p.name for p in objects if p.is_file()] == [first]
+    assert store.path_for("../../etc/passwd") is None
+
+
+def test_url_map_is_bounded_and_evicts_least_recently_used(tmp_path):
+    calls = []
+    store = AssetStore(str(tmp_path), fetch=lambda url: calls.append(url) or PNG, max_urls=2)
+    store.ingest_url("https://img/a.png")
+    store.ingest_url("https://img/b.png")
+    store.ingest_url("https://img/a.png")
+    store.ingest_url("https://img/c.png")
+    assert list(store._by_url) == ["https://img/a.png", "https://img/c.png"]
+    store.ingest_url("https://img/b.png")
+    assert calls == ["https://img/a.png", "https://img/b.png", "https://img/c.png", "https://img/b.png"]
+    assert len(store._by_url) == 2
+
+
+def test_failed_fetches_release_their_lock_and_slow_ones_finish_in_background(tmp_path):
+    release = threading.Event()
+
+    def fetch(url):
+        if "broken" in url:
+            raise IOError("unreachable")
+        if "slow" in url:
+            release.wait(5)
+        return PNG
+
+    store = AssetStore(str(tmp_path), fetch=fetch)
+    assert store.ingest_url("https://img/broken.png") is None
+    assert store._url_locks == {}
+
+    digests = store.ingest_many(["https://img/a.png", "https://img/slow.png", "https://img/broken.png"], timeout=0.5)
+    assert digests == {"https://img/a.png": hashlib.sha256(PNG).hexdigest(), "https://img/broken.png": None}
+    release.set()
+    deadline = time.time() + 5
+    while store.ingest_many(["https://img/slow.png"], timeout=0) == {} and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.ingest_many(["https://img/slow.png"], timeout=0) == {"https://img/slow.png": digests["https://img/a.png"]}
+
+
+def test_asset_route_serves_with_strong_etag_and_immutable_cache(tmp_path, monkeypatch):
+    store = make_store(tmp_path, [])
+    monkeypatch.setattr(main, "asset_store", store)
+    client = TestClient(main.app)
+
+    creatives = client.post("/creative-variants", json={
+        "experiment_id": "exp_assets",
+        "objective": "Increase ROAS",
+        "hypothesis": "h",
+        "variants": [{"variant_id": "A", "description": "Control"}],
+        "metrics": ["roas"],
+        "sample_size_rules": {"min_spend_per_variant": 1, "min_conversions": 1},
+    }).json()
+    asset_url = creatives[0]["asset_url"]
+    digest = hashlib.sha256(PNG).hexdigest()
+    assert asset_url == f"/assets/{digest}"
+
+    resp = client.get(asset_url)
+    assert resp.status_code == 200
+    assert resp.content == PNG
+    assert resp.headers["content-type"] == "image/png"
+    assert resp.headers["etag"] == f'"{digest}"'
+    assert "immutable" in resp.headers["cache-control"]
+
+    cached = client.get(asset_url, headers={"If-None-Match": f'"{digest}"'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert client.get("/assets/" + "0" * 64).status_code == 404
@@ -0,0 +1,61 @@
+import numpy as np
+
+from ..agents import BayesianDecisionEngine, OptimizationAgent, ThompsonAllocator
+from ..schemas.models import ExperimentResult, SampleSizeRules, VariantResult
+
+CLICKS = np.array([[1000, 1000, 1000], [100, 100, 0]])
+CONVERSIONS = np.array([[50, 70, 40], [5, 6, 0]])
+MASK = np.array([[True, True, True], [True, True, False]])
+
+
+def shares(allocator):
+    return allocator.shares(CLICKS, CONVERSIONS, CONVERSIONS * 30.0, CLICKS * 0.5, MASK)
+
+
+def test_shares_follow_posteriors_respect_floor_and_replay_with_seed():
+    plain = shares(ThompsonAllocator())
+    np.testing.assert_allclose(plain.sum(axis=1), 1.0)
+    assert np.argmax(plain[0]) == 1 and plain[1, 2] == 0.0
+
+    top_two = shares(ThompsonAllocator(top_two=True, min_share=0.1))
+    # Top-two moves budget from the leader to the challengers, never below the floor
+    assert top_two[0, 1] < plain[0, 1]
+    assert top_two[MASK].min() >= 0.1
+    np.testing.assert_allclose(top_two.sum(axis=1), 1.0)
+
+    np.testing.assert_array_equal(plain, shares(ThompsonAllocator(BayesianDecisionEngine(seed=0))))
+
+
+def test_budget_tops_up_minimum_spend_before_sharing():
+    allocator = ThompsonAllocator()
+    share = np.array([[0.8, 0.2]])
+    mask = np.ones((1, 2), dtype=bool)
+    spent = np.array([[500.0, 100.0]])
+    plan = allocator.spend_plan(share, spent, np.array([1000.0]), np.array([300.0]), mask)
+    np.testing.assert_allclose(plan, [[640.0, 360.0]])
+    scarce = allocator.spend_plan(share, np.array([[0.0, 100.0]]), np.array([100.0]), np.array([300.0]), mask)
+    np.testing.assert_allclose(scarce, [[60.0, 40.0]])
+
+
+def test_agent_allocates_budget_for_an_experiment():
+    result = ExperimentResult(experiment_id="exp_b", winner_variant_id="A", results=[
+        VariantResult(variant_id=v, impressions=20000, clicks=1000, spend=500.0, conversions=c,
+                      revenue=c * 30.0, profit=0.0, cac=0.0, roas=0.0)
+        for v, c in (("A", 50), ("B", 70), ("C", 40))
+    ])
+    rules = SampleSizeRules(min_spend_per_variant=600.0, min_conversions=50)
+    allocation = OptimizationAgent().allocate_budget(result, budget=1500.0, rules=rules)
+    assert allocation.shares["B"] > allocation.shares["A"] >= 0.05
+    assert abs(sum(allocation.spend.values()) - 1500.0) < 0.02 and min(allocation.spend.values()) >= 100.0
+
+
+def test_per_channel_rows_are_one_arm_and_the_whole_budget_is_spent():
+    result = ExperimentResult(experiment_id="exp_rows", winner_variant_id="A", results=[
+        VariantResult(variant_id=v, channel=ch, impressions=10000, clicks=500, spend=250.0, conversions=c,
+                      revenue=c * 30.0)
+        for v, ch, c in (("A", "Meta", 25), ("A", "Google", 25), ("B", "Meta", 60))
+    ])
+    allocation = OptimizationAgent().allocate_budget(result, budget=100.0)
+    assert set(allocation.shares) == {"A", "B"}
+    assert abs(sum(allocation.shares.values()) - 1.0) < 1e-6
+    assert abs(sum(allocation.spend.values()) - 100.0) < 0.02
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from ..data_ingestion import ColumnarPerformanceStore
+from ..schemas.models import HistoricalPerformance
+
+
+ROWS = [
+    ("2024-03-01", "Meta", "prod_1", 1000, 50, 5, 40.0, 150.0),
+    ("2024-03-01", "Google", "prod_2", 800, 40, 4, 30.5, 120.0),
+    ("2024-03-02", "Meta", "prod_1", 1200, 60, 6, 45.0, 180.0),
+    ("2024-03-02", "Meta", "prod_2", 500, 0, 0, 0.0, 0.0),
+]
+
+
+def test_rollup_sums_and_vectorized_kpis():
+    store = ColumnarPerformanceStore(capacity=2)
+    store.append_rows(ROWS[:3])
+    store.append_rows(ROWS[3:])
+    assert len(store) == 4 and store.channels == ["Meta", "Google"]
+
+    records = {r["channel"]: r for r in store.rollup(("channel",)).to_records()}
+    meta = records["Meta"]
+    assert (meta["impressions"], meta["clicks"], meta["spend"]) == (2700, 110, 85.0)
+    assert meta["ctr"] == pytest.approx(110 / 2700)
+    assert meta["roas"] == pytest.approx(330 / 85)
+
+    by_day_product = store.rollup(("day", "product"), mask=store.column("channel") == 0)
+    assert by_day_product.keys["day"] == ["2024-03-01", "2024-03-02", "2024-03-02"]
+    assert by_day_product.keys["product"] == ["prod_1", "prod_1", "prod_2"]
+    np.testing.assert_array_equal(by_day_product.cvr, [0.1, 0.1, 0.0])
+
+
+def test_round_trips_api_models_and_rejects_unknown_dimension():
+    models = [
+        HistoricalPerformance(channel="Meta", impressions=10, clicks=2, conversions=1, spend=1.5, revenue=3.0),
+        HistoricalPerformance(channel="Meta", impressions=5, clicks=1, conversions=0, spend=0.5, revenue=0.0),
+    ]
+    store = ColumnarPerformanceStore.from_models(models)
+    assert store.to_models() == [
+        HistoricalPerformance(channel="Meta", impressions=15, clicks=3, conversions=1, spend=2.0, revenue=3.0)
+    ]
+    assert store.nbytes == 2 * 30
+    with pytest.raises(ValueError):
+        store.rollup(("region",))
@@ -0,0 +1,51 @@
+import pytest
+
+from ..data_ingestion import (
+    Connector,
+    FilePerformanceConnector,
+    FileSalesConnector,
+    DataIngestion,
+    assemble_snapshot,
+    fixture_connectors,
+)
+
+
+def test_fixture_sources_merge_into_one_snapshot():
+    assembled = assemble_snapshot(fixture_connectors())
+    snapshot = assembled.snapshot
+
+    assert [h.channel for h in snapshot.historical_performance] == ["Google", "Meta", "TikTok"]
+    assert {p.id for p in snapshot.products} == {"prod_1", "prod_2"}
+    # Sales come from the store export, one row per day
+    assert len(snapshot.sales_data) == 14
+    # Same row shape as sales_data built from the ad platforms alone
+    streamed = DataIngestion().snapshot_from_connectors(fixture_connectors()[:3])
+    assert set(snapshot.sales_data[0]) == set(streamed.sales_data[0]) == {"timestamp", "conversions", "spend", "revenue"}
+    timings = assembled.timings()
+    assert set(timings) == {"meta", "google", "tiktok", "shopify"}
+    assert all(t["error"] is None and t["rows"] > 0 for t in timings.values())
+
+
+def test_failing_source_is_isolated(tmp_path):
+    connectors = fixture_connectors()[:1] + [
+        FilePerformanceConnector("broken", [str(tmp_path / "missing.csv")])
+    ]
+    assembled = assemble_snapshot(connectors)
+    assert assembled.timings()["broken"]["error"].startswith("FileNotFoundError")
+    assert [h.channel for h in assembled.snapshot.historical_performance] == ["Meta"]
+
+
+def test_process_pool_gives_same_snapshot():
+    threaded = DataIngestion().snapshot_from_connectors(fixture_connectors())
+    in_processes = assemble_snapshot(fixture_connectors(), use_processes=True, max_workers=2).snapshot
+    assert in_processes == threaded
+
+
+def test_bad_order_rows_are_counted_and_connector_is_abstract(tmp_path):
+    orders = tmp_path / "orders.csv"
+    orders.write_text("created_at,total_price\n2024-03-01T10:00:00Z,20.5\n2024-03-01,oops\n,3\n2024-03-02,inf\n")
+    result = FileSalesConnector("shop", str(orders)).fetch()
+    assert (result.rows, result.skipped) == (1, 3)
+    assert result.sales == {"2024-03-01": [1, 20.5]}
+    with pytest.raises(TypeError):
+        Connector()
@@ -0,0 +1,176 @@
+import json
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from ..agents import BayesianDecisionEngine, OptimizationAgent, iter_results_ndjson
+from ..app.main import app
+from ..schemas.models import ExperimentResult, VariantResult
+
+
+def variant(variant_id, clicks, conversions, spend, revenue):
+    return VariantResult(
+        variant_id=variant_id, impressions=clicks * 20, clicks=clicks, spend=spend,
+        conversions=conversions, revenue=revenue, profit=revenue - spend, cac=0.0, roas=0.0,
+    )
+
+
+def test_clear_winner_is_confident_and_noisy_leader_is_not():
+    engine = BayesianDecisionEngine(draws=4000)
+    clear = ExperimentResult(experiment_id="clear", winner_variant_id="A", results=[
+        variant("A", 5000, 400, 2500.0, 12000.0),
+        variant("B", 5000, 200, 2500.0, 6000.0),
+    ])
+    # B has the higher observed profit from a handful of conversions
+    noisy = ExperimentResult(experiment_id="noisy", winner_variant_id="B", results=[
+        variant("A", 60, 3, 30.0, 90.0),
+        variant("B", 60, 4, 30.0, 120.0),
+    ])
+    first, second = engine.decide_batch([clear, noisy])
+
+    assert first.winner_variant_id == "A" and first.confident
+    assert first.winner.prob_best > 0.99
+    assert not second.confident
+    assert abs(sum(v.prob_best for v in second.variants) - 1.0) < 1e-9
+    assert engine.decide(noisy) == BayesianDecisionEngine(draws=4000).decide(noisy)
+
+
+def test_zero_spend_falls_back_to_revenue_per_click_and_no_data_is_not_confident():
+    engine = BayesianDecisionEngine(draws=4000)
+    # Blank spend arrives as 0; ROAS is undefined, so B's revenue must win
+    unspent = ExperimentResult(experiment_id="unspent", winner_variant_id="A", results=[
+        variant("A", 500, 1, 0.0, 10.0),
+        variant("B", 500, 30, 0.0, 3000.0),
+    ])
+    partly = ExperimentResult(experiment_id="partly", winner_variant_id="A", results=[
+        variant("A", 500, 1, 100.0, 10.0),
+        variant("B", 500, 30, 0.0, 3000.0),
+    ])
+    empty = ExperimentResult(experiment_id="empty", winner_variant_id="A", results=[
+        variant("A", 0, 0, 0.0, 0.0),
+        variant("B", 0, 0, 0.0, 0.0),
+    ])
+    first, second, third = engine.decide_batch([unspent, partly, empty])
+    assert (first.winner_variant_id, first.metric) == ("B", "rpc")
+    assert (second.winner_variant_id, second.metric) == ("B", "rpc")
+    assert not third.confident
+
+    rec = OptimizationAgent(engine).recommend_next_tests(unspent)
+    assert "revenue per click" in rec.summary and "ROAS" not in rec.summary
+
+
+def test_tied_draws_are_shared_between_variants():
+    engine = BayesianDecisionEngine(draws=4000)
+    # Spend without clicks: every ROAS draw is exactly zero
+    prob_best, _, _ = engine.evaluate_arrays(np.zeros((1, 2)), np.zeros((1, 2)), np.zeros((1, 2)),
+                                             np.full((1, 2), 50.0))
+    assert abs(prob_best[0, 0] - 0.5) < 0.05
+
+
+def test_padded_batches_mark_missing_variants_and_scale_to_many_variants():
+    engine = BayesianDecisionEngine(draws=500)
+    clicks = np.array([[1000, 1000, 0], [2000, 2000, 2000]])
+    conversions = np.array([[50, 80, 0], [100, 100, 150]])
+    mask = np.array([[True, True, False], [True, True, True]])
+    prob_best, loss, _ = engine.evaluate_arrays(clicks, conversions, conversions * 30.0, clicks * 0.5, mask)
+    assert np.isnan(prob_best[0, 2]) and np.isnan(loss[0, 2])
+    np.testing.assert_allclose(np.nansum(prob_best, axis=1), 1.0)
+    assert np.nanargmax(prob_best[1]) == 2
+
+    many = np.full((1, 300), 1000)
+    prob_best, _, _ = engine.evaluate_arrays(many, many // 20, many * 1.5, many * 0.5)
+    assert prob_best.shape == (1, 300)
+
+
+def test_agent_and_results_endpoint_use_posteriors():
+    result = ExperimentResult(experiment_id="exp_x", winner_variant_id="B", results=[
+        variant("A", 5000, 400, 2500.0, 12000.0),
+        variant("B", 5000, 200, 2500.0, 6000.0),
+    ])
+    rec = OptimizationAgent().recommend_next_tests(result)
+    assert rec.winner_variant_id == "A" and rec.recommended_variants[0].variant_id == "A"
+
+    body = TestClient(app).post("/results", json=result.model_dump()).json()
+    assert body["winner_variant_id"] == "A" and body["confident"] is True
+    assert {p["variant_id"] for p in body["posteriors"]} == {"A", "B"}
+
+
+def test_batch_recommendations_stream_in_order_from_lists_and_ndjson():
+    results = [
+        ExperimentResult(experiment_id=f"exp_{i}", winner_variant_id="B", results=[
+            variant("A", 5000, 400 if i % 2 else 200, 2500.0, 12000.0 if i % 2 else 6000.0),
+            variant("B", 5000, 300, 2500.0, 9000.0),
+        ])
+        for i in range(5)
+    ]
+    ndjson = "\n".join(r.model_dump_json() for r in results) + "\n\n"
+
+    recs = list(OptimizationAgent().recommend_next_tests_batch(iter_results_ndjson(ndjson.splitlines()), chunk_size=2))
+    assert [r.experiment_id for r in recs] == [r.experiment_id for r in results]
+    assert [r.winner_variant_id for r in recs] == ["B", "A", "B", "A", "B"]
+
+    client = TestClient(app)
+    streamed = client.post("/results/batch", content=ndjson, headers={"content-type": "application/x-ndjson"})
+    assert streamed.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [line["winner_variant_id"] for line in lines] == ["B", "A", "B", "A", "B"]
+    listed = client.post("/results/batch", json=[r.model_dump() for r in results])
+    assert len(listed.text.splitlines()) == 5
+
+    # NDJSON is decided as it streams in, so bad lines are reported in place
+    mixed = "\n".join([results[0].model_dump_json(), "{}", '{"experiment_id": "e", "results": [], '
+                        '"winner_variant_id": "A"}', results[1].model_dump_json()])
+    bad = client.post("/results/batch", content=mixed, headers={"content-type": "application/x-ndjson"})
+    assert bad.status_code == 200
+    lines = [json.loads(line) for line in bad.text.splitlines()]
+    assert [line.get("experiment_id") for line in lines] == ["exp_0", None, None, "exp_1"]
+    assert lines[1]["line"] == 2 and "line 2" in lines[1]["error"]
+    assert lines[2] == {"line": 3, "error": "No results provided on line 3"}
+    assert client.post("/results/batch", content="{", headers={"content-type": "application/json"}).status_code == 422
+    empty = client.post("/results/batch", json=[{"experiment_id": "e", "results": [], "winner_variant_id": "A"}])
+    assert empty.status_code == 400
+
+
+def test_negative_or_non_finite_counts_are_rejected_not_a_server_error():
+    client = TestClient(app, raise_server_exceptions=False)
+    good = variant("A", 5000, 400, 2500.0, 12000.0).model_dump()
+    for field, value in (("clicks", -5), ("revenue", -1.0), ("conversions", -1)):
+        body = {"experiment_id": "neg", "winner_variant_id": "A",
+                "results": [good, {**good, "variant_id": "B", field: value}]}
+        assert client.post("/results", json=body).status_code == 422
+    body = {"experiment_id": "nan", "winner_variant_id": "A",
+            "results": [good, {**good, "variant_id": "B", "spend": "NaN"}]}
+    assert client.post("/results", json=body).status_code == 422
+
+
+def test_batch_reports_undecidable_experiments_in_place(monkeypatch):
+    from ..app import main
+
+    good = ExperimentResult(experiment_id="ok", winner_variant_id="A", results=[
+        variant("A", 5000, 400, 2500.0, 12000.0), variant("B", 5000, 200, 2500.0, 6000.0)])
+    broken = good.model_copy(update={"experiment_id": "broken"})
+    decide_batch = main.decision_engine.decide_batch
+
+    def failing(chunk):
+        if any(r.experiment_id == "broken" for r in chunk):
+            raise ValueError("a <= 0")
+        return decide_batch(chunk)
+
+    monkeypatch.setattr(main.decision_engine, "decide_batch", failing)
+    client = TestClient(app)
+    ndjson = "\n".join(r.model_dump_json() for r in (good, broken, good))
+    lines = [json.loads(line) for line in client.post(
+        "/results/batch", content=ndjson, headers={"content-type": "application/x-ndjson"}).text.splitlines()]
+    assert [line.get("experiment_id") for line in lines] == ["ok", None, "ok"]
+    assert lines[1]["line"] == 2 and "broken" in lines[1]["error"]
+
+    listed = [json.loads(line) for line in client.post(
+        "/results/batch", json=[r.model_dump() for r in (broken, good)]).text.splitlines()]
+    assert listed[0]["index"] == 0 and listed[1]["experiment_id"] == "ok"
+
+    negative = good.model_dump()
+    negative["results"][0]["clicks"] = -1
+    assert client.post("/results/batch", json=[good.model_dump(), negative]).status_code == 422
+    lines = client.post("/results/batch", content="\n".join([good.model_dump_json(), json.dumps(negative)]),
+                        headers={"content-type": "application/x-ndjson"}).text.splitlines()
+    assert json.loads(lines[0])["experiment_id"] == "ok" and json.loads(lines[1])["line"] == 2
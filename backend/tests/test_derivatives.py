@@ -0,0 +1,63 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import main
+from backend.app.assets import AssetStore
+from backend.app.derivatives import DerivativePipeline
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def png_bytes(width=800, height=600):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 120, 40)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def asset_client(tmp_path, monkeypatch):
+    store = AssetStore(str(tmp_path), fetch=lambda url: png_bytes())
+    pipeline = DerivativePipeline(store, max_workers=1)
+    monkeypatch.setattr(main, "asset_store", store)
+    monkeypatch.setattr(main, "derivatives", pipeline)
+    yield TestClient(main.app), store, pipeline
+    pipeline.shutdown()
+
+
+def test_thumbnail_is_rendered_cached_and_served(asset_client):
+    client, store, pipeline = asset_client
+    digest = store.ingest_url("https://img/source.png")
+
+    resp = client.get(f"/assets/{digest}?size=thumb")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "image/jpeg"
+    assert resp.headers["etag"] == f'"{digest}-thumb"'
+    assert Image.open(io.BytesIO(resp.content)).size == (320, 320)
+    assert len(resp.content) < len(png_bytes())
+
+    banner = client.get(f"/assets/{digest}?size=banner")
+    assert Image.open(io.BytesIO(banner.content)).size == (1200, 628)
+
+    # Served from the on-disk cache on the next request
+    assert pipeline._submit(digest, "thumb") is None
+    assert client.get(f"/assets/{digest}?size=huge").status_code == 400
+
+
+def test_undecodable_source_falls_back_to_original(asset_client):
+    client, store, pipeline = asset_client
+    digest = store.put_bytes(b"not an image")
+    resp = client.get(f"/assets/{digest}?size=thumb")
+    assert resp.status_code == 200
+    assert resp.content == b"not an image"
+    assert resp.headers["etag"] == f'"{digest}"'
+    assert resp.headers["cache-control"] == "no-cache"
+    assert client.get(f"/assets/{digest}").headers["cache-control"] == main.ASSET_CACHE_CONTROL
+
+    # The failure is cached, so the source is not sent to the pool again
+    assert pipeline._submit(digest, "thumb") is None
+    assert client.get(f"/assets/{digest}?size=thumb").content == b"not an image"
+    assert pipeline.failures == 1
+    pipeline._failed[(digest, "thumb")] = 0.0
+    assert pipeline._submit(digest, "thumb") is not None
@@ -0,0 +1,81 @@
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+
+
+def base_variant(variant_id="WS1"):
+    return {
+        "variant_id": variant_id,
+        "hook": "Live hook",
+        "primary_text": "Text",
+        "headline": "Live headline",
+        "call_to_action": "Shop Now",
+        "fibo_spec": {"camera_angle": "medium", "lighting_style": "warm"},
+    }
+
+
+def receive_until(ws, event_type, variant_id):
+    events = []
+    while True:
+        event = ws.receive_json()
+        events.append(event)
+        if event["type"] == event_type and event.get("variant_id") == variant_id:
+            return events
+
+
+def test_websocket_streams_regeneration_events():
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/generation") as ws:
+            ws.send_json({"action": "subscribe", "ids": ["WS1"]})
+            assert ws.receive_json() == {"type": "subscribed", "ids": ["WS1"]}
+
+            resp = client.post("/regenerate-image", json={
+                "variant": base_variant(), "spec_patch": {"lighting_style": "moody_ws"},
+            })
+            assert resp.status_code == 200
+
+            events = receive_until(ws, "completed", "WS1")
+            assert [e["type"] for e in events] == ["queued", "started", "completed"]
+            assert events[-1]["image_url"] == resp.json()["image_url"]
+
+
+def test_websocket_streams_explore_cells_for_subscribed_parent():
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/generation") as ws:
+            ws.send_json({"action": "subscribe", "ids": ["WS2"]})
+            ws.receive_json()
+
+            resp = client.post("/explore-variants", json={
+                "base_variant": base_variant("WS2"), "preset": "fast4",
+            })
+            assert resp.status_code == 200
+
+            events = receive_until(ws, "completed", "WS2_explore_4")
+            completed = [e for e in events if e["type"] == "completed"]
+            assert [e["variant_id"] for e in completed] == [f"WS2_explore_{i}" for i in range(1, 5)]
+            assert all(e["parent_id"] == "WS2" for e in completed)
+
+
+def test_malformed_messages_get_an_error_ack_and_keep_the_socket_open():
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/generation") as ws:
+            for bad in ("not json", "[1, 2]", '"subscribe"', '{"action": "subscribe", "ids": 5}'):
+                ws.send_text(bad)
+                ack = ws.receive_json()
+                assert ack["type"] == "error" and ack["error"].startswith("Invalid message")
+            ws.send_json({"action": "subscribe", "ids": ["still-open"]})
+            assert ws.receive_json() == {"type": "subscribed", "ids": ["still-open"]}
+
+
+def test_wildcard_only_delivers_the_callers_own_tenant():
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/generation", headers={"X-API-Key": "watcher-key"}) as ws:
+            ws.send_json({"action": "subscribe", "ids": ["*"]})
+            ws.receive_json()
+            other = {"variant": base_variant("OTHER1"), "spec_patch": {"lighting_style": "ws_other"}}
+            assert client.post("/regenerate-image", json=other, headers={"X-API-Key": "other-key"}).status_code == 200
+            mine = {"variant": base_variant("MINE1"), "spec_patch": {"lighting_style": "ws_mine"}}
+            assert client.post("/regenerate-image", json=mine, headers={"X-API-Key": "watcher-key"}).status_code == 200
+            events = receive_until(ws, "completed", "MINE1")
+            assert {e["variant_id"] for e in events} == {"MINE1"}
+            assert all("tenant" not in e for e in events)
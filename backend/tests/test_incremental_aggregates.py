@@ -0,0 +1,41 @@
+from ..data_ingestion import IncrementalAggregates
+
+
+HEADER = "date,channel,product_id,impressions,clicks,conversions,spend,revenue\n"
+
+
+def test_window_drops_old_days_and_rates_cover_window_only():
+    state = IncrementalAggregates(window_days=2)
+    state.apply([("2024-03-01", "Meta", "prod_1", 1000, 100, 10, 50.0, 200.0)])
+    state.apply([
+        ("2024-03-02", "Meta", "prod_1", 1000, 50, 5, 25.0, 50.0),
+        ("2024-03-03", "Meta", "prod_2", 1000, 50, 0, 25.0, 0.0),
+    ])
+
+    assert state.watermark == "2024-03-03"
+    assert state.totals.by_channel["Meta"][0] == 3000
+    assert state.row_counts["channel"] == {"Meta": 3}
+    window = state.windowed("channel")["Meta"]
+    assert window["clicks"] == 100 and window["roas"] == 1.0
+    assert set(state.windowed("product")) == {"prod_1", "prod_2"}
+
+
+def test_checkpoint_resumes_appended_export_without_rereading(tmp_path):
+    export = tmp_path / "meta.csv"
+    export.write_text(HEADER + "2024-03-01,Meta,prod_1,1000,50,5,40.0,150.0\n2024-03-02,Meta,prod_1,10")
+    checkpoint = tmp_path / "state" / "aggregates.json"
+
+    state = IncrementalAggregates.load(str(checkpoint))
+    assert state.apply_file(str(export)) == 1  # The partial last line waits for its newline
+    state.checkpoint(str(checkpoint))
+
+    with open(export, "a") as f:
+        f.write("00,60,6,45.0,180.0\n2024-03-03,Meta,prod_2,500,10,1,5.0,20.0\n")
+    restored = IncrementalAggregates.load(str(checkpoint))
+    assert restored.apply_file(str(export)) == 2
+    assert restored.apply_file(str(export)) == 0
+
+    snapshot = restored.to_snapshot()
+    assert snapshot.historical_performance[0].impressions == 2500
+    assert restored.totals.stats.rows == 3
+    assert [day["revenue"] for day in snapshot.sales_data] == [150.0, 180.0, 20.0]
@@ -0,0 +1,53 @@
+import json
+import logging
+
+from backend.app import logging_config
+from backend.app.logging_config import JsonFormatter, SamplingFilter
+
+
+def make_record(level=logging.INFO, **extra):
+    record = logging.makeLogRecord({"name": "backend.test", "levelno": level,
+                                    "levelname": logging.getLevelName(level),
+                                    "msg": "hello %s", "args": ("world",)})
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(make_record(cell=3, spec_update={"lighting_style": "warm"}))
+    payload = json.loads(line)
+    assert payload["message"] == "hello world"
+    assert payload["level"] == "INFO"
+    assert payload["cell"] == 3
+    assert payload["spec_update"] == {"lighting_style": "warm"}
+
+
+def test_sampling_filter_keeps_fraction_but_never_drops_warnings():
+    sampler = SamplingFilter(0.25)
+    kept = sum(sampler.filter(make_record()) for _ in range(100))
+    assert kept == 25
+    assert all(SamplingFilter(0.0).filter(make_record(logging.WARNING)) for _ in range(5))
+
+
+def test_configure_logging_writes_json_and_appends_errors(tmp_path, monkeypatch):
+    log_file = tmp_path / "backend.log"
+    error_file = tmp_path / "errors.log"
+    monkeypatch.setenv("LOG_FILE", str(log_file))
+    monkeypatch.setenv("ERROR_LOG_FILE", str(error_file))
+    monkeypatch.setenv("LOG_LEVELS", "backend.test.quiet=ERROR")
+    try:
+        logging_config.configure_logging(force=True)
+        logging.getLogger("backend.test").info("first", extra={"k": 1})
+        logging.getLogger("backend.test.quiet").info("dropped")
+        logging.getLogger("backend.test").error("boom one")
+        logging.getLogger("backend.test").error("boom two")
+        logging_config.shutdown_logging()
+
+        lines = [json.loads(l) for l in log_file.read_text().splitlines()]
+        assert [l["message"] for l in lines] == ["first", "boom one", "boom two"]
+        errors = [json.loads(l)["message"] for l in error_file.read_text().splitlines()]
+        assert errors == ["boom one", "boom two"]
+    finally:
+        monkeypatch.undo()
+        logging.getLogger("backend.test.quiet").setLevel(logging.NOTSET)
+        logging_config.configure_logging(force=True)
@@ -0,0 +1,41 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from ..agents import OptimizationAgent, compute_kpis, with_kpis_batch
+from ..app.main import app
+from ..schemas.models import ExperimentResult, VariantResult
+
+
+def test_kpis_are_vectorized_and_safe_on_zero_denominators():
+    kpis = compute_kpis(
+        impressions=[1000, 0], clicks=[50, 0], spend=[200.0, 0.0],
+        conversions=[10, 0], revenue=[2000.0, 0.0], margin=[60.0, np.nan],
+    )
+    np.testing.assert_allclose(kpis["profit"], [1000.0, 0.0])
+    np.testing.assert_allclose(kpis["cac"], [20.0, 0.0])
+    np.testing.assert_allclose(kpis["roas"], [10.0, 0.0])
+    np.testing.assert_allclose(kpis["ctr"], [0.05, 0.0])
+    np.testing.assert_allclose(kpis["cvr"], [0.2, 0.0])
+    np.testing.assert_allclose(kpis["cpc"], [4.0, 0.0])
+
+
+def test_server_kpis_replace_client_values():
+    raw = VariantResult(variant_id="A", impressions=1000, clicks=50, spend=200.0, conversions=10,
+                        revenue=2000.0, profit=123.0, roas=99.0)
+    with_margin = ExperimentResult(experiment_id="m", results=[raw], winner_variant_id="A", product_margin=50.0)
+    without = ExperimentResult(experiment_id="n", results=[raw, raw.model_copy(update={"variant_id": "B"})],
+                               winner_variant_id="A")
+    first, second = with_kpis_batch([with_margin, without])
+    assert first.results[0].profit == 800.0 and first.results[0].roas == 10.0
+    assert [v.profit for v in second.results] == [1800.0, 1800.0]
+    assert raw.profit == 123.0
+
+    rec = OptimizationAgent().recommend_next_tests(with_margin)
+    assert rec.results[0].cac == 20.0 and "$800.00 profit" in rec.summary
+
+    body = TestClient(app).post("/results", json={
+        "experiment_id": "raw", "winner_variant_id": "A", "product_margin": 50.0,
+        "results": [{"variant_id": "A", "impressions": 1000, "clicks": 50, "spend": 200.0,
+                     "conversions": 10, "revenue": 2000.0}],
+    }).json()
+    assert body["results"][0]["profit"] == 800.0 and body["results"][0]["cpc"] == 4.0
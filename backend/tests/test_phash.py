@@ -0,0 +1,133 @@
+import io
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import main
+from backend.app.assets import AssetStore
+from backend.app.fibo_client import FiboImageResult
+from backend.app.phash import NearDuplicateIndex, average_hash, hamming, perceptual_hash
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def encode(pixels):
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def scene(seed, offset=0.0):
+    """A smooth random 'scene' so DCT energy is spread like a real photo."""
+    coarse = np.random.default_rng(seed).uniform(40, 215, (8, 8))
+    smooth = np.asarray(Image.fromarray(coarse.astype(np.uint8)).resize((128, 128), Image.BICUBIC),
+                        dtype=np.float64)
+    return encode(np.stack([smooth + offset] * 3, axis=-1))
+
+
+def test_hashes_match_near_identical_and_separate_different_images():
+    base, brighter, other = scene(1), scene(1, offset=8), scene(2)
+    for hash_fn in (average_hash, perceptual_hash):
+        assert hamming(hash_fn(base), hash_fn(brighter)) <= 6
+        assert hamming(hash_fn(base), hash_fn(other)) > 16
+
+
+def test_index_returns_closest_duplicate_within_scope_only():
+    index = NearDuplicateIndex(threshold=4)
+    assert index.add("exp1", "a", 0b1111) is None
+    assert index.add("exp1", "b", 0b1110) == "a"
+    assert index.add("exp2", "c", 0b1111) is None
+    assert index.find("exp1", (1 << 63) | 0b1111) == "a"
+    assert index.find("exp1", 0xFFFF_0000_FFFF_0000) is None
+
+
+def test_explore_flags_and_collapses_near_duplicates(tmp_path, monkeypatch):
+    images = {"warm": scene(1), "warm_golden": scene(1, offset=8), "cool": scene(2)}
+
+    def fake_generate(spec, prompt):
+        return FiboImageResult(image_url=f"https://img/{spec['lighting_style']}.png", resolved_spec=dict(spec))
+
+    store = AssetStore(str(tmp_path), fetch=lambda url: images[url.rsplit("/", 1)[-1][:-4]])
+    monkeypatch.setattr(main, "asset_store", store)
+    monkeypatch.setattr(main, "derivatives", None)
+    monkeypatch.setattr(main, "generate_fibo_image", fake_generate)
+    client = TestClient(main.app)
+
+    request = {
+        "base_variant": {"variant_id": "P", "hook": "phash hook", "primary_text": "t",
+                         "headline": "h", "call_to_action": "c", "fibo_spec": {}},
+        "axes": {"lighting_style": ["warm", "warm_golden", "cool"]},
+        "preset": None,
+        "experiment_id": "exp_phash",
+    }
+    data = client.post("/explore-variants", json=request).json()
+    assert data["meta"]["duplicates"] == {"P_explore_2": "P_explore_1"}
+    assert [v["duplicate_of"] for v in data["generated"]] == [None, "P_explore_1", None]
+
+    scored = client.post("/score-creatives", json=data["generated"])
+    scores = scored.json()
+    assert scores[1] == {**scores[0], "creative_id": "P_explore_2"}
+    assert scored.headers["x-score-duplicates"] == "1"
+
+    # A second grid in the same experiment is matched against the first
+    request["base_variant"]["variant_id"] = "Q"
+    request["collapse_duplicates"] = True
+    again = client.post("/explore-variants", json=request).json()
+    assert again["meta"]["collapsed"] == 3
+    assert again["generated"] == []
+
+
+def test_explore_does_not_flag_placeholder_images(tmp_path, monkeypatch):
+    # Mock mode: every cell gets the same placeholder image
+    placeholder = scene(3)
+    store = AssetStore(str(tmp_path), fetch=lambda url: placeholder)
+    monkeypatch.setattr(main, "asset_store", store)
+    monkeypatch.setattr(main, "derivatives", None)
+    monkeypatch.delenv("FIBO_API_KEY", raising=False)
+    client = TestClient(main.app)
+
+    request = {
+        "base_variant": {"variant_id": "M", "hook": "mock hook", "primary_text": "t",
+                         "headline": "h", "call_to_action": "c", "fibo_spec": {}},
+        "preset": "fast4",
+        "collapse_duplicates": True,
+    }
+    data = client.post("/explore-variants", json=request).json()
+    assert data["meta"]["duplicates"] == {}
+    assert data["meta"]["duplicate_detection"] is True
+    assert len(data["generated"]) == 4
+
+
+def test_reexploring_a_base_does_not_flag_cells_as_their_own_duplicates(tmp_path, monkeypatch):
+    images = {"warm": scene(4), "cool": scene(5)}
+
+    def fake_generate(spec, prompt):
+        return FiboImageResult(image_url=f"https://img/{spec['lighting_style']}.png", resolved_spec=dict(spec))
+
+    store = AssetStore(str(tmp_path), fetch=lambda url: images[url.rsplit("/", 1)[-1][:-4]])
+    monkeypatch.setattr(main, "asset_store", store)
+    monkeypatch.setattr(main, "derivatives", None)
+    monkeypatch.setattr(main, "generate_fibo_image", fake_generate)
+    client = TestClient(main.app)
+
+    request = {
+        "base_variant": {"variant_id": "Z", "hook": "rerun hook", "primary_text": "t",
+                         "headline": "h", "call_to_action": "c", "fibo_spec": {}},
+        "axes": {"lighting_style": ["warm", "cool"]},
+        "preset": None,
+        "experiment_id": "exp_rerun",
+        "collapse_duplicates": True,
+    }
+    first = client.post("/explore-variants", json=request).json()
+    again = client.post("/explore-variants", json=request).json()
+    for data in (first, again):
+        assert data["meta"]["duplicates"] == {}
+        assert [v["variant_id"] for v in data["generated"]] == ["Z_explore_1", "Z_explore_2"]
+
+
+def test_index_replaces_an_item_instead_of_matching_itself():
+    index = NearDuplicateIndex(threshold=4)
+    assert index.add("exp", "a", 0b1111) is None
+    assert index.add("exp", "a", 0b1111) is None
+    assert index.add("exp", "b", 0b1111) == "a"
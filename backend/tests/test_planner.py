@@ -0,0 +1,59 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from ..agents import ExperimentPlanner
+from ..app.main import app
+from ..schemas.models import Audience, BusinessSnapshot, HistoricalPerformance, Product
+
+
+def catalog(n_products=30):
+    return BusinessSnapshot(
+        products=[Product(id=f"sku_{i}", name=f"Item {i}", price=10.0 + i, margin=50.0) for i in range(n_products)],
+        audiences=[Audience(segment="gamers"), Audience(segment="parents", pain_points=["no time"])],
+        historical_performance=[HistoricalPerformance(channel="Meta", impressions=50000, clicks=1000,
+                                                      conversions=30, spend=500.0, revenue=1500.0)],
+    )
+
+
+def test_ranking_uses_kpis_budget_and_per_product_cap():
+    snapshot = catalog()
+    # sku_0 is cheap but converts far better; parents convert better than gamers
+    product_stats = {"sku_0": {"clicks": 5000, "conversions": 1000}}
+    segment_stats = {"parents": {"clicks": 5000, "conversions": 300}}
+    planner = ExperimentPlanner(angles={"benefit": 1.0, "problem_solution": 1.2})
+
+    plans = list(planner.iter_plans(snapshot, top_k=10, budget=1200.0, product_stats=product_stats,
+                                    segment_stats=segment_stats, max_per_product=1))
+    assert len(plans) == 3  # 1200 funds three two-variant plans at 200 per variant
+    assert plans[0].experiment_id.startswith("exp_sku-0_parents_problem_solution_")
+    assert "no time" in plans[0].variants[1].description
+    assert [p.experiment_id.split("_")[1] for p in plans] == ["sku-0", "sku-29", "sku-28"]
+    assert plans[0].priority_score > plans[1].priority_score > plans[2].priority_score
+
+    uncapped = planner.rank(snapshot, 2, product_stats, segment_stats)
+    assert {c.product.id for c in uncapped} == {"sku_0"}
+    small_blocks = ExperimentPlanner(angles=planner.angles, block_size=4).rank(snapshot, 2, product_stats, segment_stats)
+    assert [(c.product.id, c.audience.segment, c.angle) for c in small_blocks] == \
+        [(c.product.id, c.audience.segment, c.angle) for c in uncapped]
+
+
+def test_experiment_ids_stay_distinct_when_slugs_collide():
+    snapshot = catalog(0).model_copy(update={"products": [
+        Product(id=id_, name="Item", price=20.0, margin=50.0) for id_ in ("SKU 1", "sku-1", "sku_1")
+    ]})
+    plans = list(ExperimentPlanner().iter_plans(snapshot, top_k=100))
+    ids = [p.experiment_id for p in plans]
+    assert len(set(ids)) == len(ids) == 3 * 2 * len(ExperimentPlanner().angles)
+    assert all(i.startswith("exp_sku-1_") for i in ids)
+
+
+def test_plans_endpoint_streams_ndjson():
+    client = TestClient(app)
+    resp = client.post("/experiment-plans", json={"snapshot": catalog(5).model_dump(), "top_k": 4,
+                                                  "max_per_product": 2})
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    plans = [json.loads(line) for line in resp.text.splitlines()]
+    assert len(plans) == 4 and plans[0]["variants"][0]["control"] is True
+    assert client.post("/experiment-plans", json={"snapshot": catalog(1).model_dump(),
+                                                  "angles": {"memes": 1.0}}).status_code == 400
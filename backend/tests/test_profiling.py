@@ -0,0 +1,74 @@
+import pstats
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app import profiling
+
+
+def make_client(tmp_path, sample_rate=0.0):
+    app = FastAPI()
+    profiling.install(app, profiles_dir=str(tmp_path), sample_rate=sample_rate)
+
+    @app.get("/work")
+    def work():
+        return {"total": sum(i * i for i in range(1000))}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_request_without_header_is_not_profiled(tmp_path):
+    client = make_client(tmp_path)
+    resp = client.get("/work")
+    assert resp.status_code == 200
+    assert "x-profile-id" not in resp.headers
+    assert client.get("/profiles").json() == []
+
+
+def test_profile_header_captures_and_serves_profile(tmp_path):
+    client = make_client(tmp_path)
+    resp = client.get("/work", headers={"X-Profile": "1", "X-Trace-Id": "trace123"})
+    assert resp.status_code == 200
+    assert resp.headers["x-trace-id"] == "trace123"
+    profile_id = resp.headers["x-profile-id"]
+    assert "work" in profile_id and profile_id.endswith("trace123.prof")
+
+    listed = client.get("/profiles").json()
+    assert [p["profile_id"] for p in listed] == [profile_id]
+
+    download = client.get(f"/profiles/{profile_id}")
+    assert download.status_code == 200
+    stats = pstats.Stats(str(tmp_path / profile_id))
+    # The endpoint body ran in a worker thread and must appear in the profile
+    assert any(func[2] == "work" for func in stats.stats)
+
+
+def test_sample_rate_profiles_every_request(tmp_path):
+    client = make_client(tmp_path, sample_rate=1.0)
+    client.get("/work")
+    assert len(client.get("/profiles").json()) == 1
+
+
+def test_async_endpoint_is_skipped_without_writing_a_file(tmp_path):
+    client = make_client(tmp_path)
+    resp = client.get("/ping", headers={"X-Profile": "1"})
+    assert resp.status_code == 200
+    assert "x-profile-id" not in resp.headers
+    assert resp.headers["x-profile-skipped"] == "async-endpoint"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_profile_id_cannot_escape_profiles_dir(tmp_path):
+    profiles_dir = tmp_path / "profiles"
+    (tmp_path / "secret.prof").write_bytes(b"secret")
+    client = make_client(profiles_dir)
+    # Encoded so the client does not normalise the `..` away
+    resp = client.get("/profiles/..%2Fsecret.prof")
+    assert resp.status_code in (400, 404)
+    assert b"secret" not in resp.content
+    resp = client.get("/profiles/..%5Csecret.prof")
+    assert resp.status_code in (400, 404)
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ..app.main import app
+from ..agents import ResultCubes
+from ..schemas.models import ExperimentResult, VariantResult
+
+START = datetime(2024, 3, 1, 22, tzinfo=timezone.utc)
+
+
+def row(variant_id, channel, segment, clicks):
+    return VariantResult(variant_id=variant_id, channel=channel, audience_segment=segment,
+                         impressions=clicks * 10, clicks=clicks, spend=clicks * 0.5,
+                         conversions=clicks // 10, revenue=clicks * 3.0)
+
+
+def filled_cubes():
+    cubes = ResultCubes()
+    for hour in range(4):  # 22:00 and 23:00 on Mar 1, 00:00 and 01:00 on Mar 2
+        rows = [row(v, ch, seg, 10 * (hour + 1))
+                for v in ("A", "B") for ch in ("Meta", "Google") for seg in ("gamers", "parents")]
+        cubes.add(ExperimentResult(experiment_id="exp", winner_variant_id="A", results=rows),
+                  observed_at=START + timedelta(hours=hour))
+    return cubes
+
+
+def test_rollups_agree_with_drill_downs():
+    cubes = filled_cubes()
+    (total,) = cubes.query("exp")
+    assert total["clicks"] == 8 * (10 + 20 + 30 + 40)
+
+    by_channel = cubes.query("exp", by=["channel"])
+    assert [r["channel"] for r in by_channel] == ["Google", "Meta"]
+    assert sum(r["clicks"] for r in by_channel) == total["clicks"]
+
+    days = cubes.query("exp", by=["variant"], grain="day")
+    assert [(r["variant_id"], r["day"], r["clicks"]) for r in days] == [
+        ("A", "2024-03-01", 120), ("A", "2024-03-02", 280), ("B", "2024-03-01", 120), ("B", "2024-03-02", 280),
+    ]
+    hours = cubes.query("exp", grain="hour", where={"variant": "A", "day": "2024-03-02"})
+    assert [r["hour"] for r in hours] == ["2024-03-02T00:00:00Z", "2024-03-02T01:00:00Z"]
+    assert sum(r["clicks"] for r in hours) == 280
+
+    (cell,) = cubes.query("exp", by=["variant", "segment"], where={"channel": "Meta", "variant": "B",
+                                                                    "segment": "gamers"})
+    assert cell["audience_segment"] == "gamers" and cell["clicks"] == 100 and cell["roas"] == 6.0
+
+    with pytest.raises(ValueError):
+        cubes.query("exp", by=["country"])
+
+
+def test_incremental_results_feed_the_cube_endpoint():
+    client = TestClient(app)
+    body = {"experiment_id": "cube_exp", "winner_variant_id": "A",
+            "observed_at": "2024-03-01T10:30:00Z",
+            "results": [row("A", "Meta", "gamers", 100).model_dump(), row("A", "Google", "gamers", 50).model_dump(),
+                        row("B", "Meta", "gamers", 80).model_dump()]}
+    rec = client.post("/results?incremental=true", json=body).json()
+    assert [v["clicks"] for v in rec["results"]] == [150, 80]
+
+    cube = client.get("/results/cube_exp/cube", params={"by": "channel", "grain": "hour", "variant": "A"}).json()
+    assert [(c["channel"], c["hour"], c["clicks"]) for c in cube["cells"]] == [
+        ("Google", "2024-03-01T10:00:00Z", 50), ("Meta", "2024-03-01T10:00:00Z", 100),
+    ]
+    assert client.get("/results/unknown_exp/cube").status_code == 404
+    assert client.get("/results/cube_exp/cube", params={"grain": "week"}).status_code == 400
+
+
+def test_cubes_drop_old_days_and_least_recent_experiments():
+    cubes = ResultCubes(max_experiments=2, retention_days=2)
+    for day in range(3):
+        cubes.add(ExperimentResult(experiment_id="exp", winner_variant_id="A", results=[row("A", "Meta", "x", 10)]),
+                  observed_at=START + timedelta(days=day))
+    assert [r["day"] for r in cubes.query("exp", grain="day")] == ["2024-03-02", "2024-03-03"]
+    # A late row older than the window still counts in the untimed totals
+    cubes.add(ExperimentResult(experiment_id="exp", winner_variant_id="A", results=[row("A", "Meta", "x", 10)]),
+              observed_at=START)
+    assert len(cubes.query("exp", grain="day")) == 2
+    assert cubes.query("exp")[0]["clicks"] == 40
+
+    for experiment_id in ("other", "third"):
+        cubes.add(ExperimentResult(experiment_id=experiment_id, winner_variant_id="A",
+                                   results=[row("A", "Meta", "x", 10)]))
+    assert "exp" not in cubes and "other" in cubes and "third" in cubes
+    assert (len(cubes), cubes.evicted) == (2, 1)
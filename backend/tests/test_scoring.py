@@ -0,0 +1,49 @@
+from fastapi.testclient import TestClient
+
+from ..app.main import app
+from ..app.scoring import ScoreCache, score_key
+from ..schemas.models import CreativeVariant
+
+
+def creative(variant_id, hook="Stop scrolling!", **extra):
+    return CreativeVariant(variant_id=variant_id, hook=hook, primary_text="Body.", headline="The best solution.",
+                           call_to_action="Shop Now", fibo_spec={"shot_type": "product_only"},
+                           image_status="mocked", **extra)
+
+
+def test_score_key_covers_content_but_not_identity():
+    base = creative("A")
+    assert score_key(base) == score_key(creative("B"))
+    assert score_key(base) != score_key(creative("A", hook="New hook"))
+    assert score_key(base) != score_key(base.model_copy(update={"fibo_spec": {"shot_type": "product_in_use"}}))
+    assert score_key(base) != score_key(base.model_copy(update={"image_status": "error"}))
+
+
+def test_only_new_or_changed_creatives_are_rescored():
+    cache = ScoreCache(seed=3)
+    first, hits, misses, reused = cache.score_batch([creative("A"), creative("B", hook="Other"),
+                                                     creative("C", hook="Other", duplicate_of="B")])
+    assert (hits, misses, reused) == (0, 2, 1)
+    assert first[2].creative_id == "C"
+    assert first[2].model_dump(exclude={"creative_id"}) == first[1].model_dump(exclude={"creative_id"})
+
+    again, hits, misses, reused = cache.score_batch([creative("A"), creative("B", hook="Regenerated")])
+    assert (hits, misses, reused) == (1, 1, 0)
+    assert again[0] == first[0]
+    assert cache.stats() == {"entries": 3, "hits": 1, "misses": 3, "reused": 1}
+
+    # Seeded scoring: a fresh cache with the same seed reproduces every score
+    fresh, _, _, _ = ScoreCache(seed=3).score_batch([creative("A")])
+    assert fresh[0] == first[0]
+
+
+def test_score_creatives_reports_cache_hits():
+    client = TestClient(app)
+    body = [creative("A", hook="Endpoint hook").model_dump(), creative("B", hook="Endpoint other").model_dump()]
+    first = client.post("/score-creatives", json=body)
+    assert first.status_code == 200
+    assert first.headers["x-score-cache-misses"] == "2"
+    body[1]["hook"] = "Endpoint regenerated"
+    second = client.post("/score-creatives", json=body)
+    assert (second.headers["x-score-cache-hits"], second.headers["x-score-cache-misses"]) == ("1", "1")
+    assert second.json()[0] == first.json()[0]
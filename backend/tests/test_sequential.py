@@ -0,0 +1,105 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from ..agents import SequentialTest, SequentialTestRegistry
+from ..app.main import app
+from ..schemas.models import ExperimentResult, VariantResult
+
+
+def delta(variant_id, clicks, conversions):
+    return VariantResult(variant_id=variant_id, impressions=clicks * 20, clicks=clicks,
+                         spend=clicks * 0.5, conversions=conversions, revenue=conversions * 30.0)
+
+
+def run(cvr_a, cvr_b, hours, seed):
+    rng = np.random.default_rng(seed)
+    test = SequentialTest("exp")
+    for hour in range(hours):
+        test.update(delta("A", 200, int(rng.binomial(200, cvr_a))))
+        test.update(delta("B", 200, int(rng.binomial(200, cvr_b))))
+        decision = test.decide()
+        if decision.stop:
+            return hour, decision
+    return None, decision
+
+
+def test_stops_early_on_real_lifts_and_rarely_on_aa_tests():
+    hour, decision = run(0.05, 0.07, hours=500, seed=1)
+    assert hour is not None and hour < 200
+    assert decision.winner_variant_id == "B" and decision.variants[1].status == "winner"
+
+    _, losing = run(0.05, 0.03, hours=500, seed=2)
+    assert losing.winner_variant_id == "A" and losing.variants[1].status == "loser"
+
+    false_stops = sum(run(0.05, 0.05, hours=100, seed=s)[0] is not None for s in range(40))
+    assert false_stops <= 4
+
+
+def test_p_values_only_decrease_and_state_round_trips():
+    test = SequentialTest("exp")
+    test.update(delta("A", 1000, 50))
+    test.update(delta("B", 1000, 70))
+    first = test.decide().variants[1].p_value
+    # Evidence reversing does not undo an earlier look
+    test.update(delta("A", 1000, 70))
+    test.update(delta("B", 1000, 50))
+    assert test.decide().variants[1].p_value == first
+
+    restored = SequentialTest.from_dict(test.to_dict())
+    assert restored.totals == test.totals and restored.decide() == test.decide()
+
+
+def test_incremental_results_accumulate_deltas():
+    client = TestClient(app)
+    body = {"experiment_id": "seq_exp", "winner_variant_id": "A", "results": [
+        delta("A", 2000, 100).model_dump(), delta("B", 2000, 180).model_dump(),
+    ]}
+    first = client.post("/results?incremental=true", json=body).json()
+    second = client.post("/results?incremental=true", json=body).json()
+    assert first["results"][0]["clicks"] == 2000 and second["results"][0]["clicks"] == 4000
+    assert second["stop"] is True and second["sequential"][1]["status"] == "winner"
+    assert second["winner_variant_id"] == "B"
+
+
+def test_decisions_are_latched_when_the_sign_flips():
+    test = SequentialTest("exp")
+    test.update(delta("A", 2000, 100))
+    test.update(delta("B", 2000, 180))
+    assert test.decide().variants[1].status == "winner"
+    # B falls behind, but a decided challenger keeps its call
+    test.update(delta("A", 20000, 3000))
+    test.update(delta("B", 20000, 100))
+    assert test.decide().variants[1].status == "winner"
+    assert SequentialTest.from_dict(test.to_dict()).decide().variants[1].status == "winner"
+
+
+def test_registry_evicts_least_recent_tests_and_reloads_them_from_disk(tmp_path):
+    registry = SequentialTestRegistry(max_tests=1, state_dir=str(tmp_path))
+    body = ExperimentResult(experiment_id="first", winner_variant_id="A",
+                            results=[delta("A", 100, 5), delta("B", 100, 7)])
+    registry.apply(body)
+    registry.apply(body.model_copy(update={"experiment_id": "second"}))
+    assert list(registry.tests) == ["second"]
+
+    totals, _ = registry.apply(body)
+    assert totals.results[0].clicks == 200
+    # A fresh registry (a restart) picks up where the last one stopped
+    restarted = SequentialTestRegistry(state_dir=str(tmp_path))
+    totals, _ = restarted.apply(body)
+    assert totals.results[0].clicks == 300
+
+    registry.reset("first")
+    assert SequentialTestRegistry(state_dir=str(tmp_path)).apply(body)[0].results[0].clicks == 100
+
+
+def test_non_incremental_results_merge_per_channel_rows():
+    client = TestClient(app)
+    rows = [delta("A", 1000, 50).model_dump() | {"channel": "Meta"},
+            delta("A", 1000, 30).model_dump() | {"channel": "Google"},
+            delta("B", 2000, 60).model_dump() | {"channel": "Meta"}]
+    rec = client.post("/results", json={"experiment_id": "merge_exp", "winner_variant_id": "A",
+                                        "results": rows}).json()
+    assert [(v["variant_id"], v["clicks"], v["conversions"], v["channel"]) for v in rec["results"]] == [
+        ("A", 2000, 80, None), ("B", 2000, 60, "Meta"),
+    ]
+    assert [p["variant_id"] for p in rec["posteriors"]] == ["A", "B"]
@@ -0,0 +1,21 @@
+from ..agents.simulator import SimulationConfig, run_policy, simulate
+
+
+def test_policies_share_truth_and_adaptive_allocation_cuts_regret():
+    config = SimulationConfig(experiments=400, periods=14, seed=3)
+    fixed, bayesian, thompson = simulate(config)
+    assert [r.policy for r in (fixed, bayesian, thompson)] == ["fixed", "bayesian", "thompson"]
+    for report in (fixed, bayesian, thompson):
+        assert report.experiments == 400 and 0.0 < report.decided <= 1.0
+        assert 1 <= report.mean_periods_to_decision <= config.periods
+        assert report.experiment_periods_per_s > 0
+    assert thompson.regret < fixed.regret
+    assert bayesian.accuracy > fixed.accuracy
+    # Same seed, same answer
+    assert run_policy("thompson", config).regret == thompson.regret
+
+
+def test_process_shards_cover_every_experiment():
+    config = SimulationConfig(experiments=200, periods=5)
+    (report,) = simulate(config, policies=["fixed"], processes=2)
+    assert report.experiments == 200 and report.regret > 0
@@ -0,0 +1,87 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from backend.app import main
+from backend.app.fibo_client import FiboImageResult
+from backend.app.spec_index import SpecIndex
+
+
+def test_nearest_counts_differing_fields_and_respects_weights():
+    index = SpecIndex(capacity=8)
+    index.insert({"lighting_style": "warm", "color_palette": "pastel"}, "u1")
+    index.insert({"lighting_style": "cool", "color_palette": "warm_golden"}, "u2")
+    assert index.nearest({"lighting_style": "warm", "color_palette": "pastel"}) == ("u1", 0.0)
+    assert index.nearest({"lighting_style": "cool", "color_palette": "neon"}) == ("u2", 1.0)
+
+    weighted = SpecIndex(capacity=8, weights={"color_palette": 3.0})
+    weighted.insert({"lighting_style": "warm", "color_palette": "pastel"}, "u1")
+    weighted.insert({"lighting_style": "cool", "color_palette": "neon"}, "u2")
+    assert weighted.nearest_url({"lighting_style": "warm", "color_palette": "neon"}) == "u2"
+
+
+def test_index_is_bounded_and_updates_identical_specs_in_place():
+    index = SpecIndex(capacity=2)
+    assert index.nearest({"shot_type": "closeup"}) is None
+    index.insert({"shot_type": "closeup"}, "old")
+    index.insert({"shot_type": "closeup"}, "new")
+    assert len(index) == 1
+    assert index.nearest_url({"shot_type": "closeup"}) == "new"
+
+    index.insert({"shot_type": "wide"}, "wide")
+    index.insert({"shot_type": "medium"}, "medium")
+    assert len(index) == 2
+    assert index.nearest({"shot_type": "closeup"})[1] == 1.0
+
+
+def test_vocabulary_is_released_with_overwritten_rows():
+    index = SpecIndex(capacity=2)
+    for i in range(100):
+        index.insert({"shot_type": f"client value {i}", "lighting_style": "warm"}, f"u{i}", scope=f"t{i}")
+    # Two live rows: two shot types, one lighting style, two scopes
+    assert index.vocabulary_size() == 5
+    assert index.nearest_url({"shot_type": "client value 99"}, scope="t99") == "u99"
+    assert index.nearest({"shot_type": "client value 0"}, scope="t0") is None
+
+
+def test_lookups_only_match_the_same_scope():
+    index = SpecIndex(capacity=8)
+    index.insert({"lighting_style": "warm"}, "tenant-a.png", scope="a")
+    index.insert({"lighting_style": "cool"}, "tenant-b.png", scope="b")
+    assert index.nearest_url({"lighting_style": "warm"}, scope="b") == "tenant-b.png"
+    assert index.nearest_url({"lighting_style": "warm"}, scope="c") is None
+
+
+def test_regenerate_returns_preview_from_nearest_earlier_render(monkeypatch):
+    def fake_generate(spec, prompt):
+        return FiboImageResult(image_url=f"https://img/{spec['lighting_style']}.png", resolved_spec=dict(spec))
+
+    monkeypatch.setattr(main, "spec_index", SpecIndex(capacity=16))
+    monkeypatch.setattr(main, "generate_fibo_image", fake_generate)
+    client = TestClient(main.app)
+    variant = {"variant_id": "S", "hook": "preview hook", "primary_text": "t", "headline": "h",
+               "call_to_action": "c", "fibo_spec": {"lighting_style": "warm", "shot_type": "closeup"}}
+
+    first = client.post("/regenerate-image", json={"variant": variant, "spec_patch": {}}).json()
+    assert first["preview_url"] is None
+
+    loop = asyncio.new_event_loop()
+    subscriber = main.event_bus.subscribe(loop)
+    subscriber.topics.add("S")
+    try:
+        second = client.post(
+            "/regenerate-image", json={"variant": variant, "spec_patch": {"lighting_style": "cool"}}
+        ).json()
+        loop.run_until_complete(asyncio.sleep(0))
+        queued = subscriber.queue.get_nowait()
+    finally:
+        main.event_bus.unsubscribe(subscriber)
+        loop.close()
+    assert second["preview_url"] == "https://img/warm.png"
+    assert second["image_url"] == "https://img/cool.png"
+    assert queued["type"] == "queued" and queued["preview_url"] == "https://img/warm.png"
+
+    # Another tenant never gets this tenant's render as a preview
+    other = client.post("/regenerate-image", headers={"X-API-Key": "someone-else"},
+                        json={"variant": variant, "spec_patch": {"lighting_style": "soft"}}).json()
+    assert other["preview_url"] is None
@@ -0,0 +1,109 @@
+from backend.app.fibo_client import FiboImageResult
+from backend.app.result_cache import GenerationCache
+from backend.app.scheduler import SPECULATIVE, GenerationScheduler
+from backend.app.speculative import PRESET_PROMPTS, SpeculativePrerenderer, likely_patches, regenerate_patch
+from backend.schemas.models import CreativeVariant
+
+
+def make_creative():
+    return CreativeVariant(
+        variant_id="A",
+        hook="Stop scrolling!",
+        primary_text="Text",
+        headline="The best solution.",
+        call_to_action="Shop Now",
+        image_url="https://example.com/a.png",
+        fibo_spec={"lighting_style": "warm", "color_palette": "pastel", "background_type": "studio"},
+        image_status="mocked",
+    )
+
+
+def make_prerenderer(credit_budget=50):
+    scheduler = GenerationScheduler(capacity=2)
+    cache = GenerationCache()
+    calls = []
+
+    def render(spec, prompt):
+        calls.append(spec)
+        with scheduler.slot(SPECULATIVE, "speculative"):
+            result = FiboImageResult(image_url=f"https://img/{len(calls)}", resolved_spec=dict(spec))
+        cache.put(spec, prompt, result)
+        return result
+
+    return SpeculativePrerenderer(render, scheduler, cache, credit_budget=credit_budget), cache, calls
+
+
+def test_patches_match_what_the_ui_sends_for_each_preset():
+    # Mirrors handleRegenerateImage in frontend/src/App.jsx
+    assert likely_patches() == [
+        {"prompt": PRESET_PROMPTS[0], "background_type": "studio", "lighting_style": "soft"},
+        {"prompt": PRESET_PROMPTS[1], "background_type": "lifestyle", "lighting_style": "warm"},
+        {"prompt": PRESET_PROMPTS[2], "lighting_style": "dramatic", "color_palette": "vibrant"},
+        {"prompt": PRESET_PROMPTS[3], "lighting_style": "warm", "color_palette": "warm_golden"},
+    ]
+    assert regenerate_patch("just brighter") == {"prompt": "just brighter"}
+
+
+def test_prerendered_preset_is_served_from_cache_and_counted():
+    prerenderer, cache, calls = make_prerenderer()
+    creative = make_creative()
+    assert prerenderer.submit([creative]) == 4
+    assert prerenderer.wait_idle()
+    assert len(calls) == 4
+
+    # Keyed exactly like /regenerate-image: the whole patch, prompt included
+    prompt = f"{creative.hook} {creative.headline}"
+    spec = {**creative.fibo_spec, **regenerate_patch(PRESET_PROMPTS[2])}
+    assert prerenderer.observe(spec, prompt)
+    hit = cache.get(spec, prompt)
+    assert hit is not None and hit.image_url.startswith("https://img/")
+    assert not prerenderer.observe({**creative.fibo_spec, "prompt": "custom"}, prompt)
+    stats = prerenderer.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+    # Already cached presets are not queued again
+    assert prerenderer.submit([creative]) == 0
+    prerenderer.stop()
+
+
+def test_credit_budget_caps_speculative_renders():
+    prerenderer, cache, calls = make_prerenderer(credit_budget=2)
+    prerenderer.submit([make_creative()])
+    assert prerenderer.wait_idle()
+    assert len(calls) == 2
+    assert prerenderer.stats()["over_budget"] == 2
+    assert prerenderer.credits_remaining() == 0
+    prerenderer.stop()
+
+
+def test_result_cache_is_only_used_with_speculation_and_not_for_rerolls(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from backend.app import main
+
+    calls = []
+
+    def fake_generate(spec, prompt):
+        calls.append(spec)
+        return FiboImageResult(image_url=f"https://img/{len(calls)}.png", resolved_spec=dict(spec))
+
+    monkeypatch.setattr(main, "generate_fibo_image", fake_generate)
+    monkeypatch.setattr(main, "result_cache", GenerationCache())
+    client = TestClient(main.app)
+    variant = make_creative().model_dump()
+    variant["hook"] = "cache policy hook"
+    patched = {"variant": variant, "spec_patch": {"lighting_style": "cool"}}
+
+    monkeypatch.setattr(main, "speculator", None)
+    urls = [client.post("/regenerate-image", json=patched).json()["image_url"] for _ in range(2)]
+    assert len(calls) == 2 and urls[0] != urls[1]
+
+    monkeypatch.setattr(main, "speculator", SpeculativePrerenderer(
+        lambda spec, prompt: None, main.scheduler, main.result_cache))
+    urls = [client.post("/regenerate-image", json=patched).json()["image_url"] for _ in range(2)]
+    assert len(calls) == 3 and urls[0] == urls[1]
+    # An unchanged spec is an explicit re-roll and always renders again
+    reroll = {"variant": variant, "spec_patch": {}}
+    for _ in range(2):
+        client.post("/regenerate-image", json=reroll)
+    assert len(calls) == 5
@@ -0,0 +1,59 @@
+import gzip
+import json
+
+from ..data_ingestion import DataIngestion, PerformanceAggregator, iter_performance_chunks
+
+
+CSV = """date,channel,product_id,impressions,clicks,conversions,spend,revenue
+2024-03-01,Meta,prod_1,1000,50,5,40.0,150.0
+2024-03-01,Google,prod_2,800,40,4,30.5,120.0
+2024-03-02T09:30:00,Meta,prod_1,1200,60,6,45.0,180.0
+not-a-row,Meta,prod_1,abc,1,1,1,1
+"""
+
+
+def test_chunks_are_bounded_and_bad_rows_skipped(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text(CSV)
+    aggregator = PerformanceAggregator()
+    chunks = list(iter_performance_chunks(str(path), chunk_size=2, stats=aggregator.stats))
+    assert [len(c) for c in chunks] == [2, 1]
+    assert aggregator.stats.rows == 3 and aggregator.stats.skipped == 1
+    assert chunks[1][0][0] == "2024-03-02"
+
+
+def test_aggregates_csv_and_gzipped_ndjson_into_snapshot(tmp_path):
+    csv_path = tmp_path / "meta_google.csv"
+    csv_path.write_text(CSV)
+    ndjson_path = tmp_path / "tiktok.ndjson.gz"
+    with gzip.open(ndjson_path, "wt") as f:
+        f.write(json.dumps({"date": "2024-03-02", "product_id": "prod_2", "impressions": 500,
+                            "clicks": 10, "conversions": 2, "spend": 12.0, "revenue": 60.0}) + "\n")
+
+    snapshot = DataIngestion().snapshot_from_exports(
+        [str(csv_path), str(ndjson_path)], channels={str(ndjson_path): "TikTok"}, chunk_size=1
+    )
+
+    by_channel = {h.channel: h for h in snapshot.historical_performance}
+    assert set(by_channel) == {"Google", "Meta", "TikTok"}
+    assert by_channel["Meta"].impressions == 2200 and by_channel["Meta"].revenue == 330.0
+    assert [day["revenue"] for day in snapshot.sales_data] == [270.0, 240.0]
+    products = {p.id: p for p in snapshot.products}
+    assert products["prod_1"].price == 30.0
+    assert products["prod_2"].price == 30.0
+
+
+def test_overflowing_and_non_finite_rows_are_skipped_not_fatal(tmp_path):
+    csv_path = tmp_path / "export.csv"
+    csv_path.write_text(CSV.replace("not-a-row,Meta,prod_1,abc,1,1,1,1",
+                                    "2024-03-03,Meta,prod_1,inf,1,1,1,1\n2024-03-03,Meta,prod_1,1,1,1,nan,1"))
+    ndjson_path = tmp_path / "export.ndjson"
+    ndjson_path.write_text(
+        '{"date": "2024-03-03", "channel": "TikTok", "impressions": 1e400, "clicks": 1}\n'
+        '{"date": "2024-03-03", "channel": "TikTok", "impressions": 1' + "0" * 400 + ', "clicks": 1}\n'
+        '{"date": "2024-03-03", "channel": "TikTok", "impressions": 10, "clicks": 1}\n'
+    )
+    for path, rows, skipped in ((csv_path, 3, 2), (ndjson_path, 1, 2)):
+        aggregator = PerformanceAggregator()
+        aggregator.add_file(str(path))
+        assert (aggregator.stats.rows, aggregator.stats.skipped) == (rows, skipped)
@@ -0,0 +1,96 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from ..agents import CreativeAgent, TemplateEngine, compile_template
+from ..app.main import app
+from ..schemas.models import ExperimentPlan, Guardrails, SampleSizeRules, VariantPlan
+
+
+def plan(guardrails=None):
+    return ExperimentPlan(
+        experiment_id="exp_templates",
+        objective="Increase ROAS",
+        hypothesis="h",
+        variants=[VariantPlan(variant_id="A", control=True, description="Control"),
+                  VariantPlan(variant_id="B", description="Saves time"),
+                  VariantPlan(variant_id="D", description="Social proof")],
+        metrics=["roas"],
+        sample_size_rules=SampleSizeRules(min_spend_per_variant=1, min_conversions=1),
+        guardrails=guardrails,
+    )
+
+
+def test_compiled_template_renders_fields_and_reports_missing_ones():
+    template = compile_template("Meet {product}: {description}!")
+    assert template.fields == {"product", "description"}
+    assert template.render({"product": "Glow", "description": "bright"}) == "Meet Glow: bright!"
+    assert not template.renders({"description": "bright"})
+    assert compile_template("Meet {product}: {description}!") is template
+    assert compile_template("Shop Now").render({}) == "Shop Now"
+    with pytest.raises(ValueError):
+        compile_template("{price:.2f}")
+
+
+def test_product_templates_are_skipped_without_a_product():
+    guardrails = Guardrails(brand_voice="Scientific and trustworthy")
+    agent = CreativeAgent()
+    a, b, _ = agent.generate_variants(plan(guardrails))
+    assert b.primary_text == "Experience the difference with our latest offering. Saves time."
+    assert {a.call_to_action, b.call_to_action} == {"Shop Now"}
+    without = list(agent.generate_permutations(plan(guardrails)))
+    assert not any("our product" in c.hook + c.headline + c.primary_text for c in without)
+    with_product = list(agent.generate_permutations(plan(guardrails), product="LunaGlow"))
+    assert len(with_product) > len(without)
+    assert any(c.primary_text.startswith("LunaGlow: ") for c in with_product)
+
+
+def test_headlines_are_cut_to_the_channel_limit_at_a_word_boundary():
+    engine = TemplateEngine()
+    context = {"variant_id": "C", "description": "x"}
+    # "Rated 5 stars by thousands." is 27 characters: fits Meta (40) and Google (30)
+    assert engine.render_batch([context], channel="Google")[0].headline == "Rated 5 stars by thousands."
+    long_headline = {"by_variant": {}, "fallback": ("Discover {description}", "{description}"), "hooks": [],
+                     "headlines": [], "bodies": ["{description}"], "call_to_action": "Shop Now"}
+    engine = TemplateEngine({"default": long_headline})
+    context = {"variant_id": "D", "description": "Clinically tested serum for visibly brighter skin in days"}
+    assert engine.render_batch([context], channel="Google")[0].headline == "Clinically tested serum for"
+    assert engine.render_batch([context], channel="Meta")[0].headline == "Clinically tested serum for visibly"
+    assert engine.render_batch([context], channel="TikTok")[0].headline == context["description"]
+    assert engine.render_batch([context], channel="Pinterest")[0].headline == context["description"]
+
+
+def test_render_batch_applies_guardrails_and_channel_limits():
+    guardrails = Guardrails(brand_voice="Premium", required_terms=["Free returns"], avoid_words=["best"],
+                            disclaimer="Terms apply.", target_channel="Google")
+    engine = TemplateEngine()
+    a, b, d = CreativeAgent(engine).generate_variants(plan(guardrails))
+    assert (a.hook, b.hook, d.hook) == ("Stop scrolling!", "Tired of wasting time?", "Discover Social proof")
+    assert a.primary_text.endswith("Terms apply. Free returns.")
+    # "The best solution." trips the avoid list; the other headlines do not
+    assert a.guardrails_report == {"status": "needs_fix", "issues": ["Avoided word found: 'best'"]}
+    assert b.guardrails_report["status"] == "pass"
+    assert all(len(c.headline) <= 30 for c in (a, b, d))
+    assert engine.template_set("premium", "Google") is engine.template_set("premium", "google")
+
+
+def test_permutations_cover_every_combination_lazily():
+    engine = TemplateEngine()
+    agent = CreativeAgent(engine)
+    templates = engine.template_set("default", "meta")
+    per_variant = len(templates.hooks) * len(templates.headlines) * len(templates.bodies)
+    creatives = list(agent.generate_permutations(plan()))
+    assert len(creatives) == 3 * per_variant
+    assert len({(c.hook, c.headline, c.primary_text) for c in creatives[:per_variant]}) == per_variant
+    assert creatives[0].variant_id == "A-p0"
+    assert [c.variant_id for c in agent.generate_permutations(plan(), limit=2)] == ["A-p0", "A-p1", "B-p0", "B-p1",
+                                                                                   "D-p0", "D-p1"]
+
+
+def test_creative_variants_endpoint_keeps_classic_copy():
+    client = TestClient(app)
+    body = plan(Guardrails(disclaimer="Results vary.")).model_dump()
+    creatives = client.post("/creative-variants", json=body).json()
+    assert [c["headline"] for c in creatives] == ["The best solution.", "Save hours every day.", "Learn More"]
+    assert creatives[1]["primary_text"] == ("Experience the difference with our latest offering. Saves time. "
+                                            "Results vary.")
+    assert creatives[0]["guardrails_report"]["status"] == "pass"
@@ -8,6 +8,8 @@ import {
   exploreVariants,
   checkHealth,
   applyGuardrails,
+  subscribeGenerationEvents,
+  assetSrc,
 } from "./api";
 
 const AXIS_OPTIONS = {
@@ -494,6 +496,7 @@ function App() {
     setError("");
     setLoading(true); // Maybe refine loading text locally if we could, but global loading is boolean.
     // We can use a ref or another state for detailed loading status if we wanted, but standard Loading is fine.
+    let unsubscribe = null;
     try {
       const variant = creatives.find((c) => c.variant_id === variantId);
       if (!variant) {
@@ -514,6 +517,34 @@ function App() {
         }
       });
 
+      // Open the grid right away and fill cells in as they finish rendering
+      setActiveExplorationGrid({
+        variantId: variant.variant_id,
+        variantName: `Variant ${variant.variant_id}`,
+        variants: [],
+        axesExplored: req.axes,
+        streaming: true
+      });
+      unsubscribe = subscribeGenerationEvents([variant.variant_id], (event) => {
+        if (event.parent_id !== variant.variant_id) return;
+        // Queued cells show the nearest earlier image until their own render completes
+        const preview = event.type === "queued" && event.preview_url;
+        if (event.type !== "completed" && !preview) return;
+        setActiveExplorationGrid((grid) => {
+          if (!grid || !grid.streaming || grid.variantId !== variant.variant_id) return grid;
+          const others = grid.variants.filter((v) => v.variant_id !== event.variant_id);
+          const cell = preview
+            ? { variant_id: event.variant_id, image_url: event.preview_url, image_status: "preview" }
+            : {
+                variant_id: event.variant_id,
+                image_url: event.image_url,
+                image_status: event.image_status,
+                fibo_spec: event.fibo_spec
+              };
+          return { ...grid, variants: [...others, cell] };
+        });
+      });
+
       const response = await exploreVariants(req);
 
       // Open the exploration grid popout panel
@@ -529,6 +560,7 @@ function App() {
       console.error(err);
       setError(err.message || "Failed to explore variants.");
     } finally {
+      if (unsubscribe) unsubscribe();
       setLoading(false);
     }
   };
@@ -949,7 +981,7 @@ function App() {
                                 <div style={{ width: '50%' }}>
                                   <div className="thumb-title">Current ({c.timestamp || new Date().toLocaleTimeString()})</div>
                                   <img
-                                    src={c.image_url}
+                                    src={assetSrc(c, "thumb")}
                                     alt="Current version"
                                     className="thumb-img"
                                   />
@@ -1605,7 +1637,7 @@ function App() {
                   >
                     {exploredVariant.image_url && (
                       <img
-                        src={exploredVariant.image_url}
+                        src={assetSrc(exploredVariant, "thumb")}
                         alt={`Explored variant ${idx + 1}`}
                         style={{
                           width: "100%",
@@ -1613,7 +1645,8 @@ function App() {
                           aspectRatio: "1 / 1",
                           objectFit: "cover",
                           borderRadius: "6px",
-                          marginBottom: "0.75rem"
+                          marginBottom: "0.75rem",
+                          opacity: exploredVariant.image_status === "preview" ? 0.5 : 1
                         }}
                       />
                     )}
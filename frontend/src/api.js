@@ -1,4 +1,5 @@
 const API_BASE = "http://localhost:8000";
+const WS_BASE = API_BASE.replace(/^http/, "ws");
 
 /**
  * Enhanced API wrapper with friendly error messages
@@ -77,6 +78,39 @@ export function exploreVariants(req) {
   return apiPost("/explore-variants", req);
 }
 
+// Image source for a creative. When the backend asset store is enabled the
+// creative carries an asset_url, and `size` ("thumb", "feed", "story", "banner")
+// selects a resized derivative; otherwise the original image_url is used.
+export function assetSrc(creative, size) {
+  if (!creative.asset_url) return creative.image_url;
+  return `${API_BASE}${creative.asset_url}${size ? `?size=${size}` : ""}`;
+}
+
+// Live generation progress over WebSocket.
+// Subscribes to the given creative ids (a base creative id also covers its
+// explore grid cells) and calls onEvent for each queued/started/completed/failed
+// event. Returns a function that closes the socket. Events are a progressive
+// enhancement: the REST response remains the source of truth.
+export function subscribeGenerationEvents(ids, onEvent) {
+  let socket;
+  try {
+    socket = new WebSocket(`${WS_BASE}/ws/generation`);
+  } catch (err) {
+    console.warn("Generation events unavailable:", err);
+    return () => {};
+  }
+  socket.onopen = () => socket.send(JSON.stringify({ action: "subscribe", ids }));
+  socket.onmessage = (msg) => {
+    try {
+      onEvent(JSON.parse(msg.data));
+    } catch (err) {
+      console.warn("Bad generation event:", err);
+    }
+  };
+  socket.onerror = (err) => console.warn("Generation events unavailable:", err);
+  return () => socket.close();
+}
+
 // Phase 3.2 Task A: Backend Health Check
 export async function checkHealth() {
   try {